@@ -1,13 +1,90 @@
+import itertools
 from flask import Flask, request, jsonify
+from flask.json.provider import DefaultJSONProvider
 from backend.config import (
     FLASK_DEBUG,
     FLASK_HOST,
     FLASK_PORT,
+    SUGGEST_FIELDS,
+    RESPONSE_COMPRESS_MIN_BYTES,
+    RESPONSE_STREAM_MIN_BYTES,
 )
 from backend.search.query import QueryParams
 from backend.search.query_manager import get_query_manager
+from backend.search.documents import parse_sections, etag_matches
+from backend.responses import (
+    dumps,
+    iter_dumps,
+    read_head,
+    choose_encoding,
+    compress,
+    compress_stream,
+    weak_etag,
+)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """jsonify 使用 backend.responses.dumps：更快，且不转义中文"""
+
+    ensure_ascii = False
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj, default=self.default).decode("utf-8")
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            dumps(obj, default=self.default), mimetype=self.mimetype
+        )
+
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
+
+
+def stream_json(obj):
+    """逐段序列化的 JSON 响应（结果页、文书详情），由 compress_response 决定是否流式发送"""
+    return app.response_class(
+        iter_dumps(obj, default=app.json.default), mimetype="application/json"
+    )
+
+
+@app.after_request
+def compress_response(response):
+    """
+    较大的 JSON 响应按 Accept-Encoding 压缩。stream_json 生成的响应先读取
+    RESPONSE_STREAM_MIN_BYTES 字节，没读完的其余部分边序列化边压缩、流式发送
+    """
+    if (
+        response.status_code != 200
+        or response.direct_passthrough
+        or response.mimetype != "application/json"
+        or "Content-Encoding" in response.headers
+    ):
+        return response
+    rest = None
+    if response.is_streamed:
+        data, rest = read_head(response.response, RESPONSE_STREAM_MIN_BYTES)
+        if rest is None:
+            response.set_data(data)
+        else:
+            response.response = itertools.chain([data], rest)
+    else:
+        data = response.get_data()
+    if rest is None and len(data) < RESPONSE_COMPRESS_MIN_BYTES:
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = choose_encoding(request.headers.get("Accept-Encoding"))
+    if encoding is None:
+        return response
+    response.headers["Content-Encoding"] = encoding
+    if "ETag" in response.headers:
+        response.headers["ETag"] = weak_etag(response.headers["ETag"])
+    if rest is None:
+        response.set_data(compress(data, encoding))
+    else:
+        response.response = compress_stream(response.response, encoding)
+    return response
 
 
 @app.route("/api/query", methods=["POST"])
@@ -21,16 +98,38 @@ def create_query():
     return jsonify({"query_id": query_id, "total_results": total_results})
 
 
+@app.route("/api/query/batch", methods=["POST"])
+def create_queries():
+    """一次创建多个查询：{"user_queries": [...]}，结果与输入顺序一致"""
+    data = request.get_json()
+    params_list = [QueryParams.from_dict(q) for q in data.get("user_queries", [])]
+    query_manager = get_query_manager()
+    queries = []
+    for query_id in query_manager.create_queries(params_list):
+        if query_id is None:
+            queries.append({"query_id": None, "error": "Search failed"})
+            continue
+        total_results = query_manager.get_query(query_id)["total_results"]
+        queries.append({"query_id": query_id, "total_results": total_results})
+    return jsonify({"queries": queries})
+
+
 @app.route("/api/query/<query_id>/results", methods=["GET"])
 def get_query_results(query_id):
     page = int(request.args.get("page", 1))
     page_size = int(request.args.get("page_size", 10))
+    # preview=1 时长文本字段只返回片段
+    preview = request.args.get("preview", "0") in ("1", "true")
+    # ids_only=1 时只返回 ajId 和得分
+    ids_only = request.args.get("ids_only", "0") in ("1", "true")
     query_manager = get_query_manager()
-    result = query_manager.get_results(query_id, page=page, page_size=page_size)
+    result = query_manager.get_results(
+        query_id, page=page, page_size=page_size, preview=preview, ids_only=ids_only
+    )
     if result is None:
         return jsonify({"error": "Query not found"}), 404
     # 字段名调整为 queryResults
-    return jsonify(result)
+    return stream_json(result)
 
 
 @app.route("/api/query/<query_id>", methods=["GET"])
@@ -57,11 +156,34 @@ def update_query(query_id):
 
 @app.route("/api/document/<ajid>", methods=["GET"])
 def get_document_detail(ajid):
+    # sections=ajjbqk,pjjg 时只返回这些字段
+    sections = parse_sections(request.args.get("sections"))
     query_manager = get_query_manager()
-    doc = query_manager.get_document_by_ajid(ajid)
+    doc, etag = query_manager.get_document(ajid, sections)
     if doc is None:
         return jsonify({"error": "Document not found"}), 404
-    return jsonify(doc)
+    # 浏览器带 If-None-Match 重新验证，文档未变时返回 304，不再传输全文
+    if etag_matches(request.headers.get("If-None-Match"), etag):
+        response = app.response_class(status=304)
+    else:
+        response = stream_json(doc)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+@app.route("/api/document/<ajid>/similar", methods=["GET"])
+def get_similar_documents(ajid):
+    try:
+        size = int(request.args.get("size", 10))
+    except ValueError:
+        return jsonify({"error": "Invalid size"}), 400
+    query_manager = get_query_manager()
+    similar, stale = query_manager.get_similar_documents(ajid, size)
+    if similar is None:
+        return jsonify({"error": "Similar cases not found"}), 404
+    # stale：近邻表计算后索引又导入过，结果可能过时
+    return jsonify({"ajId": ajid, "similar": similar, "stale": stale})
 
 
 @app.route("/api/labels", methods=["GET"])
@@ -71,33 +193,27 @@ def get_all_labels():
     return jsonify({"labels": labels})
 
 
+@app.route("/api/facets", methods=["GET"])
+def get_facets():
+    """各分面字段（案由、案件类型等）的取值及文档数"""
+    query_manager = get_query_manager()
+    return jsonify({"facets": query_manager.get_facets()})
+
+
+@app.route("/api/stats", methods=["GET"])
+def get_stats():
+    query_manager = get_query_manager()
+    return jsonify(query_manager.get_stats())
+
+
 @app.route("/api/suggest", methods=["GET"])
 def suggest():
     prefix = request.args.get("q", "")
     if not prefix:
         return jsonify({"suggestions": []})
     query_manager = get_query_manager()
-    # 支持 suggest 的字段列表
-    suggest_fields = [
-        "ajName",
-        "fymc",
-        "spry",
-        "dsr",
-        "labels",
-        "ajjbqk",
-        "cpfxgc",
-        "pjjg",
-        "qw",
-        "writName",
-    ]
-    all_suggestions = set()
-    for field in suggest_fields:
-        try:
-            suggestions = query_manager.suggest(field, prefix)
-            all_suggestions.update(suggestions)
-        except Exception:
-            continue  # 某些字段没有suggest字段时跳过
-    return jsonify({"suggestions": list(all_suggestions)})
+    suggestions = query_manager.suggest_many(SUGGEST_FIELDS, prefix)
+    return jsonify({"suggestions": suggestions})
 
 
 if __name__ == "__main__":
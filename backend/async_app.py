@@ -0,0 +1,237 @@
+"""
+异步服务：与 backend/app.py 相同的 REST 接口，基于 aiohttp 和 AsyncElasticsearch，
+等待 ES 响应时不占用线程，单个进程可以同时处理大量请求
+
+    python -m backend.async_app
+"""
+
+import asyncio
+import itertools
+from aiohttp import web
+from backend.config import (
+    FLASK_HOST,
+    FLASK_PORT,
+    SUGGEST_FIELDS,
+    RESPONSE_COMPRESS_MIN_BYTES,
+    RESPONSE_STREAM_MIN_BYTES,
+)
+from backend.elastic.client import close_async_es_client
+from backend.search.query import QueryParams
+from backend.search.async_query_manager import get_async_query_manager
+from backend.search.documents import parse_sections, etag_matches
+from backend.responses import (
+    dumps,
+    iter_dumps,
+    read_head,
+    choose_encoding,
+    compress,
+    compress_stream,
+    weak_etag,
+)
+
+routes = web.RouteTableDef()
+
+
+def json_response(data, status=200, headers=None):
+    """与 web.json_response 相同，序列化使用 backend.responses.dumps"""
+    return web.Response(
+        body=dumps(data),
+        status=status,
+        headers=headers,
+        content_type="application/json",
+    )
+
+
+async def stream_json(request, data, headers=None):
+    """
+    逐段序列化的 JSON 响应（结果页、文书详情）。先读取 RESPONSE_STREAM_MIN_BYTES 字节，
+    读完时与 json_response 相同，由 compress_response 压缩；否则其余部分在线程池中
+    边序列化边压缩，通过 StreamResponse 分块发送
+    """
+    head, rest = read_head(iter_dumps(data), RESPONSE_STREAM_MIN_BYTES)
+    if rest is None:
+        return web.Response(body=head, headers=headers, content_type="application/json")
+    response = web.StreamResponse(headers=headers)
+    response.content_type = "application/json"
+    response.headers.add("Vary", "Accept-Encoding")
+    chunks = itertools.chain([head], rest)
+    encoding = choose_encoding(request.headers.get("Accept-Encoding"))
+    if encoding is not None:
+        response.headers["Content-Encoding"] = encoding
+        if "ETag" in response.headers:
+            response.headers["ETag"] = weak_etag(response.headers["ETag"])
+        chunks = compress_stream(chunks, encoding)
+    await response.prepare(request)
+    loop = asyncio.get_running_loop()
+    while True:
+        chunk = await loop.run_in_executor(None, next, chunks, None)
+        if chunk is None:
+            break
+        await response.write(chunk)
+    await response.write_eof()
+    return response
+
+
+@web.middleware
+async def compress_response(request, handler):
+    """
+    较大的 JSON 响应按 Accept-Encoding 压缩（与 app.py 相同），
+    超过 RESPONSE_STREAM_MIN_BYTES 的在线程池中压缩，不阻塞事件循环。
+    stream_json 流式发送的响应已自行压缩
+    """
+    response = await handler(request)
+    body = response.body if isinstance(response, web.Response) else None
+    if (
+        response.status != 200
+        or not isinstance(body, bytes)
+        or response.content_type != "application/json"
+        or "Content-Encoding" in response.headers
+        or len(body) < RESPONSE_COMPRESS_MIN_BYTES
+    ):
+        return response
+    response.headers.add("Vary", "Accept-Encoding")
+    encoding = choose_encoding(request.headers.get("Accept-Encoding"))
+    if encoding is None:
+        return response
+    if len(body) < RESPONSE_STREAM_MIN_BYTES:
+        response.body = compress(body, encoding)
+    else:
+        loop = asyncio.get_running_loop()
+        response.body = await loop.run_in_executor(None, compress, body, encoding)
+    response.headers["Content-Encoding"] = encoding
+    if "ETag" in response.headers:
+        response.headers["ETag"] = weak_etag(response.headers["ETag"])
+    return response
+
+
+def _flag(request, name):
+    return request.query.get(name, "0") in ("1", "true")
+
+
+@routes.post("/api/query")
+async def create_query(request):
+    data = await request.json()
+    params = QueryParams.from_dict(data.get("user_query", {}))
+    query_manager = get_async_query_manager()
+    query_id = await query_manager.create_query(params)
+    total_results = (await query_manager.get_query(query_id))["total_results"]
+    return json_response({"query_id": query_id, "total_results": total_results})
+
+
+@routes.post("/api/query/batch")
+async def create_queries(request):
+    data = await request.json()
+    params_list = [QueryParams.from_dict(q) for q in data.get("user_queries", [])]
+    query_manager = get_async_query_manager()
+    queries = []
+    for query_id in await query_manager.create_queries(params_list):
+        if query_id is None:
+            queries.append({"query_id": None, "error": "Search failed"})
+            continue
+        total_results = (await query_manager.get_query(query_id))["total_results"]
+        queries.append({"query_id": query_id, "total_results": total_results})
+    return json_response({"queries": queries})
+
+
+@routes.get("/api/query/{query_id}/results")
+async def get_query_results(request):
+    query_manager = get_async_query_manager()
+    result = await query_manager.get_results(
+        request.match_info["query_id"],
+        page=int(request.query.get("page", 1)),
+        page_size=int(request.query.get("page_size", 10)),
+        preview=_flag(request, "preview"),
+        ids_only=_flag(request, "ids_only"),
+    )
+    if result is None:
+        return json_response({"error": "Query not found"}, status=404)
+    return await stream_json(request, result)
+
+
+@routes.get("/api/query/{query_id}")
+async def get_query_meta(request):
+    meta = await get_async_query_manager().get_query(request.match_info["query_id"])
+    if meta is None:
+        return json_response({"error": "Query not found"}, status=404)
+    return json_response(meta)
+
+
+@routes.put("/api/query/{query_id}")
+async def update_query(request):
+    data = await request.json()
+    params = QueryParams.from_dict(data.get("user_query", {}))
+    query_manager = get_async_query_manager()
+    updated_id = await query_manager.update_query(
+        request.match_info["query_id"], params
+    )
+    if updated_id is None:
+        return json_response({"error": "Query not found"}, status=404)
+    total_results = (await query_manager.get_query(updated_id))["total_results"]
+    return json_response({"query_id": updated_id, "total_results": total_results})
+
+
+@routes.get("/api/document/{ajid}")
+async def get_document_detail(request):
+    sections = parse_sections(request.query.get("sections"))
+    query_manager = get_async_query_manager()
+    doc, etag = await query_manager.get_document(request.match_info["ajid"], sections)
+    if doc is None:
+        return json_response({"error": "Document not found"}, status=404)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("If-None-Match"), etag):
+        return web.Response(status=304, headers=headers)
+    return await stream_json(request, doc, headers=headers)
+
+
+@routes.get("/api/document/{ajid}/similar")
+async def get_similar_documents(request):
+    ajid = request.match_info["ajid"]
+    try:
+        size = int(request.query.get("size", 10))
+    except ValueError:
+        return json_response({"error": "Invalid size"}, status=400)
+    similar, stale = get_async_query_manager().get_similar_documents(ajid, size)
+    if similar is None:
+        return json_response({"error": "Similar cases not found"}, status=404)
+    return json_response({"ajId": ajid, "similar": similar, "stale": stale})
+
+
+@routes.get("/api/labels")
+async def get_all_labels(request):
+    labels = await get_async_query_manager().get_all_labels()
+    return json_response({"labels": labels})
+
+
+@routes.get("/api/facets")
+async def get_facets(request):
+    facets = await get_async_query_manager().get_facets()
+    return json_response({"facets": facets})
+
+
+@routes.get("/api/stats")
+async def get_stats(request):
+    return json_response(await get_async_query_manager().get_stats())
+
+
+@routes.get("/api/suggest")
+async def suggest(request):
+    prefix = request.query.get("q", "")
+    if not prefix:
+        return json_response({"suggestions": []})
+    suggestions = await get_async_query_manager().suggest_many(SUGGEST_FIELDS, prefix)
+    return json_response({"suggestions": suggestions})
+
+
+async def _close_es(app):
+    await close_async_es_client()
+
+
+def create_app():
+    app = web.Application(middlewares=[compress_response])
+    app.add_routes(routes)
+    app.on_cleanup.append(_close_es)
+    return app
+
+
+if __name__ == "__main__":
+    web.run_app(create_app(), host=FLASK_HOST, port=FLASK_PORT)
@@ -10,11 +10,132 @@ DOCUMENT_PATH_JSON = os.path.join(CORPUS_DIR, "document_path.json")
 COMMON_CHARGE_JSON = os.path.join(CORPUS_DIR, "common_charge.json")
 CONTROVERSIAL_CHARGE_JSON = os.path.join(CORPUS_DIR, "controversial_charge.json")
 
+# 索引运行时数据（索引代数等）
+INDEX_DATA_DIR = os.path.join(PROJECT_ROOT, "index_data")
+INDEX_GENERATION_FILE = os.path.join(INDEX_DATA_DIR, "generation")
+# 增量导入清单：已导入文件的 mtime、内容哈希和 ajId
+INDEX_MANIFEST_PATH = os.path.join(INDEX_DATA_DIR, "manifest.sqlite3")
+# 文书路径 -> ajId 缓存，避免构建标签和分组映射时重复读取文书
+AJID_TABLE_JSON = os.path.join(INDEX_DATA_DIR, "ajid_table.json")
+
 # Elasticsearch配置
 ELASTICSEARCH_HOSTS = ["http://localhost:9200"]
-INDEX_NAME = "legal_cases"
+INDEX_NAME = "legal_cases"  # 别名，指向当前版本的索引（见 backend/elastic/versions.py）
+# 全量导入完成后恢复的索引设置（导入期间副本数为 0、不自动刷新）
+INDEX_REPLICAS = 1
+INDEX_REFRESH_INTERVAL = "1s"
+# versions gc 默认保留的版本数
+INDEX_KEEP_VERSIONS = 2
+
+# Elasticsearch 客户端配置（见 backend/elastic/client.py）
+ES_CLIENT_OPTIONS = {
+    "maxsize": 25,  # 每个节点的连接池大小，不小于同时发请求的线程数
+    "http_compress": False,  # gzip 压缩请求体并接受压缩响应
+    "timeout": 10,  # 默认请求超时（秒）
+    "max_retries": 2,
+    "retry_on_timeout": False,
+    "sniff_on_start": False,  # 多节点集群可开启嗅探，自动发现和剔除节点
+    "sniff_on_connection_fail": False,
+    "sniffer_timeout": None,  # 定期嗅探的间隔（秒）
+}
+# 按调用方区分的覆盖项：interactive 为在线检索，batch 为导入、索引管理等批处理
+ES_CLIENT_PROFILES = {
+    "interactive": {},
+    "batch": {
+        "maxsize": 8,
+        "http_compress": True,  # bulk 请求体很大
+        "timeout": 60,
+        "max_retries": 3,
+        "retry_on_timeout": True,
+    },
+}
+
+# bulk 导入配置
+BULK_CHUNK_SIZE = 500  # 每批最多文档数
+BULK_MAX_CHUNK_BYTES = 10 * 1024 * 1024  # 每批最大字节数（qw 全文和补全输入都很大）
+BULK_MAX_RETRIES = 5  # 429 时的最大重试次数
+BULK_INITIAL_BACKOFF = 2  # 首次重试前等待的秒数，之后每次翻倍
+BULK_MAX_BACKOFF = 60
+BULK_DEAD_LETTER_DIR = os.path.join(INDEX_DATA_DIR, "dead_letter")  # 导入失败的文档
+
+# 检索结果配置
+RESULT_PREFETCH_SIZE = 50  # 创建查询时预取的结果条数（默认前5页）
+RESULT_FETCH_BATCH = 100  # 翻页超出已取结果时，每次至少追加拉取的条数
+RESULT_PIT_KEEP_ALIVE = None  # 如 "5m"：每个查询在自己的 point-in-time 上检索和翻页，结果一致
+RESULT_PREVIEW_LENGTH = 200  # 预览模式下长文本字段返回的片段长度（字符）
+RESULT_CACHE_MAX_BYTES = 256 * 1024 * 1024  # 结果页缓存的内存预算（字节）
+QUERY_SWEEP_INTERVAL = 60  # 过期查询的清理间隔（秒）
+SHARED_RESULT_CACHE_SIZE = 256  # 跨查询共享的结果集缓存条数
+DOCUMENT_CACHE_MAX_BYTES = 64 * 1024 * 1024  # 详情页文档缓存的内存预算（字节）
+
+# 标签与分面（keyword 字段的取值和文档数）；索引中不存在的字段自动省略
+FACET_FIELDS = ["labels", "case_charge_type", "case_type"]
+FACET_SIZE = 10000  # /api/labels、/api/facets 中每个字段最多返回的取值数
+LABEL_REFRESH_INTERVAL = 600  # 全部标签的聚合结果超过该时间（秒）后在后台刷新
+QUERY_FACET_SIZE = 20  # 每个查询随首次检索一并统计的分面取值数，0 为不统计
+
+# 搜索补全配置
+SUGGEST_FIELDS = [
+    "ajName",
+    "fymc",
+    "spry",
+    "dsr",
+    "labels",
+    "ajjbqk",
+    "cpfxgc",
+    "pjjg",
+    "qw",
+    "writName",
+]  # 支持 suggest 的字段列表
+SUGGEST_SIZE = 10  # 每个字段返回的补全条数
+SUGGEST_CACHE_SIZE = 2048  # 热门前缀缓存条数
+SUGGEST_CACHE_TTL = 600  # 前缀缓存过期时间（秒）
+# 补全字段的索引方式（由 indexer.py 使用）：
+#   mode="value"   直接使用字段取值，截断到 max_length，最多 max_inputs 个
+#   mode="phrases" 从长文本中抽取关键短语（分句、罪名），按出现次数加权，
+#                  只保留权重最高的 max_inputs 个，每个不超过 max_length 字
+SUGGEST_SCHEMA = {
+    "ajName": {"mode": "value", "max_inputs": 1, "max_length": 50},
+    "writName": {"mode": "value", "max_inputs": 1, "max_length": 50},
+    "labels": {"mode": "value", "max_inputs": 5, "max_length": 20},
+    "fymc": {"mode": "value", "max_inputs": 5, "max_length": 30},
+    "spry": {"mode": "value", "max_inputs": 10, "max_length": 20},
+    "dsr": {"mode": "value", "max_inputs": 10, "max_length": 40},
+    "ajjbqk": {"mode": "phrases", "max_inputs": 8, "max_length": 16},
+    "cpfxgc": {"mode": "phrases", "max_inputs": 8, "max_length": 16},
+    "pjjg": {"mode": "phrases", "max_inputs": 5, "max_length": 16},
+    "qw": {"mode": "phrases", "max_inputs": 10, "max_length": 16},
+}
+# 在进程内补全的短字段（词表来自索引脚本写出的快照），其余字段走ES completion
+LOCAL_SUGGEST_FIELDS = ["fymc", "spry", "dsr", "labels", "ajName", "writName"]
+SUGGEST_SNAPSHOT_JSON = os.path.join(INDEX_DATA_DIR, "suggest_snapshot.json")
+
+# 检索后端："elasticsearch"，或 "local"：进程内的 BM25 引擎，不依赖 ES 服务
+# （见 backend/search/local_engine.py，需先运行 python -m backend.search.local_engine build）
+SEARCH_BACKEND = "elasticsearch"
+LOCAL_INDEX_DIR = os.path.join(INDEX_DATA_DIR, "local_index")
+LOCAL_BM25_K1 = 1.2
+LOCAL_BM25_B = 0.75
+
+# 类似案例：离线计算每篇文档的 top-K 近邻（python -m backend.search.similar build）
+SIMILAR_INDEX_DIR = os.path.join(INDEX_DATA_DIR, "similar")
+SIMILAR_FIELDS = ["ajjbqk", "cpfxgc", "pjjg"]  # 计算 TF-IDF 向量的字段
+SIMILAR_TOP_K = 50  # 每篇文档保存的近邻数
+SIMILAR_MAX_DF = 0.5  # 出现在超过该比例文档中的词视为停用词
+SIMILAR_BLOCK_POSTINGS = 4 * 1024 * 1024  # 每块展开的倒排项上限，控制计算时的内存
+SIMILAR_DENSE_TERMS = 4096  # 文档频率最高的这些词用稠密矩阵乘法计算（内存约 文档数×4×该值 字节）
+
+# 查询状态存储："memory" 仅限单进程；多 worker 部署（如 gunicorn -w N）用 "sqlite"
+QUERY_STORE = "memory"
+QUERY_STORE_PATH = os.path.join(INDEX_DATA_DIR, "queries.sqlite3")
 
 # Flask配置
 FLASK_DEBUG = True
 FLASK_HOST = "0.0.0.0"
-FLASK_PORT = 5000
\ No newline at end of file
+FLASK_PORT = 5000
+# 响应压缩：按 Accept-Encoding 选择 br（需安装 brotli）或 gzip
+RESPONSE_COMPRESS_MIN_BYTES = 1024  # 小于该大小的响应不压缩
+RESPONSE_STREAM_MIN_BYTES = 256 * 1024  # 超过该大小的响应分块压缩、流式发送
+RESPONSE_STREAM_CHUNK = 64 * 1024  # 流式发送时每块压缩的原始字节数
+RESPONSE_GZIP_LEVEL = 6
+RESPONSE_BROTLI_QUALITY = 5
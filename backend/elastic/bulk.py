@@ -0,0 +1,289 @@
+import os
+import json
+import math
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from elasticsearch import TransportError, ConnectionError
+from elasticsearch.helpers import expand_action
+from backend.config import (
+    BULK_CHUNK_SIZE,
+    BULK_MAX_CHUNK_BYTES,
+    BULK_MAX_RETRIES,
+    BULK_INITIAL_BACKOFF,
+    BULK_MAX_BACKOFF,
+    BULK_DEAD_LETTER_DIR,
+)
+
+# 可以重试的状态码（集群繁忙）
+RETRY_STATUS = 429
+
+
+def percentile(values, q):
+    """最近秩法百分位数，values 为空时返回 0"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class BulkStats:
+    """
+    记录每批 bulk 请求的延迟和字节数，导入结束后输出汇总
+    """
+
+    def __init__(self):
+        self.latencies = []  # 每批耗时（秒），含重试
+        self.batch_bytes = []  # 每批请求体字节数（不含重试）
+        self.docs = 0
+        self.failed = 0
+        self.retries = 0
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def record_batch(self, seconds, nbytes):
+        with self._lock:
+            self.latencies.append(seconds)
+            self.batch_bytes.append(nbytes)
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def summary(self):
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        total_bytes = sum(self.batch_bytes)
+        return {
+            "docs": self.docs,
+            "failed": self.failed,
+            "batches": len(self.latencies),
+            "retries": self.retries,
+            "seconds": elapsed,
+            "docs_per_sec": self.docs / elapsed,
+            "mb_per_sec": total_bytes / elapsed / 1024 / 1024,
+            "latency_p50": percentile(self.latencies, 50),
+            "latency_p99": percentile(self.latencies, 99),
+            "bytes_p50": percentile(self.batch_bytes, 50),
+            "bytes_p99": percentile(self.batch_bytes, 99),
+        }
+
+    def report(self):
+        """汇总和直方图的文本形式"""
+        s = self.summary()
+        lines = [
+            f"导入 {s['docs']} 篇，失败 {s['failed']} 篇，{s['batches']} 批，"
+            f"重试 {s['retries']} 次，用时 {s['seconds']:.1f} 秒",
+            f"{s['docs_per_sec']:.1f} docs/sec，{s['mb_per_sec']:.2f} MB/sec，"
+            f"批延迟 p50 {s['latency_p50'] * 1000:.0f} ms / "
+            f"p99 {s['latency_p99'] * 1000:.0f} ms",
+            "批延迟分布 (ms):",
+            *histogram([v * 1000 for v in self.latencies]),
+            "批大小分布 (KB):",
+            *histogram([v / 1024 for v in self.batch_bytes]),
+        ]
+        return "\n".join(lines)
+
+
+def histogram(values, width=40):
+    """按 2 的幂分桶的文本直方图"""
+    if not values:
+        return ["  (无)"]
+    buckets = {}
+    for v in values:
+        upper = 2 ** max(0, math.ceil(math.log2(v))) if v > 1 else 1
+        buckets[upper] = buckets.get(upper, 0) + 1
+    peak = max(buckets.values())
+    lines = []
+    for upper in sorted(buckets):
+        count = buckets[upper]
+        bar = "#" * max(1, round(count / peak * width))
+        lines.append(f"  <= {upper:>8} | {bar} {count}")
+    return lines
+
+
+class DeadLetterWriter:
+    """
+    把最终失败的文档写入 JSONL 文件（每行一条：目标、状态、错误和原始文档），
+    便于排查后重新导入。第一次写入时才创建文件
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._file = None
+        self._lock = threading.Lock()
+
+    def write(self, action, status, error):
+        record = {
+            "_index": action.get("_index"),
+            "_id": action.get("_id"),
+            "status": status,
+            "error": error,
+            "_source": action.get("_source"),
+        }
+        with self._lock:
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.count += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def dead_letter_path(name):
+    return os.path.join(
+        BULK_DEAD_LETTER_DIR, f"{name}_{time.strftime('%Y%m%d%H%M%S')}.jsonl"
+    )
+
+
+class BulkIngester:
+    """
+    bulk 导入：按文档数和字节数切分批次，threads 个线程并发发送，
+    429 的文档按指数退避重试，最终失败的文档写入死信文件。
+    run() 按输入顺序逐条返回 (ok, {op_type: item})，与 helpers.streaming_bulk 相同
+    """
+
+    def __init__(
+        self,
+        es,
+        chunk_size=BULK_CHUNK_SIZE,
+        max_chunk_bytes=BULK_MAX_CHUNK_BYTES,
+        threads=1,
+        max_retries=BULK_MAX_RETRIES,
+        initial_backoff=BULK_INITIAL_BACKOFF,
+        max_backoff=BULK_MAX_BACKOFF,
+        dead_letter=None,
+    ):
+        self.es = es
+        self.chunk_size = chunk_size
+        self.max_chunk_bytes = max_chunk_bytes
+        self.threads = max(1, threads)
+        self.max_retries = max_retries
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.dead_letter = dead_letter
+        self.stats = BulkStats()
+
+    def _chunks(self, actions):
+        """切分为 [(action, 序列化后的行)] 批次"""
+        chunk, size = [], 0
+        for action in actions:
+            meta, source = expand_action(action)
+            lines = json.dumps(meta, ensure_ascii=False)
+            if source is not None:
+                lines += "\n" + json.dumps(source, ensure_ascii=False)
+            nbytes = len(lines.encode("utf-8")) + 1
+            if chunk and (
+                len(chunk) >= self.chunk_size or size + nbytes > self.max_chunk_bytes
+            ):
+                yield chunk
+                chunk, size = [], 0
+            chunk.append((action, lines))
+            size += nbytes
+        if chunk:
+            yield chunk
+
+    def _send(self, chunk):
+        """发送一批，返回与 chunk 顺序一致的 [(ok, {op_type: item})]"""
+        start = time.perf_counter()
+        results = [None] * len(chunk)
+        pending = list(range(len(chunk)))
+        nbytes = None
+        for attempt in range(self.max_retries + 1):
+            body = "\n".join(chunk[i][1] for i in pending) + "\n"
+            if nbytes is None:
+                nbytes = len(body.encode("utf-8"))  # 只统计首次发送的批大小
+            retry = []
+            try:
+                items = self.es.bulk(body=body)["items"]
+            except TransportError as e:
+                # 整个请求失败：连接错误和 429 整批重试，其余整批记为失败
+                status = e.status_code if isinstance(e.status_code, int) else 500
+                if isinstance(e, ConnectionError):
+                    status = RETRY_STATUS
+                items = [
+                    {"index": {"status": status, "error": str(e)}} for _ in pending
+                ]
+            for i, item in zip(pending, items):
+                op_type, info = next(iter(item.items()))
+                status = info.get("status", 500)
+                if status == RETRY_STATUS and attempt < self.max_retries:
+                    retry.append(i)
+                    continue
+                action = chunk[i][0]
+                info.setdefault("_id", action.get("_id"))
+                results[i] = (200 <= status < 300, {op_type: info})
+            if not retry:
+                break
+            self.stats.record_retry()
+            time.sleep(min(self.max_backoff, self.initial_backoff * 2**attempt))
+            pending = retry
+        self.stats.record_batch(time.perf_counter() - start, nbytes)
+        return results
+
+    def run(self, actions):
+        """导入 actions，逐条返回结果；失败的文档写入死信文件"""
+        with ThreadPoolExecutor(self.threads) as pool:
+            in_flight = deque()
+            for chunk in self._chunks(actions):
+                in_flight.append((chunk, pool.submit(self._send, chunk)))
+                # 限制并发中的批次数，避免整个语料堆在内存里
+                if len(in_flight) >= self.threads:
+                    yield from self._collect(*in_flight.popleft())
+            while in_flight:
+                yield from self._collect(*in_flight.popleft())
+
+    def _collect(self, chunk, future):
+        for (action, _), (ok, info) in zip(chunk, future.result()):
+            if ok:
+                self.stats.docs += 1
+            else:
+                self.stats.failed += 1
+                if self.dead_letter is not None:
+                    item = next(iter(info.values()))
+                    self.dead_letter.write(
+                        action, item.get("status"), item.get("error")
+                    )
+            yield ok, info
+
+
+def add_bulk_arguments(parser, threads=1):
+    """给导入脚本添加 bulk 相关的命令行参数"""
+    parser.add_argument(
+        "--bulk-chunk-size",
+        type=int,
+        default=BULK_CHUNK_SIZE,
+        help="每个 bulk 请求最多的文档数",
+    )
+    parser.add_argument(
+        "--bulk-max-mb",
+        type=float,
+        default=BULK_MAX_CHUNK_BYTES / 1024 / 1024,
+        help="每个 bulk 请求最大的字节数（MB）",
+    )
+    parser.add_argument(
+        "--bulk-threads", type=int, default=threads, help="并发发送 bulk 请求的线程数"
+    )
+    parser.add_argument(
+        "--bulk-retries",
+        type=int,
+        default=BULK_MAX_RETRIES,
+        help="ES 返回 429 时的最大重试次数（指数退避）",
+    )
+
+
+def bulk_ingester_from_args(es, args, dead_letter=None):
+    return BulkIngester(
+        es,
+        chunk_size=args.bulk_chunk_size,
+        max_chunk_bytes=int(args.bulk_max_mb * 1024 * 1024),
+        threads=args.bulk_threads,
+        max_retries=args.bulk_retries,
+        dead_letter=dead_letter,
+    )
@@ -1,10 +1,18 @@
-from elasticsearch import Elasticsearch
-from backend.config import ELASTICSEARCH_HOSTS, INDEX_NAME
+from backend.config import INDEX_NAME
+from backend.elastic.client import BATCH, get_es_client
+from backend.elastic.generation import bump_index_generation
+from backend.elastic.versions import current_index, list_versions
 
 if __name__ == "__main__":
-    es = Elasticsearch(hosts=ELASTICSEARCH_HOSTS)
-    if es.indices.exists(index=INDEX_NAME):
-        es.indices.delete(index=INDEX_NAME)
-        print(f"Index '{INDEX_NAME}' deleted.")
+    es = get_es_client(BATCH)
+    # 删除别名下的所有版本；旧式的同名实体索引也一并删除
+    indices = [v["index"] for v in list_versions(es)]
+    if current_index(es) is None and es.indices.exists(index=INDEX_NAME):
+        indices.append(INDEX_NAME)
+    if indices:
+        for index in indices:
+            es.indices.delete(index=index)
+        bump_index_generation()
+        print(f"Index '{INDEX_NAME}' deleted ({', '.join(indices)}).")
     else:
-        print(f"Index '{INDEX_NAME}' does not exist.")
\ No newline at end of file
+        print(f"Index '{INDEX_NAME}' does not exist.")
@@ -1,13 +1,67 @@
+import threading
 from elasticsearch import Elasticsearch
-from backend.config import ELASTICSEARCH_HOSTS
+from backend.config import ELASTICSEARCH_HOSTS, ES_CLIENT_OPTIONS, ES_CLIENT_PROFILES
 
-_es_client = None
+INTERACTIVE = "interactive"  # 在线检索：超时短，超时不重试
+BATCH = "batch"  # 导入、索引管理：超时长，压缩请求体，超时重试
 
-def get_es_client():
+_clients = {}  # 配置名 -> 同步客户端
+_async_es_client = None
+_lock = threading.Lock()
+
+
+def client_options(profile=INTERACTIVE):
+    """合并 ES_CLIENT_OPTIONS 和 profile 的覆盖项"""
+    if profile not in ES_CLIENT_PROFILES:
+        raise ValueError(f"Unknown Elasticsearch client profile: {profile}")
+    options = dict(ES_CLIENT_OPTIONS)
+    options.update(ES_CLIENT_PROFILES[profile])
+    return options
+
+
+def create_es_client(profile=INTERACTIVE):
+    """按配置新建一个 Elasticsearch client（不共享）"""
+    return Elasticsearch(hosts=ELASTICSEARCH_HOSTS, **client_options(profile))
+
+
+def get_es_client(profile=INTERACTIVE):
     """
-    获取全局唯一的 Elasticsearch client 实例
+    获取全局唯一的 Elasticsearch client 实例，每个 profile 一个，首次使用时创建（线程安全）
     """
-    global _es_client
-    if _es_client is None:
-        _es_client = Elasticsearch(hosts=ELASTICSEARCH_HOSTS)
-    return _es_client
\ No newline at end of file
+    client = _clients.get(profile)
+    if client is None:
+        with _lock:
+            client = _clients.get(profile)
+            if client is None:
+                client = _clients[profile] = create_es_client(profile)
+    return client
+
+
+def set_es_client(client, profile=INTERACTIVE):
+    """替换全局 client（基准测试等场景注入替身），返回原来的 client"""
+    with _lock:
+        previous = _clients.get(profile)
+        _clients[profile] = client
+    return previous
+
+
+def get_async_es_client():
+    """
+    获取全局唯一的 AsyncElasticsearch client 实例（需要安装 aiohttp），
+    只在异步服务的事件循环中使用，配置与 interactive 相同
+    """
+    global _async_es_client
+    if _async_es_client is None:
+        from elasticsearch import AsyncElasticsearch
+
+        _async_es_client = AsyncElasticsearch(
+            hosts=ELASTICSEARCH_HOSTS, **client_options(INTERACTIVE)
+        )
+    return _async_es_client
+
+
+async def close_async_es_client():
+    global _async_es_client
+    if _async_es_client is not None:
+        await _async_es_client.close()
+        _async_es_client = None
@@ -0,0 +1,91 @@
+import os
+import json
+import hashlib
+from backend.config import AJID_TABLE_JSON
+
+
+def load_json(path):
+    """
+    读取一篇 JSON 文书，返回 (文档, 内容 sha1)。
+    文件只读一次，哈希和解析共用同一份字节
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    return json.loads(data.decode("utf-8")), hashlib.sha1(data).hexdigest()
+
+
+def get_ajid(doc):
+    return doc.get("ajId") or doc.get("ajid")
+
+
+class AjIdTable:
+    """
+    文书路径 -> ajId 的磁盘缓存，按文件 mtime 和大小校验，
+    只有新增或修改过的文书才需要重新读取
+    """
+
+    def __init__(self, base_dir, path=AJID_TABLE_JSON):
+        self.base_dir = os.path.abspath(base_dir)
+        self.path = path
+        self._table = {}  # 相对路径 -> [mtime_ns, size, ajId]
+        self._dirty = False
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("base_dir") == self.base_dir:
+                self._table = data.get("files", {})
+        except (OSError, ValueError):
+            pass
+
+    def _stat(self, rel_path):
+        st = os.stat(os.path.join(self.base_dir, rel_path))
+        return st.st_mtime_ns, st.st_size
+
+    def get(self, rel_path):
+        """缓存有效时返回 ajId，否则返回 None（文件不存在也返回 None）"""
+        cached = self._table.get(rel_path)
+        if cached is None:
+            return None
+        try:
+            if list(self._stat(rel_path)) != cached[:2]:
+                return None
+        except OSError:
+            return None
+        return cached[2]
+
+    def set(self, rel_path, ajId):
+        """记录刚读取过的文书的 ajId"""
+        try:
+            mtime_ns, size = self._stat(rel_path)
+        except OSError:
+            return
+        self._table[rel_path] = [mtime_ns, size, ajId]
+        self._dirty = True
+
+    def lookup(self, rel_path):
+        """返回 ajId，缓存失效时读取文书；读取失败返回 None"""
+        ajId = self.get(rel_path)
+        if ajId is not None:
+            return ajId
+        try:
+            doc, _ = load_json(os.path.join(self.base_dir, rel_path))
+        except Exception as e:
+            print(f"Error reading {rel_path}: {e}")
+            return None
+        ajId = get_ajid(doc)
+        self.set(rel_path, ajId)
+        return ajId
+
+    def save(self):
+        if not self._dirty:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"base_dir": self.base_dir, "files": self._table},
+                f,
+                ensure_ascii=False,
+            )
+        os.replace(tmp_path, self.path)
+        self._dirty = False
@@ -0,0 +1,213 @@
+import re
+
+# 审判人员角色
+SPRY_ROLES = [
+    "审判长",
+    "审判员",
+    "人民陪审员",
+    "书记员",
+    "代理审判员",
+    "代理书记员",
+    "助理审判员",
+]
+
+# 当事人角色（顺序与正则交替的匹配优先级一致，不能随意调整）
+DSR_ROLES = [
+    "被告人",
+    "被害人",
+    "原告",
+    "被告",
+    "上诉人",
+    "被上诉人",
+    "申请人",
+    "被申请人",
+    "证人",
+    "被告单位",
+    "被害单位",
+    "受害人",
+    "诉讼代理人",
+    "辩护人",
+]
+
+# 实体后面必须是分隔符或结尾
+_END = r"(?=[，。；：:、,.\s]|$)"
+
+# 审判人员：只允许2-8位汉字/中点
+SPRY_PATTERN = re.compile(
+    rf"({'|'.join(SPRY_ROLES)})[：:\s]*([\u4e00-\u9fa5·]{{2,8}}){_END}"
+)
+SPRY_EXCLUDE_CHARS = frozenset(
+    "的有归案参加指定材料证言供述意见处罚家中初犯行为事实提出无视承担犯罪血液损伤陈述"
+)
+
+# 当事人（人名）：2-4位汉字/中点
+DSR_PERSON_PATTERN = re.compile(
+    rf"({'|'.join(DSR_ROLES)})[:：\s]*([\u4e00-\u9fa5·]{{2,4}}){_END}"
+)
+# 当事人（单位）：2-30位且以单位后缀结尾
+UNIT_SUFFIX = (
+    r"(?:公司|单位|医院|学校|集团|厂|店|中心|协会|银行|分局|分公司|支行|分院|分所|分队|分部)"
+)
+DSR_UNIT_PATTERN = re.compile(
+    rf"({'|'.join(DSR_ROLES)})[:：\s]*"
+    rf"([\u4e00-\u9fa5A-Za-z0-9（）()]{{2,30}}{UNIT_SUFFIX}){_END}"
+)
+DSR_EXCLUDE_PATTERN = re.compile(
+    "的|有|归案|参加|指定|材料|证言|供述|意见|处罚|家中|初犯|行为|事实|辩护人|"
+    "提出|无视|承担|犯罪|血液|损伤|陈述|证实"
+)
+
+# 法院名称：以地名/常见前缀开头，前面是句首、标点或空白，后面是分隔符或结尾
+FYMC_PREFIX = (
+    r"(?:中华人民共和国)?"
+    r"(?:最高|高级|中级|基层|铁路|海事|军事|知识产权|"
+    r"[\u4e00-\u9fa5]{2,10}(?:省|市|自治区|县|区|旗|自治州|直辖市|特别行政区))"
+)
+FYMC_PATTERN = re.compile(
+    r"(?<![^\s，。；：:、,\n])"
+    + FYMC_PREFIX
+    + r"[\u4e00-\u9fa5]{0,20}?(?:人民法院|法院|人民法庭|法庭)"
+    + _END
+)
+FYMC_EXCLUDE_WORDS = ("本院", "通过", "和", "或")
+# 法院名称都以 "法院"/"法庭" 结尾
+FYMC_KEYWORD_PATTERN = re.compile("法[院庭]")
+# 法院名称的最大长度：中华人民共和国(7) + 地名前缀(10+5) + 中间部分(20) + 人民法院(4)
+FYMC_MAX_LENGTH = 46
+# 法院名称前面的分隔符（与 FYMC_PATTERN 的后顾断言一致）
+FYMC_SEPARATOR_PATTERN = re.compile(r"[\s，。；：:、,\n]")
+
+# 角色关键词扫描器：一次扫描找出所有关键词出现位置
+ALL_ROLES = sorted(set(SPRY_ROLES + DSR_ROLES))
+ROLE_SCANNER = re.compile("|".join(ALL_ROLES))
+
+
+def _inner_offsets(keyword):
+    """
+    关键词内部可能出现另一个关键词起点的偏移（如 "被上诉人" 中的 "上诉人"），
+    扫描器不报告重叠出现，这些位置需要额外尝试
+    """
+    offsets = []
+    for j in range(1, len(keyword)):
+        rest = keyword[j:]
+        if any(r.startswith(rest) or rest.startswith(r) for r in ALL_ROLES):
+            offsets.append(j)
+    return offsets
+
+
+ROLE_INNER_OFFSETS = {role: _inner_offsets(role) for role in ALL_ROLES}
+
+
+class EntityExtractor:
+    """
+    从文书全文中抽取法院名称、审判人员和当事人。
+    角色关键词只扫描一遍全文，各实体模式只在关键词出现的位置上做锚定匹配，
+    结果与逐个模式 findall 完全一致。
+
+    extract_units：是否抽取单位当事人。旧实现的单位模式因 f-string 把 {2,30}
+    当作表达式插值而从未命中，默认关闭以保持索引内容不变
+    """
+
+    def __init__(self, extract_units=False):
+        # (实体类型, 模式, 过滤函数, 适用角色)
+        self.role_patterns = [
+            ("spry", SPRY_PATTERN, self._accept_spry, SPRY_ROLES),
+            ("dsr", DSR_PERSON_PATTERN, self._accept_person, DSR_ROLES),
+        ]
+        if extract_units:
+            self.role_patterns.append(
+                ("dsr", DSR_UNIT_PATTERN, self._accept_unit, DSR_ROLES)
+            )
+        # 扫描到的关键词 -> [(偏移, [(模式序号, 实体类型, 模式, 过滤函数)])]
+        self._plan = {role: self._plan_for(role) for role in ALL_ROLES}
+
+    def _plan_for(self, keyword):
+        """关键词本身及其内部可能的角色起点上，各需要尝试哪些模式"""
+        plan = []
+        for offset in [0] + ROLE_INNER_OFFSETS[keyword]:
+            initial = keyword[offset]
+            entries = [
+                (i, kind, pattern, accept)
+                for i, (kind, pattern, accept, roles) in enumerate(self.role_patterns)
+                if any(role[0] == initial for role in roles)
+            ]
+            if entries:
+                plan.append((offset, entries))
+        return plan
+
+    @staticmethod
+    def _accept_spry(name):
+        return 2 <= len(name) <= 8 and not SPRY_EXCLUDE_CHARS.intersection(name)
+
+    @staticmethod
+    def _accept_person(name):
+        return 2 <= len(name) <= 4 and not DSR_EXCLUDE_PATTERN.search(name)
+
+    @staticmethod
+    def _accept_unit(name):
+        return 2 <= len(name) <= 30 and not DSR_EXCLUDE_PATTERN.search(name)
+
+    def extract(self, text):
+        """返回 {"fymc": [...], "spry": [...], "dsr": [...]}，各列表已去重"""
+        return {"fymc": self.extract_fymc(text), **self.extract_roles(text)}
+
+    def extract_roles(self, text):
+        """只扫描角色关键词，返回 {"spry": [...], "dsr": [...]}"""
+        found = {"spry": {}, "dsr": {}}
+        # 每个模式各自记录上次匹配的结束位置，模拟 findall 的不重叠语义
+        next_pos = [0] * len(self.role_patterns)
+        for m in ROLE_SCANNER.finditer(text):
+            start = m.start()
+            for offset, entries in self._plan[m.group()]:
+                pos = start + offset
+                for i, kind, pattern, accept in entries:
+                    if pos < next_pos[i]:
+                        continue
+                    match = pattern.match(text, pos)
+                    if match is None:
+                        continue
+                    next_pos[i] = match.end()
+                    role, name = match.groups()
+                    if accept(name):
+                        found[kind][f"{role}:{name}"] = None
+        found["spry"] = list(found["spry"])
+        found["dsr"] = list(found["dsr"])
+        return found
+
+    @staticmethod
+    def _fymc_matches(text):
+        """
+        与 FYMC_PATTERN.findall 结果相同，但只在 "法院"/"法庭" 之前
+        FYMC_MAX_LENGTH 个字符内、紧跟分隔符的位置上尝试匹配
+        """
+        starts = []
+        scanned = 0  # 已收集候选起点的区间右端，避免相邻窗口重复
+        for m in FYMC_KEYWORD_PATTERN.finditer(text):
+            lo = max(m.start() - FYMC_MAX_LENGTH, scanned)
+            if lo == 0:
+                starts.append(0)
+            for sep in FYMC_SEPARATOR_PATTERN.finditer(text, max(lo - 1, 0), m.start()):
+                starts.append(sep.end())
+            scanned = max(scanned, m.start())
+        next_pos = 0
+        for pos in starts:
+            if pos < next_pos:
+                continue
+            match = FYMC_PATTERN.match(text, pos)
+            if match is not None:
+                next_pos = match.end()
+                yield match.group()
+
+    def extract_fymc(self, text):
+        results = {}
+        for name in self._fymc_matches(text):
+            name = name.strip("，。；：:、,. \n")
+            if 6 <= len(name) <= 30 and not any(
+                x in name for x in FYMC_EXCLUDE_WORDS
+            ):
+                results[name] = None
+        return list(results)
+
+
+# 默认实例，供索引脚本直接使用
+entity_extractor = EntityExtractor()
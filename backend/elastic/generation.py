@@ -0,0 +1,41 @@
+import os
+import threading
+from backend.config import INDEX_DATA_DIR, INDEX_GENERATION_FILE
+
+_lock = threading.Lock()
+_cached = (None, 0)  # (文件 mtime, 代数)
+
+
+def get_index_generation():
+    """
+    获取当前索引代数，每次重建索引后递增，用于使各类缓存失效
+    只在文件修改时间变化时重新读取
+    """
+    global _cached
+    try:
+        mtime = os.stat(INDEX_GENERATION_FILE).st_mtime_ns
+    except FileNotFoundError:
+        return 0
+    if _cached[0] == mtime:
+        return _cached[1]
+    with _lock:
+        try:
+            with open(INDEX_GENERATION_FILE, "r", encoding="utf-8") as f:
+                generation = int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            generation = 0
+        _cached = (mtime, generation)
+    return generation
+
+
+def bump_index_generation():
+    """
+    索引代数加一（由索引脚本在导入完成后调用），返回新的代数
+    """
+    os.makedirs(INDEX_DATA_DIR, exist_ok=True)
+    generation = get_index_generation() + 1
+    tmp_path = INDEX_GENERATION_FILE + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(str(generation))
+    os.replace(tmp_path, INDEX_GENERATION_FILE)
+    return generation
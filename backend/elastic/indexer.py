@@ -1,11 +1,39 @@
 import os
 import json
 import re
-from elasticsearch import Elasticsearch, helpers
+import heapq
+import argparse
+import multiprocessing
 from tqdm import tqdm
+from backend.config import SUGGEST_SCHEMA
+from backend.elastic.bulk import (
+    DeadLetterWriter,
+    add_bulk_arguments,
+    bulk_ingester_from_args,
+    dead_letter_path,
+)
+from backend.elastic.client import BATCH, get_es_client
+from backend.elastic.corpus import AjIdTable, get_ajid, load_json
+from backend.elastic.extractor import entity_extractor
+from backend.elastic.generation import bump_index_generation
+from backend.elastic.manifest import (
+    IndexManifest,
+    ManifestRecorder,
+    delete_docs,
+    rebuild_suggest_snapshot,
+    remove_deleted,
+)
+from backend.elastic.versions import (
+    create_versioned_index,
+    current_index,
+    finalize_index,
+    is_unfinished,
+    swap_alias,
+    with_index,
+)
+from backend.search.suggest_index import SuggestSnapshotBuilder
 
 # 配置
-ELASTICSEARCH_HOSTS = ["http://localhost:9200"]
 INDEX_NAME = "legal_cases"
 CANDIDATES_DIR = "LeCaRD/data/candidates"
 DOCUMENTS_DIR = "corpus/documents"
@@ -13,245 +41,373 @@ COMMON_CHARGE_JSON = "corpus/common_charge.json"
 CONTROVERSIAL_CHARGE_JSON = "corpus/controversial_charge.json"
 
 
-def build_ajid_label_map():
+def build_ajid_label_map(ajid_table=None):
+    """
+    ajId -> 罪名标签列表。文书路径到 ajId 的对应关系取自 AjIdTable 缓存，
+    只有缓存失效的文书才会被重新读取
+    """
+    if ajid_table is None:
+        ajid_table = AjIdTable(DOCUMENTS_DIR)
     label_map = {}
-    with open(COMMON_CHARGE_JSON, "r", encoding="utf-8") as f:
-        common = json.load(f)
-    for charge, paths in common.items():
-        for path in paths:
-            abs_path = os.path.join(DOCUMENTS_DIR, path)
-            try:
-                with open(abs_path, "r", encoding="utf-8") as fdoc:
-                    doc = json.load(fdoc)
-                ajId = doc.get("ajId") or doc.get("ajid")
+    for charge_json in (COMMON_CHARGE_JSON, CONTROVERSIAL_CHARGE_JSON):
+        with open(charge_json, "r", encoding="utf-8") as f:
+            charges = json.load(f)
+        for charge, paths in charges.items():
+            for path in paths:
+                ajId = ajid_table.lookup(path)
                 if ajId:
                     label_map.setdefault(ajId, set()).add(charge)
-            except Exception as e:
-                print(f"Error reading {abs_path}: {e}")
-    with open(CONTROVERSIAL_CHARGE_JSON, "r", encoding="utf-8") as f:
-        controversial = json.load(f)
-    for charge, paths in controversial.items():
-        for path in paths:
-            abs_path = os.path.join(DOCUMENTS_DIR, path)
-            try:
-                with open(abs_path, "r", encoding="utf-8") as fdoc:
-                    doc = json.load(fdoc)
-                ajId = doc.get("ajId") or doc.get("ajid")
-                if ajId:
-                    label_map.setdefault(ajId, set()).add(charge)
-            except Exception as e:
-                print(f"Error reading {abs_path}: {e}")
+    ajid_table.save()
     return {k: list(v) for k, v in label_map.items()}
 
 
 def extract_spry(text):
-    # 只允许2-8位汉字/中点，且后面必须是分隔符或结尾
-    pattern = r"(审判长|审判员|人民陪审员|书记员|代理审判员|代理书记员|助理审判员)[：:\s]*([\u4e00-\u9fa5·]{2,8})(?=[，。；：:、,.\s]|$)"
-    results = []
-    for role, name in re.findall(pattern, text):
-        # 严格限制姓名长度和内容
-        if 2 <= len(name) <= 8 and all(
-            c not in name
-            for c in "的有归案参加指定材料证言供述意见处罚家中初犯行为事实提出无视承担犯罪血液损伤陈述"
-        ):
-            results.append(f"{role}:{name}")
-    return list(set(results))
+    return entity_extractor.extract_roles(text)["spry"]
 
 
 def extract_fymc(text):
-    # 只匹配以地名/常见前缀开头，且前面是句首、标点、空格、换行，后面是分隔符或结尾
-    prefix = (
-        r"(?:中华人民共和国)?"
-        r"(?:最高|高级|中级|基层|铁路|海事|军事|知识产权|"
-        r"[\u4e00-\u9fa5]{2,10}(?:省|市|自治区|县|区|旗|自治州|直辖市|特别行政区))"
-    )
-    pattern = (
-        r"(?<![^\s，。；：:、,\n])"  # 前面不能是汉字或字母数字
-        + prefix
-        + r"[\u4e00-\u9fa5]{0,20}?(?:人民法院|法院|人民法庭|法庭)"
-        r"(?=[，。；：:、,.\s]|$)"
-    )
-    results = []
-    for name in re.findall(pattern, text):
-        name = name.strip("，。；：:、,. \n")
-        # 排除明显无效内容
-        if 6 <= len(name) <= 30 and not any(
-            x in name for x in ["本院", "通过", "和", "或"]
-        ):
-            results.append(name)
-    return list(set(results))
+    return entity_extractor.extract_fymc(text)
 
 
 def extract_dsr(text):
-    roles = [
-        "被告人",
-        "被害人",
-        "原告",
-        "被告",
-        "上诉人",
-        "被上诉人",
-        "申请人",
-        "被申请人",
-        "证人",
-        "被告单位",
-        "被害单位",
-        "受害人",
-        "诉讼代理人",
-        "辩护人",
-    ]
-    unit_suffix = r"(?:公司|单位|医院|学校|集团|厂|店|中心|协会|银行|分局|分公司|支行|分院|分所|分队|分部)"
-    # 人名2-4位汉字/中点，且后面必须是分隔符或结尾
-    person_pattern = (
-        rf"({'|'.join(roles)})[:：\s]*([\u4e00-\u9fa5·]{{2,4}})(?=[，。；：:、,.\s]|$)"
-    )
-    # 单位名2-30位且以后缀结尾，且后面必须是分隔符或结尾
-    unit_pattern = rf"({'|'.join(roles)})[:：\s]*([\u4e00-\u9fa5A-Za-z0-9（）()]{2,30}{unit_suffix})(?=[，。；：:、,.\s]|$)"
-    # 排除词
-    exclude_words = "的|有|归案|参加|指定|材料|证言|供述|意见|处罚|家中|初犯|行为|事实|辩护人|提出|无视|承担|犯罪|血液|损伤|陈述|处罚|证实|意见|家中|初犯|行为|事实|参加|指定|提出|无视|承担|犯罪|血液|损伤|陈述|处罚|供述|事实|材料|证实"
-
-    results = []
-    # 人名
-    for role, name in re.findall(person_pattern, text):
-        # 严格限制姓名长度和内容
-        if 2 <= len(name) <= 4 and not re.search(rf"({exclude_words})", name):
-            results.append(f"{role}:{name}")
-    # 单位名
-    for role, name in re.findall(unit_pattern, text):
-        if 2 <= len(name) <= 30 and not re.search(rf"({exclude_words})", name):
-            results.append(f"{role}:{name}")
-    return list(set(results))
+    return entity_extractor.extract_roles(text)["dsr"]
+
+
+# 长文本分句用的分隔符
+CLAUSE_SPLIT_PATTERN = re.compile(r'[，。；：、,.;:！？!?\s（）()“”"《》【】]+')
+# 含数字的分句（日期、金额等）不作为补全短语
+DIGIT_PATTERN = re.compile(r"\d")
+# “犯/构成/以 XX罪” 形式的罪名
+CHARGE_PATTERN = re.compile(r"(?:犯|构成|以)([\u4e00-\u9fa5]{2,10}?罪)")
+# 罪名短语的权重（相当于出现次数）
+CHARGE_WEIGHT = 3
+# 短语最短长度，过短的分句没有补全价值
+MIN_PHRASE_LENGTH = 4
+
+
+def extract_key_phrases(text, max_inputs, max_length):
+    """
+    从长文本中抽取补全短语：长度合适的分句和罪名，
+    按出现次数加权，只保留权重最高的 max_inputs 个
+    """
+    weights = {}
+    for charge in CHARGE_PATTERN.findall(text):
+        weights[charge] = weights.get(charge, 0) + CHARGE_WEIGHT
+    for clause in CLAUSE_SPLIT_PATTERN.split(text):
+        if not MIN_PHRASE_LENGTH <= len(clause) <= max_length:
+            continue
+        if DIGIT_PATTERN.search(clause):
+            continue
+        weights[clause] = weights.get(clause, 0) + 1
+    top = heapq.nlargest(max_inputs, weights.items(), key=lambda item: item[1])
+    return [{"input": phrase, "weight": weight} for phrase, weight in top]
+
+
+def build_suggest_fields(source):
+    """按 SUGGEST_SCHEMA 生成各 *_suggest 字段的补全输入"""
+    suggest = {}
+    for field, schema in SUGGEST_SCHEMA.items():
+        value = source.get(field)
+        if not value:
+            continue
+        if schema["mode"] == "phrases":
+            inputs = extract_key_phrases(
+                value, schema["max_inputs"], schema["max_length"]
+            )
+        else:
+            values = [value] if isinstance(value, str) else value
+            inputs = [
+                {"input": v[: schema["max_length"]]}
+                for v in values[: schema["max_inputs"]]
+                if v
+            ]
+        if inputs:
+            suggest[f"{field}_suggest"] = inputs
+    return suggest
 
 
 def create_index(es):
-    if es.indices.exists(index=INDEX_NAME):
-        es.indices.delete(index=INDEX_NAME)
-    es.indices.create(
-        index=INDEX_NAME,
-        body={
+    """创建一个新的版本索引并返回索引名，别名在导入完成后才切换过来"""
+    properties = {
+        "ajId": {"type": "keyword"},
+        "ajName": {
+            "type": "text",
+            "analyzer": "ik_smart",
+            "similarity": "custom_bm25",
+        },
+        "fymc": {"type": "text", "analyzer": "ik_smart"},
+        "spry": {"type": "text", "analyzer": "ik_smart"},
+        "dsr": {"type": "text", "analyzer": "ik_smart"},
+        "ajjbqk": {
+            "type": "text",
+            "analyzer": "ik_smart",
+            "similarity": "custom_bm25",
+        },
+        "cpfxgc": {
+            "type": "text",
+            "analyzer": "ik_smart",
+            "similarity": "custom_bm25",
+        },
+        "pjjg": {
+            "type": "text",
+            "analyzer": "ik_smart",
+            "similarity": "custom_bm25",
+        },
+        "qw": {
+            "type": "text",
+            "analyzer": "ik_smart",
+            "similarity": "custom_bm25",
+        },
+        "writId": {"type": "keyword"},
+        "writName": {"type": "text", "analyzer": "ik_smart"},
+        "labels": {"type": "keyword"},
+    }
+    # 补全字段
+    for field, schema in SUGGEST_SCHEMA.items():
+        properties[f"{field}_suggest"] = {
+            "type": "completion",
+            "max_input_length": schema["max_length"],
+        }
+    return create_versioned_index(
+        es,
+        {
             "settings": {"index": {"similarity": {"custom_bm25": {"type": "BM25"}}}},
             "mappings": {
-                "properties": {
-                    "ajId": {"type": "keyword"},
-                    "ajName": {
-                        "type": "text",
-                        "analyzer": "ik_smart",
-                        "similarity": "custom_bm25",
-                    },
-                    "ajName_suggest": {"type": "completion"},  # 新增
-                    "fymc": {"type": "text", "analyzer": "ik_smart"},
-                    "fymc_suggest": {"type": "completion"},  # 新增
-                    "spry": {"type": "text", "analyzer": "ik_smart"},
-                    "spry_suggest": {"type": "completion"},  # 新增
-                    "dsr": {"type": "text", "analyzer": "ik_smart"},
-                    "dsr_suggest": {"type": "completion"},  # 新增
-                    "ajjbqk": {
-                        "type": "text",
-                        "analyzer": "ik_smart",
-                        "similarity": "custom_bm25",
-                    },
-                    "ajjbqk_suggest": {"type": "completion"},  # 新增
-                    "cpfxgc": {
-                        "type": "text",
-                        "analyzer": "ik_smart",
-                        "similarity": "custom_bm25",
-                    },
-                    "cpfxgc_suggest": {"type": "completion"},  # 新增
-                    "pjjg": {
-                        "type": "text",
-                        "analyzer": "ik_smart",
-                        "similarity": "custom_bm25",
-                    },
-                    "pjjg_suggest": {"type": "completion"},  # 新增
-                    "qw": {
-                        "type": "text",
-                        "analyzer": "ik_smart",
-                        "similarity": "custom_bm25",
-                    },
-                    "qw_suggest": {"type": "completion"},  # 新增
-                    "writId": {"type": "keyword"},
-                    "writName": {"type": "text", "analyzer": "ik_smart"},
-                    "writName_suggest": {"type": "completion"},  # 新增
-                    "labels": {"type": "keyword"},
-                }
+                # 补全输入只用于构建补全结构，不存入 _source
+                "_source": {"excludes": ["*_suggest"]},
+                "properties": properties,
             },
         },
+        INDEX_NAME,
     )
 
 
-def generate_docs(label_map):
-    for root, dirs, files in os.walk(CANDIDATES_DIR):
-        for fname in files:
-            if not fname.endswith(".json"):
-                continue
-            fpath = os.path.join(root, fname)
-            with open(fpath, "r", encoding="utf-8") as f:
-                doc = json.load(f)
-            ajId = doc.get("ajId") or doc.get("ajid")
-            if not ajId:
-                print(f"Warning: {fname} missing ajId")
-                continue
-            labels = label_map.get(ajId, [])
-            text = " ".join(
-                [
-                    doc.get("qw", ""),
-                    doc.get("ajjbqk", ""),
-                    doc.get("cpfxgc", ""),
-                    doc.get("pjjg", ""),
-                    doc.get("ajName", ""),
-                    doc.get("writName", ""),
-                ]
-            )
-            fymc = extract_fymc(text)
-            spry = extract_spry(text)
-            dsr = extract_dsr(text)
-            yield {
-                "_index": INDEX_NAME,
-                "_id": ajId,
-                "_source": {
-                    "ajId": ajId,
-                    "ajName": doc.get("ajName"),
-                    "ajName_suggest": doc.get("ajName"),  # 新增
-                    "ajjbqk": doc.get("ajjbqk"),
-                    "ajjbqk_suggest": doc.get("ajjbqk"),  # 新增
-                    "cpfxgc": doc.get("cpfxgc"),
-                    "cpfxgc_suggest": doc.get("cpfxgc"),  # 新增
-                    "pjjg": doc.get("pjjg"),
-                    "pjjg_suggest": doc.get("pjjg"),  # 新增
-                    "qw": doc.get("qw"),
-                    "qw_suggest": doc.get("qw"),  # 新增
-                    "writId": doc.get("writId"),
-                    "writName": doc.get("writName"),
-                    "writName_suggest": doc.get("writName"),  # 新增
-                    "labels": labels,
-                    "fymc": fymc,
-                    "fymc_suggest": fymc,  # 新增
-                    "spry": spry,
-                    "spry_suggest": spry,  # 新增
-                    "dsr": dsr,
-                    "dsr_suggest": dsr,  # 新增
-                },
-            }
-
-
-if __name__ == "__main__":
-    es = Elasticsearch(
-        hosts=ELASTICSEARCH_HOSTS,
-        timeout=60,  # 请求超时时间（秒）
-        max_retries=3,  # 可选：重试次数
-        retry_on_timeout=True,  # 可选：超时重试
-    )
-    label_map = build_ajid_label_map()
-    create_index(es)
+def list_candidate_files():
+    """列出所有候选文档路径"""
     files = []
     for root, dirs, fs in os.walk(CANDIDATES_DIR):
         for f in fs:
             if f.endswith(".json"):
                 files.append(os.path.join(root, f))
-    print(f"Found {len(files)} candidate documents. Start importing...")
-    for ok, _ in tqdm(
-        helpers.streaming_bulk(es, generate_docs(label_map)),
-        total=len(files),
-        desc="Importing",
-    ):
-        pass
-    print("LeCaRD候选文档导入完成！")
+    return sorted(files)
+
+
+def parse_candidate(fpath, label_map):
+    """
+    读取一篇候选文档并抽取实体，返回 bulk 动作；缺少 ajId 时返回 None
+    """
+    doc, _ = load_json(fpath)
+    return build_candidate_action(fpath, doc, label_map)
+
+
+def build_candidate_action(fpath, doc, label_map):
+    ajId = get_ajid(doc)
+    if not ajId:
+        print(f"Warning: {os.path.basename(fpath)} missing ajId")
+        return None
+    labels = label_map.get(ajId, [])
+    text = " ".join(
+        [
+            doc.get("qw", ""),
+            doc.get("ajjbqk", ""),
+            doc.get("cpfxgc", ""),
+            doc.get("pjjg", ""),
+            doc.get("ajName", ""),
+            doc.get("writName", ""),
+        ]
+    )
+    entities = entity_extractor.extract(text)
+    source = {
+        "ajId": ajId,
+        "ajName": doc.get("ajName"),
+        "ajjbqk": doc.get("ajjbqk"),
+        "cpfxgc": doc.get("cpfxgc"),
+        "pjjg": doc.get("pjjg"),
+        "qw": doc.get("qw"),
+        "writId": doc.get("writId"),
+        "writName": doc.get("writName"),
+        "labels": labels,
+        "fymc": entities["fymc"],
+        "spry": entities["spry"],
+        "dsr": entities["dsr"],
+    }
+    source.update(build_suggest_fields(source))
+    return {
+        "_index": INDEX_NAME,
+        "_id": ajId,
+        "_source": source,
+    }
+
+
+# 工作进程内的标签映射，由进程池 initializer 设置，避免每个任务重复传输
+_worker_label_map = None
+
+
+def _init_worker(label_map):
+    global _worker_label_map
+    _worker_label_map = label_map
+
+
+def _parse_file(fpath, label_map):
+    doc, digest = load_json(fpath)
+    return fpath, build_candidate_action(fpath, doc, label_map), digest
+
+
+def _parse_in_worker(fpath):
+    return _parse_file(fpath, _worker_label_map)
+
+
+def parse_files(label_map, files, workers=1, chunk_size=16, ordered=True):
+    """
+    解析文档，生成 (文件路径, bulk 动作, 内容哈希)，缺少 ajId 的文件动作为 None。
+    workers > 1 时用进程池并行解析和抽取实体，ordered=False 时按完成顺序输出（吞吐更高）
+    """
+    if workers <= 1:
+        for fpath in files:
+            yield _parse_file(fpath, label_map)
+        return
+    with multiprocessing.Pool(
+        workers, initializer=_init_worker, initargs=(label_map,)
+    ) as pool:
+        imap = pool.imap if ordered else pool.imap_unordered
+        yield from imap(_parse_in_worker, files, chunksize=chunk_size)
+
+
+def generate_docs(label_map, files=None, workers=1, chunk_size=16, ordered=True):
+    """生成 bulk 动作"""
+    if files is None:
+        files = list_candidate_files()
+    for _, action, _ in parse_files(label_map, files, workers, chunk_size, ordered):
+        if action is not None:
+            yield action
+
+
+def _label_meta(action):
+    return sorted(action["_source"]["labels"])
+
+
+def plan_import(es, manifest, files, label_map, incremental):
+    """
+    确定本次需要导入的文件，返回 (待导入的 ManifestEntry 列表,
+    已移除的 ManifestEntry 列表, 写入的版本索引名, 是否续传)。增量模式下按清单比较 mtime、内容哈希和标签：
+    清单对应别名指向的索引时直接写入该索引（版本索引名为 None）；
+    清单对应上次中断的全量导入时续传到那个版本索引，完成后再切换别名。
+    其余情况（或非增量模式）新建一个版本索引
+    """
+    recorded = manifest.index_name()
+    if incremental and recorded is not None:
+        if recorded == current_index(es, INDEX_NAME):
+            return (*_plan_incremental(manifest, files, label_map), None, False)
+        if is_unfinished(es, recorded):
+            print(f"续传上次中断的全量导入：{recorded}")
+            return (*_plan_incremental(manifest, files, label_map), recorded, True)
+    if incremental:
+        print("清单与当前索引不一致，改为全量导入")
+    target = create_index(es)
+    manifest.reset(target)
+    # 全量导入时哈希在解析时顺带计算，每个文件只读一次
+    changed, _, _ = manifest.plan(files, hash_files=False)
+    return changed, [], target, False
+
+
+def _plan_incremental(manifest, files, label_map):
+    """
+    按清单确定变化的文件，返回 (待导入的 ManifestEntry 列表, 已移除的 ManifestEntry 列表)。
+    已移除的文件在对应文档删除成功后才从清单中去掉（见 remove_deleted）
+    """
+    # 标签按清单中记录的 ajId 查找，标签变化的文档也要重新导入
+    meta = {
+        path: sorted(label_map.get(entry.doc_id, []))
+        for path, entry in manifest.entries().items()
+        if entry.doc_id
+    }
+    changed, removed, touched = manifest.plan(files, meta)
+    manifest.record(touched)
+    return changed, removed
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="导入 LeCaRD 候选文档到 Elasticsearch")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="解析和实体抽取的进程数，1 表示在主进程内串行处理",
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=16, help="每次分派给工作进程的文档数"
+    )
+    parser.add_argument(
+        "--unordered", action="store_true", help="按解析完成顺序导入，不保持文件顺序"
+    )
+    add_bulk_arguments(parser, threads=4)
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="增量导入：只导入新增或修改的文档并删除已移除的文档，中断后可重新运行续传",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    es = get_es_client(BATCH)
+    label_map = build_ajid_label_map()
+    files = list_candidate_files()
+    manifest = IndexManifest("candidates")
+    entries, removed, target, resumed = plan_import(
+        es, manifest, files, label_map, args.incremental
+    )
+    index = target or INDEX_NAME
+    if removed:
+        print(f"删除 {remove_deleted(es, index, manifest, removed)} 篇已移除的文档")
+    print(
+        f"Found {len(files)} candidate documents, {len(entries)} to import. "
+        "Start importing..."
+    )
+    recorder = ManifestRecorder(
+        manifest, entries, meta_of=_label_meta, batch_size=args.bulk_chunk_size
+    )
+    parsed = parse_files(
+        label_map,
+        [entry.path for entry in entries],
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        ordered=not args.unordered,
+    )
+    # 全量导入写入新版本索引，同时统计短字段词表，供后端进程内补全使用
+    snapshot = SuggestSnapshotBuilder()
+    actions = recorder.track(parsed)
+    if target is not None:
+        actions = snapshot.track(with_index(actions, target))
+    dead_letter = DeadLetterWriter(dead_letter_path("candidates"))
+    ingester = bulk_ingester_from_args(es, args, dead_letter)
+    for ok, info in tqdm(ingester.run(actions), total=len(entries), desc="Importing"):
+        # 每条确认的结果记入清单，按批提交
+        recorder.acknowledge(ok, info)
+    recorder.flush()
+    dead_letter.close()
+    if recorder.stale_ids:
+        _, failed = delete_docs(es, index, recorder.stale_ids)
+        if failed:
+            print(f"{len(failed)} 篇旧文档删除失败：{failed}")
+    if target is None:
+        rebuild_suggest_snapshot(es, INDEX_NAME)
+        generation = bump_index_generation()
+    else:
+        # 恢复设置、合并段、预热后再切换别名，导入期间检索不受影响
+        finalize_index(es, target)
+        generation = swap_alias(es, target, INDEX_NAME)
+        if resumed:
+            # 本次只导入了中断后剩余的文档，词表从整个索引重新统计
+            rebuild_suggest_snapshot(es, target)
+        else:
+            snapshot.write()
+    manifest.close()
+    print(ingester.stats.report())
+    if dead_letter.count:
+        print(f"{dead_letter.count} 篇导入失败，已写入 {dead_letter.path}")
+    print(
+        f"LeCaRD候选文档导入完成！当前索引: {current_index(es, INDEX_NAME)}，"
+        f"索引代数: {generation}"
+    )
@@ -1,9 +1,33 @@
 import os
 import json
-from elasticsearch import Elasticsearch, helpers
+import argparse
 from tqdm import tqdm
+from backend.elastic.bulk import (
+    DeadLetterWriter,
+    add_bulk_arguments,
+    bulk_ingester_from_args,
+    dead_letter_path,
+)
+from backend.elastic.client import BATCH, get_es_client
+from backend.elastic.corpus import AjIdTable, get_ajid, load_json
+from backend.elastic.generation import bump_index_generation
+from backend.elastic.manifest import (
+    IndexManifest,
+    ManifestRecorder,
+    delete_docs,
+    rebuild_suggest_snapshot,
+    remove_deleted,
+)
+from backend.elastic.versions import (
+    create_versioned_index,
+    current_index,
+    finalize_index,
+    is_unfinished,
+    swap_alias,
+    with_index,
+)
+from backend.search.suggest_index import SuggestSnapshotBuilder
 from backend.config import (
-    ELASTICSEARCH_HOSTS,
     INDEX_NAME,
     DOCUMENT_PATH_JSON,
     COMMON_CHARGE_JSON,
@@ -66,98 +90,116 @@ def load_charge_labels():
     return label_map
 
 
-def get_ajid_from_path(path):
+def build_group_ajid_map(doc_items, ajid_table):
     """
-    从文书路径读取ajid
-    """
-    abs_path = os.path.join(DOCUMENTS_DIR, path)
-    try:
-        with open(abs_path, "r", encoding="utf-8") as f:
-            doc = json.load(f)
-        return doc.get("ajId")
-    except Exception:
-        return None
-
-
-def build_group_ajid_map(doc_items):
-    """
-    构建 retrial_group_id -> [ajid, ...] 的映射
+    构建 retrial_group_id -> [ajid, ...] 的映射（ajId 取自 AjIdTable 缓存）
     """
     group_map = {}
     for item in doc_items:
         if item["retrial_group_id"]:
-            ajid = get_ajid_from_path(item["path"])
+            ajid = ajid_table.lookup(item["path"])
             if ajid:
                 group_map.setdefault(item["retrial_group_id"], []).append(ajid)
     return group_map
 
 
+def iter_units(doc_items):
+    """
+    按导入单元分组：single 文书各自一组，同一 retrial 分组的文书一组
+    （load_document_paths 输出的同组文书是相邻的）
+    """
+    unit = []
+    for item in doc_items:
+        if unit and (
+            item["retrial_group_id"] is None
+            or item["retrial_group_id"] != unit[0]["retrial_group_id"]
+        ):
+            yield unit
+            unit = []
+        unit.append(item)
+    if unit:
+        yield unit
+
+
 def create_index(es):
     """
-    创建ES索引，包含所有需要的字段
-    """
-    if not es.indices.exists(index=INDEX_NAME):
-        es.indices.create(
-            index=INDEX_NAME,
-            body={
-                "mappings": {
-                    "properties": {
-                        "ajId": {"type": "keyword"},  # 案件ID
-                        "ajName": {
-                            "type": "text",
-                            "analyzer": "ik_smart",
-                        },  # 案件名称
-                        "ajjbqk": {
-                            "type": "text",
-                            "analyzer": "ik_smart",
-                        },  # 案件基本情况
-                        "cpfxgc": {
-                            "type": "text",
-                            "analyzer": "ik_smart",
-                        },  # 裁判分析过程
-                        "pjjg": {"type": "text", "analyzer": "ik_smart"},  # 判决结果
-                        "qw": {"type": "text", "analyzer": "ik_smart"},  # 全文
-                        "writId": {"type": "keyword"},  # 文书ID
-                        "writName": {
-                            "type": "text",
-                            "analyzer": "ik_smart",
-                        },  # 文书名称
-                        "labels": {
-                            "type": "keyword"
-                        },  # 标签列表: ["盗窃罪", "故意伤害罪"]
-                        "case_charge_type": {
-                            "type": "keyword"
-                        },  # 案件类型: "common" 或 "controversial"
-                        "case_type": {
-                            "type": "keyword"
-                        },  # 案件类型: "single" 或 "retrial"
-                        "retrial_group_id": {"type": "keyword"},  # retrial分组ID
-                        "group_ajids": {"type": "keyword"},  # 同组所有案件ID列表
-                    }
-                },
+    创建新版本的ES索引（包含所有需要的字段）并返回索引名，别名在导入完成后才切换
+    """
+    return create_versioned_index(
+        es,
+        {
+            "mappings": {
+                "properties": {
+                    "ajId": {"type": "keyword"},  # 案件ID
+                    "ajName": {
+                        "type": "text",
+                        "analyzer": "ik_smart",
+                    },  # 案件名称
+                    "ajjbqk": {
+                        "type": "text",
+                        "analyzer": "ik_smart",
+                    },  # 案件基本情况
+                    "cpfxgc": {
+                        "type": "text",
+                        "analyzer": "ik_smart",
+                    },  # 裁判分析过程
+                    "pjjg": {"type": "text", "analyzer": "ik_smart"},  # 判决结果
+                    "qw": {"type": "text", "analyzer": "ik_smart"},  # 全文
+                    "writId": {"type": "keyword"},  # 文书ID
+                    "writName": {
+                        "type": "text",
+                        "analyzer": "ik_smart",
+                    },  # 文书名称
+                    "labels": {
+                        "type": "keyword"
+                    },  # 标签列表: ["盗窃罪", "故意伤害罪"]
+                    "case_charge_type": {
+                        "type": "keyword"
+                    },  # 案件类型: "common" 或 "controversial"
+                    "case_type": {
+                        "type": "keyword"
+                    },  # 案件类型: "single" 或 "retrial"
+                    "retrial_group_id": {"type": "keyword"},  # retrial分组ID
+                    "group_ajids": {"type": "keyword"},  # 同组所有案件ID列表
+                }
             },
-        )
+        },
+    )
 
 
-def generate_docs(doc_items, label_map, group_ajid_map):
-    for item in doc_items:
-        rel_path = item["path"]
-        abs_path = os.path.join(DOCUMENTS_DIR, rel_path)
-        try:
-            with open(abs_path, "r", encoding="utf-8") as f:
-                doc = json.load(f)
+def parse_items(doc_items, label_map, ajid_table):
+    """
+    单遍扫描：每篇文书只读取一次，生成 (文书路径, bulk 动作, 内容哈希)，
+    处理失败的文书动作为 None。retrial 分组整组读取，组内 ajId 直接取自刚读到的文书，
+    不在本次导入范围内的同组文书 ajId 取自 AjIdTable
+    """
+    for unit in iter_units(doc_items):
+        loaded = {}  # 相对路径 -> (文档, 内容哈希)
+        for item in unit:
+            rel_path = item["path"]
             try:
-                ajId = doc.get("ajId")
-            except KeyError:
-                ajId = get_ajid_from_path(rel_path)
-                print(f"Warning: Missing ajId in {rel_path}, using fallback method")
-            group_ajids = []
-            if item["retrial_group_id"]:
-                group_ajids = group_ajid_map.get(item["retrial_group_id"], [])
+                loaded[rel_path] = load_json(os.path.join(DOCUMENTS_DIR, rel_path))
+            except Exception as e:
+                print(f"Error processing {rel_path}: {e}")
+                continue
+            ajid_table.set(rel_path, get_ajid(loaded[rel_path][0]))
+        group_ajids = []
+        if unit[0]["retrial_group_id"]:
+            for path in unit[0]["group_paths"]:
+                ajid = ajid_table.lookup(path)
+                if ajid:
+                    group_ajids.append(ajid)
+        for item in unit:
+            rel_path = item["path"]
+            if rel_path not in loaded:
+                yield rel_path, None, None
+                continue
+            doc, digest = loaded[rel_path]
+            ajId = doc.get("ajId")
             label_info = label_map.get(
                 rel_path, {"labels": [], "case_charge_type": None}
             )
-            yield {
+            yield rel_path, {
                 "_index": INDEX_NAME,
                 "_id": ajId,
                 "_source": {
@@ -175,22 +217,145 @@ def generate_docs(doc_items, label_map, group_ajid_map):
                     "retrial_group_id": item["retrial_group_id"],
                     "group_ajids": group_ajids if group_ajids else [ajId],
                 },
-            }
-        except Exception as e:
-            print(f"Error processing {rel_path}: {e}")
+            }, digest
+
+
+def generate_docs(doc_items, label_map, ajid_table):
+    for _, action, _ in parse_items(doc_items, label_map, ajid_table):
+        if action is not None:
+            yield action
+
+
+def live_index(es):
+    """
+    当前在用的索引：别名指向的版本索引，或之前直接以 INDEX_NAME 创建的旧式索引；
+    都没有时返回 None
+    """
+    index = current_index(es)
+    if index is None and es.indices.exists(index=INDEX_NAME):
+        index = INDEX_NAME
+    return index
+
+
+def item_meta(item, label_map, group_ajid_map):
+    """
+    文书内容之外决定索引文档的信息（标签、类型、分组），变化时需要重新导入
+    """
+    label_info = label_map.get(item["path"], {"labels": [], "case_charge_type": None})
+    return {
+        "labels": label_info["labels"],
+        "case_charge_type": label_info["case_charge_type"],
+        "case_type": item["case_type"],
+        "retrial_group_id": item["retrial_group_id"],
+        "group_ajids": group_ajid_map.get(item["retrial_group_id"], []),
+    }
+
+
+def action_meta(action):
+    """与 item_meta 相同的信息，从已生成的 bulk 动作中取"""
+    source = action["_source"]
+    group_ajids = source["group_ajids"] if source["retrial_group_id"] else []
+    return {
+        "labels": source["labels"],
+        "case_charge_type": source["case_charge_type"],
+        "case_type": source["case_type"],
+        "retrial_group_id": source["retrial_group_id"],
+        "group_ajids": group_ajids,
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="导入全部文书到 Elasticsearch")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="增量导入：只导入新增或修改的文书并删除已移除的文书，中断后可重新运行续传",
+    )
+    add_bulk_arguments(parser)
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    es = Elasticsearch(hosts=ELASTICSEARCH_HOSTS)
+    args = parse_args()
+    es = get_es_client(BATCH)
     doc_items = load_document_paths()
     label_map = load_charge_labels()
-    group_ajid_map = build_group_ajid_map(doc_items)
-    create_index(es)
-    print(f"Found {len(doc_items)} documents. Start importing...")
-    for ok, _ in tqdm(
-        helpers.streaming_bulk(es, generate_docs(doc_items, label_map, group_ajid_map)),
-        total=len(doc_items),
-        desc="Importing",
-    ):
-        pass
-    print("数据导入完成！")
+    ajid_table = AjIdTable(DOCUMENTS_DIR)
+    paths = [item["path"] for item in doc_items]
+    manifest = IndexManifest("documents")
+    removed = []
+    target = None  # 新建的版本索引
+    recorded = manifest.index_name()
+    # 文书追加到当前在用的索引（与 indexer.py 导入的候选文档共用），
+    # 只有还没有索引时才新建版本索引，导入完成后切换别名
+    live = live_index(es)
+    # 清单对应上次中断的新建导入时，续传到那个版本索引
+    resumed = (
+        args.incremental
+        and live is None
+        and recorded is not None
+        and is_unfinished(es, recorded)
+    )
+    if resumed:
+        print(f"续传上次中断的全量导入：{recorded}")
+        target = recorded
+    if args.incremental and (resumed or recorded is not None and recorded == live):
+        # 分组 ajId 来自缓存，只有修改过的 retrial 文书需要读取
+        group_ajid_map = build_group_ajid_map(doc_items, ajid_table)
+        meta = {
+            item["path"]: item_meta(item, label_map, group_ajid_map)
+            for item in doc_items
+        }
+        entries, removed, touched = manifest.plan(paths, meta, base_dir=DOCUMENTS_DIR)
+        manifest.record(touched)
+    else:
+        if args.incremental:
+            print("清单与当前索引不一致，改为全量导入")
+        if live is None:
+            target = create_index(es)
+        manifest.reset(target or live)
+        # 哈希和分组 ajId 都在单遍扫描中得到，每篇文书只读一次
+        entries, _, _ = manifest.plan(paths, base_dir=DOCUMENTS_DIR, hash_files=False)
+    index = target or INDEX_NAME
+    if removed:
+        print(f"删除 {remove_deleted(es, index, manifest, removed)} 篇已移除的文书")
+    pending = {entry.path for entry in entries}
+    doc_items = [item for item in doc_items if item["path"] in pending]
+    print(
+        f"Found {len(paths)} documents, {len(doc_items)} to import. "
+        "Start importing..."
+    )
+    recorder = ManifestRecorder(manifest, entries, meta_of=action_meta)
+    # 全量导入写入新版本索引，同时统计短字段词表，供后端进程内补全使用
+    snapshot = SuggestSnapshotBuilder()
+    actions = recorder.track(parse_items(doc_items, label_map, ajid_table))
+    if target is not None:
+        actions = snapshot.track(with_index(actions, target))
+    dead_letter = DeadLetterWriter(dead_letter_path("documents"))
+    ingester = bulk_ingester_from_args(es, args, dead_letter)
+    for ok, info in tqdm(ingester.run(actions), total=len(doc_items), desc="Importing"):
+        recorder.acknowledge(ok, info)
+    recorder.flush()
+    dead_letter.close()
+    ajid_table.save()
+    if recorder.stale_ids:
+        _, failed = delete_docs(es, index, recorder.stale_ids)
+        if failed:
+            print(f"{len(failed)} 篇旧文书删除失败：{failed}")
+    if target is None:
+        rebuild_suggest_snapshot(es, INDEX_NAME)
+        generation = bump_index_generation()
+    else:
+        # 恢复设置、合并段、预热后再切换别名，导入期间检索不受影响
+        finalize_index(es, target)
+        generation = swap_alias(es, target)
+        if resumed:
+            # 本次只导入了中断后剩余的文书，词表从整个索引重新统计
+            rebuild_suggest_snapshot(es, target)
+        else:
+            snapshot.write()
+    manifest.close()
+    print(ingester.stats.report())
+    if dead_letter.count:
+        print(f"{dead_letter.count} 篇导入失败，已写入 {dead_letter.path}")
+    print(f"数据导入完成！当前索引: {current_index(es)}，索引代数: {generation}")
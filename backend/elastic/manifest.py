@@ -0,0 +1,267 @@
+import os
+import json
+import sqlite3
+import hashlib
+from elasticsearch import helpers
+from backend.config import INDEX_MANIFEST_PATH
+from backend.search.suggest_index import SuggestSnapshotBuilder
+
+
+def file_hash(path):
+    """文件内容的 sha1"""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ManifestEntry:
+    """
+    清单中一个已导入文件的记录。meta 是除文件内容外影响文档的附加信息
+    （如标签），变化时同样需要重新导入
+    """
+
+    __slots__ = ("path", "mtime_ns", "size", "hash", "doc_id", "meta")
+
+    def __init__(self, path, mtime_ns, size, hash, doc_id=None, meta=None):
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.hash = hash
+        self.doc_id = doc_id
+        self.meta = meta
+
+    def __repr__(self):
+        return f"ManifestEntry({self.path!r}, doc_id={self.doc_id!r})"
+
+
+class IndexManifest:
+    """
+    增量导入清单，记录每个已被 ES 确认写入的文件：path -> (mtime, 大小, 内容哈希, ajId)。
+    scope 区分不同的导入脚本（候选文档 / 全量文书）。
+    每批 bulk 确认后立即提交，导入中断后重新运行时，已确认的文件不会再次导入
+    """
+
+    def __init__(self, scope, path=INDEX_MANIFEST_PATH):
+        self.scope = scope
+        self.path = path
+        dirname = os.path.dirname(path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+        self._conn = sqlite3.connect(path, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "scope TEXT NOT NULL, path TEXT NOT NULL, mtime_ns INTEGER NOT NULL, "
+            "size INTEGER NOT NULL, hash TEXT NOT NULL, doc_id TEXT, meta TEXT, "
+            "PRIMARY KEY (scope, path))"
+        )
+        # 清单对应的具体索引（别名切换或回滚后清单不再可信）
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS state ("
+            "scope TEXT PRIMARY KEY, index_name TEXT NOT NULL)"
+        )
+
+    def entries(self):
+        """返回 {path: ManifestEntry}"""
+        rows = self._conn.execute(
+            "SELECT path, mtime_ns, size, hash, doc_id, meta FROM files "
+            "WHERE scope = ?",
+            (self.scope,),
+        )
+        return {row[0]: ManifestEntry(*row) for row in rows}
+
+    def plan(self, files, meta=None, base_dir=None, hash_files=True):
+        """
+        对比当前文件和清单，返回 (需要导入的 [ManifestEntry], 已删除的 [ManifestEntry],
+        只有 mtime 变化、内容未变的 [ManifestEntry])。
+        files 为路径列表，meta 为 {path: 附加信息}，base_dir 为相对路径的根目录。
+        hash_files=False 时不读取文件计算哈希，由解析阶段读取文件时补上
+        （全量导入时每个文件只读一次）
+        """
+        known = self.entries()
+        meta = meta or {}
+        changed, touched = [], []
+        for path in files:
+            abs_path = os.path.join(base_dir, path) if base_dir else path
+            st = os.stat(abs_path)
+            file_meta = dump_meta(meta.get(path))
+            old = known.pop(path, None)
+            if (
+                old is not None
+                and old.mtime_ns == st.st_mtime_ns
+                and old.size == st.st_size
+                and old.meta == file_meta
+            ):
+                continue
+            digest = file_hash(abs_path) if hash_files else None
+            entry = ManifestEntry(
+                path, st.st_mtime_ns, st.st_size, digest, meta=file_meta
+            )
+            if old is not None and old.hash == entry.hash and old.meta == file_meta:
+                # 只是被 touch 过，内容没变
+                entry.doc_id = old.doc_id
+                touched.append(entry)
+            else:
+                if old is not None:
+                    entry.doc_id = old.doc_id
+                changed.append(entry)
+        removed = list(known.values())
+        return changed, removed, touched
+
+    def record(self, entries):
+        """记录一批已确认写入的文件（单个事务）"""
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO files "
+                "(scope, path, mtime_ns, size, hash, doc_id, meta) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (self.scope, e.path, e.mtime_ns, e.size, e.hash, e.doc_id, e.meta)
+                    for e in entries
+                ],
+            )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def remove(self, paths):
+        self._conn.executemany(
+            "DELETE FROM files WHERE scope = ? AND path = ?",
+            [(self.scope, path) for path in paths],
+        )
+
+    def reset(self, index_name):
+        """清空本 scope 的记录（全量重建索引时），记录新的目标索引"""
+        self._conn.execute("DELETE FROM files WHERE scope = ?", (self.scope,))
+        self._conn.execute(
+            "INSERT OR REPLACE INTO state (scope, index_name) VALUES (?, ?)",
+            (self.scope, index_name),
+        )
+
+    def index_name(self):
+        """清单记录的文件所在的索引，没有时返回 None"""
+        row = self._conn.execute(
+            "SELECT index_name FROM state WHERE scope = ?", (self.scope,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def close(self):
+        self._conn.close()
+
+
+def dump_meta(meta):
+    """附加信息序列化为稳定的字符串，便于比较"""
+    if meta is None:
+        return None
+    return json.dumps(meta, ensure_ascii=False, sort_keys=True)
+
+
+class ManifestRecorder:
+    """
+    跟踪 bulk 动作与文件的对应关系，ES 确认写入后按批提交到清单。
+    meta_of(action) 返回要记录的附加信息
+    """
+
+    def __init__(self, manifest, entries, meta_of=None, batch_size=500):
+        self.manifest = manifest
+        self.entries = {e.path: e for e in entries}
+        self.meta_of = meta_of
+        self.batch_size = batch_size
+        self.stale_ids = []  # 文件的 ajId 变了，旧文档需要删除
+        self._pending = {}  # doc_id -> ManifestEntry，已发送、等待确认
+        self._acked = []
+
+    def track(self, parsed):
+        """
+        包装 (path, action, 内容哈希) 生成器，输出 bulk 动作；
+        action 为 None 的文件直接记为已处理
+        """
+        for path, action, digest in parsed:
+            entry = self.entries[path]
+            if digest is not None:
+                entry.hash = digest
+            doc_id = action["_id"] if action is not None else None
+            if entry.doc_id and entry.doc_id != doc_id:
+                self.stale_ids.append(entry.doc_id)
+            entry.doc_id = doc_id
+            if action is None:
+                # 读取失败的文件不记录，下次运行重试
+                if entry.hash is not None:
+                    self._ack(entry)
+                continue
+            if self.meta_of is not None:
+                entry.meta = dump_meta(self.meta_of(action))
+            self._pending[doc_id] = entry
+            yield action
+
+    def acknowledge(self, ok, info):
+        """处理 bulk 返回的一条结果"""
+        item = next(iter(info.values()))
+        entry = self._pending.pop(item.get("_id"), None)
+        if ok and entry is not None:
+            self._ack(entry)
+
+    def _ack(self, entry):
+        self._acked.append(entry)
+        if len(self._acked) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self._acked:
+            self.manifest.record(self._acked)
+            self._acked = []
+
+
+def delete_docs(es, index, doc_ids):
+    """
+    按 ajId 删除文档，返回 (已删除的 ajId 列表, 删除失败的 ajId 列表)。
+    文档本就不存在（404）也算作已删除
+    """
+    actions = (
+        {"_op_type": "delete", "_index": index, "_id": doc_id} for doc_id in doc_ids
+    )
+    deleted, failed = [], []
+    for ok, info in helpers.streaming_bulk(es, actions, raise_on_error=False):
+        item = info["delete"]
+        if ok or item.get("status") == 404:
+            deleted.append(item["_id"])
+        else:
+            failed.append(item["_id"])
+    return deleted, failed
+
+
+def remove_deleted(es, index, manifest, removed):
+    """
+    删除已移除文件对应的文档，ES 确认删除后才从清单中去掉这些文件；
+    删除失败（或中途崩溃）的文件留在清单中，下次增量导入时重试。
+    返回删除的篇数
+    """
+    deleted, failed = delete_docs(
+        es, index, [entry.doc_id for entry in removed if entry.doc_id]
+    )
+    failed = set(failed)
+    manifest.remove([entry.path for entry in removed if entry.doc_id not in failed])
+    if failed:
+        print(f"{len(failed)} 篇文档删除失败，下次增量导入时重试")
+    return len(deleted)
+
+
+def rebuild_suggest_snapshot(es, index):
+    """
+    从索引中重新统计短字段词表（增量导入后使用，只读取这几个短字段）
+    """
+    snapshot = SuggestSnapshotBuilder()
+    es.indices.refresh(index=index)
+    for hit in helpers.scan(
+        es,
+        index=index,
+        query={"query": {"match_all": {}}},
+        _source_includes=list(snapshot.fields),
+        size=1000,
+    ):
+        snapshot.add(hit.get("_source", {}))
+    snapshot.write()
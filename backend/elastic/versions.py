@@ -0,0 +1,201 @@
+"""
+版本化索引：每次全量导入写入一个带时间戳的新索引（如 legal_cases_20240101120000），
+导入完成后原子地把别名 INDEX_NAME 切换过去，导入期间检索不受影响。
+
+    python -m backend.elastic.versions list
+    python -m backend.elastic.versions rollback [索引名]
+    python -m backend.elastic.versions gc [--keep N]
+"""
+import time
+import argparse
+from elasticsearch import NotFoundError
+from backend.config import (
+    INDEX_NAME,
+    INDEX_REPLICAS,
+    INDEX_REFRESH_INTERVAL,
+    INDEX_KEEP_VERSIONS,
+)
+from backend.elastic.client import BATCH, get_es_client
+from backend.elastic.generation import bump_index_generation
+
+# 切换别名前预热用的检索：让评分、标签聚合用到的数据结构先加载进内存
+WARMUP_BODIES = [
+    {"query": {"match_all": {}}, "size": 10},
+    {"size": 0, "aggs": {"labels": {"terms": {"field": "labels", "size": 100}}}},
+    {"query": {"multi_match": {"query": "盗窃", "fields": ["ajName", "qw"]}}},
+]
+
+
+def versioned_index_name(alias=INDEX_NAME):
+    return f"{alias}_{time.strftime('%Y%m%d%H%M%S')}"
+
+
+def create_versioned_index(es, body, alias=INDEX_NAME):
+    """
+    创建新版本索引并返回索引名。导入期间不设副本、关闭自动刷新
+    """
+    index = versioned_index_name(alias)
+    body = dict(body)
+    settings = dict(body.get("settings", {}))
+    settings["index"] = dict(
+        settings.get("index", {}), number_of_replicas=0, refresh_interval="-1"
+    )
+    body["settings"] = settings
+    es.indices.create(index=index, body=body)
+    return index
+
+
+def is_unfinished(es, index):
+    """
+    index 是否仍保持导入期间的设置（见 create_versioned_index），
+    即 finalize_index 之前中断的全量导入留下的版本索引
+    """
+    try:
+        response = es.indices.get_settings(index=index, name="index.refresh_interval")
+    except NotFoundError:
+        return False
+    settings = response.get(index, {}).get("settings", {}).get("index", {})
+    return settings.get("refresh_interval") == "-1"
+
+
+def with_index(actions, index):
+    """把 bulk 动作的目标改为 index（全量导入写入新版本索引）"""
+    for action in actions:
+        action["_index"] = index
+        yield action
+
+
+def finalize_index(es, index):
+    """
+    导入完成后恢复副本数和刷新间隔，合并段并预热
+    """
+    es.indices.put_settings(
+        index=index,
+        body={
+            "index": {
+                "number_of_replicas": INDEX_REPLICAS,
+                "refresh_interval": INDEX_REFRESH_INTERVAL,
+            }
+        },
+    )
+    es.indices.refresh(index=index)
+    es.indices.forcemerge(index=index, max_num_segments=1, request_timeout=3600)
+    es.cluster.health(index=index, wait_for_status="yellow", request_timeout=600)
+    for body in WARMUP_BODIES:
+        es.search(index=index, body=body, request_timeout=600)
+
+
+def _alias_holders(es, alias):
+    try:
+        return list(es.indices.get_alias(name=alias))
+    except NotFoundError:
+        return []
+
+
+def current_index(es, alias=INDEX_NAME):
+    """别名当前指向的索引；别名不存在时返回 None"""
+    holders = _alias_holders(es, alias)
+    return holders[0] if holders else None
+
+
+def swap_alias(es, index, alias=INDEX_NAME):
+    """
+    原子地把别名切换到 index，返回新的索引代数。
+    同名的旧式实体索引（之前直接以 INDEX_NAME 创建的）在同一请求中删除
+    """
+    holders = _alias_holders(es, alias)
+    actions = [{"remove": {"index": holder, "alias": alias}} for holder in holders]
+    if not holders and es.indices.exists(index=alias):
+        actions.append({"remove_index": {"index": alias}})
+    actions.append({"add": {"index": index, "alias": alias}})
+    es.indices.update_aliases(body={"actions": actions})
+    return bump_index_generation()
+
+
+def list_versions(es, alias=INDEX_NAME):
+    """返回所有版本 [{"index", "docs", "size", "current"}]，按时间从新到旧"""
+    try:
+        rows = es.cat.indices(
+            index=f"{alias}_*", format="json", h="index,docs.count,store.size"
+        )
+    except NotFoundError:
+        return []
+    current = current_index(es, alias)
+    versions = [
+        {
+            "index": row["index"],
+            "docs": row.get("docs.count"),
+            "size": row.get("store.size"),
+            "current": row["index"] == current,
+        }
+        for row in rows
+    ]
+    versions.sort(key=lambda v: v["index"], reverse=True)
+    return versions
+
+
+def rollback(es, target=None, alias=INDEX_NAME):
+    """
+    把别名切回 target；未指定时切回当前版本之前最近的一个版本。返回切换到的索引名
+    """
+    if target is None:
+        current = current_index(es, alias)
+        older = [
+            v["index"]
+            for v in list_versions(es, alias)
+            if current is None or v["index"] < current
+        ]
+        if not older:
+            raise ValueError("No older index version to roll back to")
+        target = older[0]
+    swap_alias(es, target, alias)
+    return target
+
+
+def gc(es, keep=INDEX_KEEP_VERSIONS, alias=INDEX_NAME):
+    """
+    删除旧版本，保留当前版本和最新的 keep 个版本，返回删除的索引名
+    """
+    versions = list_versions(es, alias)
+    current = current_index(es, alias)
+    kept = {v["index"] for v in versions[:keep]}
+    deleted = []
+    for v in versions:
+        if v["index"] in kept or v["index"] == current:
+            continue
+        es.indices.delete(index=v["index"])
+        deleted.append(v["index"])
+    return deleted
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="管理版本化的 ES 索引")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="列出所有版本")
+    p = sub.add_parser("rollback", help="把别名切回旧版本")
+    p.add_argument("index", nargs="?", help="目标索引，默认为上一个版本")
+    p = sub.add_parser("gc", help="删除旧版本")
+    p.add_argument(
+        "--keep",
+        type=int,
+        default=INDEX_KEEP_VERSIONS,
+        help="保留的最新版本数（当前版本总会保留）",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    es = get_es_client(BATCH)
+    if args.command == "list":
+        versions = list_versions(es)
+        if not versions:
+            print(f"No versions of '{INDEX_NAME}'.")
+        for v in versions:
+            mark = "*" if v["current"] else " "
+            print(f"{mark} {v['index']}  docs={v['docs']}  size={v['size']}")
+    elif args.command == "rollback":
+        print(f"Alias '{INDEX_NAME}' -> {rollback(es, args.index)}")
+    elif args.command == "gc":
+        deleted = gc(es, args.keep)
+        print(f"Deleted {len(deleted)} old versions: {', '.join(deleted) or '-'}")
@@ -0,0 +1,136 @@
+"""
+响应层：JSON 序列化和压缩，与 Web 框架无关，供 app.py 和 async_app.py 使用
+
+- 序列化：装有 orjson 时使用 orjson，否则用标准库；都不转义中文
+  （ensure_ascii 会把每个汉字写成 6 字节的 \\uXXXX，全文字段的体积约为 UTF-8 的 2 倍）
+- 压缩：按 Accept-Encoding 选择 br 或 gzip
+- 流式：结果页和文书详情用 iter_dumps 逐段序列化，超过 RESPONSE_STREAM_MIN_BYTES 时
+  边序列化、边压缩、边发送，不在内存中生成完整的 JSON 和压缩结果
+"""
+import json
+import gzip
+import zlib
+from backend.config import (
+    RESPONSE_STREAM_CHUNK,
+    RESPONSE_GZIP_LEVEL,
+    RESPONSE_BROTLI_QUALITY,
+)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 按优先级排列的可用压缩方式
+ENCODINGS = ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def dumps(obj, default=None):
+    """序列化为 UTF-8 编码的 JSON 字节串"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        obj, ensure_ascii=False, separators=(",", ":"), default=default
+    ).encode("utf-8")
+
+
+def iter_dumps(obj, default=None):
+    """
+    逐段序列化，拼接结果与 dumps(obj) 相同：展开顶层 dict，
+    其中 list 类型的值（如结果列表）逐个元素序列化
+    """
+    if not isinstance(obj, dict):
+        yield dumps(obj, default=default)
+        return
+    yield b"{"
+    for i, (key, value) in enumerate(obj.items()):
+        if i:
+            yield b","
+        if isinstance(value, list) and value:
+            # '"key":['
+            yield dumps({key: []}, default=default)[1:-2]
+            for j, item in enumerate(value):
+                if j:
+                    yield b","
+                yield dumps(item, default=default)
+            yield b"]"
+        else:
+            yield dumps({key: value}, default=default)[1:-1]
+    yield b"}"
+
+
+def read_head(chunks, limit):
+    """
+    从字节串迭代器中读取至少 limit 字节。全部读完时返回 (完整内容, None)，
+    否则返回 (已读的内容, 剩余部分的迭代器)
+    """
+    chunks = iter(chunks)
+    head, size = [], 0
+    for chunk in chunks:
+        head.append(chunk)
+        size += len(chunk)
+        if size >= limit:
+            return b"".join(head), chunks
+    return b"".join(head), None
+
+
+def choose_encoding(accept_encoding):
+    """按 Accept-Encoding 选择压缩方式，都不接受时返回 None"""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    for encoding in ENCODINGS:
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def compress(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=RESPONSE_BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=RESPONSE_GZIP_LEVEL, mtime=0)
+
+
+def compress_stream(chunks, encoding, chunk_size=RESPONSE_STREAM_CHUNK):
+    """压缩字节串迭代器，每攒够 chunk_size 字节压缩一次，逐块产出压缩数据"""
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=RESPONSE_BROTLI_QUALITY)
+        process, finish = compressor.process, compressor.finish
+    else:
+        # wbits=31：带 gzip 头
+        compressor = zlib.compressobj(RESPONSE_GZIP_LEVEL, zlib.DEFLATED, 31)
+        process, finish = compressor.compress, compressor.flush
+    buffer, size = [], 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        size += len(chunk)
+        if size >= chunk_size:
+            out = process(b"".join(buffer))
+            buffer, size = [], 0
+            if out:
+                yield out
+    if buffer:
+        out = process(b"".join(buffer))
+        if out:
+            yield out
+    yield finish()
+
+
+def weak_etag(etag):
+    """压缩后的表示与原文不是逐字节相同，强 ETag 改为弱 ETag"""
+    if etag and not etag.startswith("W/"):
+        return "W/" + etag
+    return etag
@@ -0,0 +1,390 @@
+import time
+import asyncio
+import logging
+from elasticsearch import NotFoundError, TransportError
+from backend.search.backend import get_async_search_backend
+from backend.config import (
+    INDEX_NAME,
+    RESULT_PREFETCH_SIZE,
+    RESULT_FETCH_BATCH,
+    RESULT_PIT_KEEP_ALIVE,
+    SUGGEST_SIZE,
+    QUERY_SWEEP_INTERVAL,
+)
+from backend.elastic.generation import get_index_generation
+from backend.search.query import QueryParams, Query
+from backend.search.query_manager import (
+    QueryManager,
+    MAX_QUERIES,
+    QUERY_TTL,
+    RESULT_FIELDS,
+)
+from backend.search.labels import label_keys
+from backend.search.store import AsyncQueryStore, QueryStore
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncQueryManager(QueryManager):
+    """
+    QueryManager 的异步版本，供 asyncio 服务（backend/async_app.py）使用：
+    ES 请求通过 AsyncElasticsearch 发出，等待期间不占用线程；
+    查询存储、缓存以及检索体的构建和解析与同步版本共用，
+    查询存储通过 AsyncQueryStore 访问，SQLite 存储的读写不阻塞事件循环
+    """
+
+    def __init__(self, store: QueryStore = None):
+        super().__init__(store)
+        self.async_store = AsyncQueryStore(self.store)
+
+    async def create_query(self, params: QueryParams):
+        """创建新查询并执行"""
+        await self._maybe_clean_expired()
+        if await self.async_store.count() >= MAX_QUERIES:
+            await self._evict_oldest()
+        query = Query(params)
+        await self._run_query(query)
+        await self.async_store.put(query)
+        return query.id
+
+    async def create_queries(self, params_list):
+        """批量创建查询，见 QueryManager.create_queries"""
+        await self._maybe_clean_expired()
+        if RESULT_PIT_KEEP_ALIVE:
+            return list(
+                await asyncio.gather(
+                    *(self._create_query_or_none(params) for params in params_list)
+                )
+            )
+        queries, pending = self._prepare_batch(params_list)
+        failed = set()
+        if pending:
+            bodies, search = self._msearch_body(pending)
+            response = await get_async_search_backend().msearch(body=search)
+            failed = self._apply_batch(pending, bodies, response["responses"])
+        return await self._store_batch(queries, failed)
+
+    async def _create_query_or_none(self, params: QueryParams):
+        try:
+            return await self.create_query(params)
+        except TransportError:
+            return None
+
+    async def _store_batch(self, queries, failed):
+        query_ids = []
+        for query in queries:
+            if query.id in failed:
+                query_ids.append(None)
+                continue
+            if await self.async_store.count() >= MAX_QUERIES:
+                await self._evict_oldest()
+            await self.async_store.put(query)
+            query_ids.append(query.id)
+        return query_ids
+
+    async def get_results(
+        self, query_id, page=1, page_size=10, preview=False, ids_only=False
+    ):
+        """
+        获取查询结果（带缓存）。取回本页文档的同时，
+        如果下一页还没有拉取，就并发地预取下一批结果
+        """
+        await self._maybe_clean_expired()
+        query = await self.async_store.get(query_id)
+        if query is None:
+            return None
+        if ids_only:
+            return await self._get_result_ids(query, page, page_size)
+        page_key = (query.version, page, page_size, preview)
+        cached = self.results_cache.get(query_id, page_key)
+        if cached is not None:
+            return cached
+        start = (page - 1) * page_size
+        end = start + page_size
+        query = await self._extend_results(query, end)
+        page_key = (query.version, page, page_size, preview)
+        page_ids_scores = query.results[start:end]
+        page_ids = [doc_id for doc_id, _ in page_ids_scores]
+        if preview:
+            tasks = [self._get_previews_by_ids(query, page_ids)]
+        else:
+            tasks = [self._get_docs_by_ids(page_ids, RESULT_FIELDS)]
+        if len(query.results) < min(end + page_size, query.total_results):
+            tasks.append(self._extend_results(query, end + page_size))
+        docs, *_ = await asyncio.gather(*tasks)
+        response = self._build_page(query, page, page_size, page_ids_scores, docs)
+        self.results_cache.put(query_id, page_key, response)
+        return response
+
+    async def _get_result_ids(self, query: Query, page, page_size):
+        start = (page - 1) * page_size
+        query = await self._extend_results(query, start + page_size)
+        return {
+            "page": page,
+            "total_pages": (query.total_results + page_size - 1) // page_size,
+            "results": [
+                {"ajId": doc_id, "score": score}
+                for doc_id, score in query.results[start : start + page_size]
+            ],
+        }
+
+    async def update_query(self, query_id, new_params: QueryParams):
+        """更新查询参数并重新检索"""
+        async with self._query_lock(query_id):
+            query = await self.async_store.get(query_id)
+            if query is None:
+                return None
+            new_query = Query(new_params)
+            new_query.id = query_id
+            new_query.version = query.version + 1
+            await self._run_query(new_query)
+            self._release_query(query)
+            await self.async_store.put(new_query)
+            self._clear_query_cache(query_id)
+            return new_query.id
+
+    def _query_lock(self, query_id):
+        """
+        同一查询的 asyncio.Lock。并发的翻页请求和预取在等待 ES 时交替执行，
+        不加锁会从同一个游标扩展，重复追加结果
+        """
+        lock = self._query_locks.get(query_id)
+        if lock is None:
+            lock = self._query_locks[query_id] = asyncio.Lock()
+        return lock
+
+    async def _run_query(self, query: Query):
+        if RESULT_PIT_KEEP_ALIVE:
+            await self._run_pit_query(query)
+            return
+        if self._reuse_results(query):
+            return
+        es_response = await self._execute_es_query(
+            query.params, size=RESULT_PREFETCH_SIZE
+        )
+        self._apply_response(query, es_response)
+
+    async def _run_pit_query(self, query: Query):
+        """见 QueryManager._run_pit_query"""
+        es = get_async_search_backend()
+        query.generation = get_index_generation()
+        pit = await es.open_point_in_time(
+            index=INDEX_NAME, keep_alive=RESULT_PIT_KEEP_ALIVE
+        )
+        query.pit_id = pit["id"]
+        body = self._build_es_query(query.params, RESULT_PREFETCH_SIZE)
+        try:
+            response = await es.search(body=self._with_pit(query, body))
+        except Exception:
+            self._release_query(query)
+            raise
+        query.pit_id = response.get("pit_id", query.pit_id)
+        response["_query"] = body
+        self._apply_response(query, response)
+
+    async def _extend_results(self, query: Query, end):
+        """见 QueryManager._extend_results"""
+        if len(query.results) >= min(end, query.total_results):
+            return query
+        async with self._query_lock(query.id):
+            latest = await self.async_store.get(query.id)
+            if latest is not None:
+                query = latest
+            if await self._ensure_results(query, end) and latest is not None:
+                await self.async_store.put(query)
+        return query
+
+    async def _ensure_results(self, query: Query, end):
+        target = min(end, query.total_results)
+        if len(query.results) >= target:
+            return False
+        while len(query.results) < target:
+            size = max(target - len(query.results), RESULT_FETCH_BATCH)
+            hits = await self._fetch_more(query, size)
+            if not hits:
+                query.total_results = len(query.results)
+                break
+            self._append_hits(query, hits)
+        if query.generation == get_index_generation():
+            self._share_results(query)
+        return True
+
+    async def _fetch_more(self, query: Query, size):
+        es = get_async_search_backend()
+        if query.pit_id is not None:
+            try:
+                body = self._with_pit(query, self._fetch_more_body(query, size))
+                response = await es.search(body=body)
+                query.pit_id = response.get("pit_id", query.pit_id)
+                return response["hits"]["hits"]
+            except NotFoundError:
+                self._drop_pit(query)
+        body = self._fetch_more_body(query, size)
+        response = await es.search(index=INDEX_NAME, body=body)
+        return response["hits"]["hits"]
+
+    async def get_query(self, query_id):
+        """获取查询元数据"""
+        return await self.async_store.run(super().get_query, query_id)
+
+    async def _evict_oldest(self):
+        """淘汰最久未使用的查询"""
+        oldest = await self.async_store.evict_oldest()
+        if oldest is not None:
+            self._forget_query(oldest)
+
+    async def _maybe_clean_expired(self):
+        """每隔 QUERY_SWEEP_INTERVAL 秒清理一次过期查询"""
+        now = time.time()
+        if now - self._last_sweep >= QUERY_SWEEP_INTERVAL:
+            self._last_sweep = now
+            await self.clean_expired()
+
+    async def clean_expired(self):
+        """清理过期查询"""
+        for query in await self.async_store.pop_expired(time.time() - QUERY_TTL):
+            self._forget_query(query)
+        self.results_cache.clean_expired()
+
+    async def get_stats(self):
+        """查询与缓存的统计信息"""
+        return await self.async_store.run(super().get_stats)
+
+    def _release_query(self, query: Query):
+        """在事件循环中异步关闭查询的 point-in-time"""
+        if query.pit_id is None:
+            return
+        pit_id, query.pit_id = query.pit_id, None
+        asyncio.get_running_loop().create_task(self._close_point_in_time(pit_id))
+
+    async def _close_point_in_time(self, pit_id):
+        try:
+            await get_async_search_backend().close_point_in_time(body={"id": pit_id})
+        except Exception:
+            pass
+
+    async def _execute_es_query(self, params: QueryParams, size=RESULT_PREFETCH_SIZE):
+        body = self._build_es_query(params, size)
+        response = await get_async_search_backend().search(index=INDEX_NAME, body=body)
+        response["_query"] = body
+        return response
+
+    async def _get_docs_by_ids(self, doc_ids, fields=None):
+        if not doc_ids:
+            return []
+        response = await get_async_search_backend().mget(
+            index=INDEX_NAME, body={"ids": doc_ids}, _source_includes=fields
+        )
+        return self._parse_docs(response)
+
+    async def _get_previews_by_ids(self, query: Query, doc_ids):
+        if not doc_ids:
+            return []
+        response = await get_async_search_backend().search(
+            index=INDEX_NAME, body=self._previews_body(query, doc_ids)
+        )
+        return self._parse_previews(response, doc_ids)
+
+    async def get_document_by_ajid(self, ajid):
+        return (await self.get_document(ajid))[0]
+
+    async def get_document(self, ajid, sections=None):
+        """见 QueryManager.get_document"""
+        generation = get_index_generation()
+        entry = self.document_service.cache.get(ajid, generation)
+        if entry is None:
+            try:
+                response = await get_async_search_backend().get(
+                    index=INDEX_NAME, id=ajid
+                )
+            except NotFoundError:
+                return None, None
+            entry = self.document_service.store(ajid, generation, response)
+        return self.document_service.render(entry, sections)
+
+    async def get_all_labels(self):
+        return label_keys(await self.get_facets())
+
+    async def get_facets(self):
+        """见 LabelService：缓存过期时返回旧结果，在事件循环中后台刷新"""
+        generation = get_index_generation()
+        facets, stale = self.label_service.lookup(generation)
+        if facets is None:
+            return await self._refresh_facets(generation)
+        if stale and self.label_service.begin_refresh():
+            asyncio.get_running_loop().create_task(
+                self._refresh_facets_in_background(generation)
+            )
+        return facets
+
+    async def _refresh_facets(self, generation):
+        resp = await get_async_search_backend().search(
+            index=INDEX_NAME, body=self.label_service.body
+        )
+        return self.label_service.update(generation, resp)
+
+    async def _refresh_facets_in_background(self, generation):
+        failed = False
+        try:
+            await self._refresh_facets(generation)
+        except Exception:
+            failed = True
+        finally:
+            self.label_service.end_refresh(failed)
+
+    async def suggest(self, field, prefix, size=SUGGEST_SIZE):
+        return await self.suggest_many([field], prefix, size=size)
+
+    async def suggest_many(self, fields, prefix, size=SUGGEST_SIZE):
+        """多字段补全，见 QueryManager.suggest_many"""
+        generation = get_index_generation()
+        cache_key = (tuple(fields), prefix, size)
+        cached = self.suggest_cache.get(cache_key, generation)
+        if cached is not None:
+            return cached
+        local_fields, remote_fields = self.suggestion_engine.split_fields(fields)
+        best = self.suggestion_engine.suggest(local_fields, prefix, size)
+        complete = await self._suggest_from_es(
+            remote_fields, prefix, size, generation, best
+        )
+        suggestions = sorted(best, key=lambda text: (-best[text], len(text)))
+        if complete:
+            self.suggest_cache.put(cache_key, generation, suggestions)
+        return suggestions
+
+    async def _suggest_from_es(self, fields, prefix, size, generation, best):
+        """见 QueryManager._suggest_from_es"""
+        try:
+            completion_fields = await self._get_completion_fields(generation)
+            fields = [f for f in fields if f in completion_fields]
+            if not fields:
+                return True
+            resp = await get_async_search_backend().search(
+                index=INDEX_NAME, body=self._suggest_body(fields, prefix, size)
+            )
+        except TransportError as e:
+            logger.warning("ES completion suggest failed: %s", e)
+            return False
+        self._merge_suggestions(resp, best)
+        return True
+
+    async def _get_completion_fields(self, generation):
+        if self._completion_fields[0] == generation:
+            return self._completion_fields[1]
+        mappings = await get_async_search_backend().indices.get_mapping(
+            index=INDEX_NAME
+        )
+        fields = self._parse_completion_fields(mappings)
+        self._completion_fields = (generation, fields)
+        return fields
+
+
+_async_query_manager = None
+
+
+def get_async_query_manager():
+    """异步服务的全局查询管理器，在事件循环中首次使用时创建"""
+    global _async_query_manager
+    if _async_query_manager is None:
+        _async_query_manager = AsyncQueryManager()
+    return _async_query_manager
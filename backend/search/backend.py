@@ -0,0 +1,87 @@
+import asyncio
+import functools
+import threading
+from backend.config import SEARCH_BACKEND
+from backend.elastic.client import get_es_client, get_async_es_client
+
+
+class SearchBackend:
+    """
+    QueryManager 使用的检索后端接口。方法名和参数与 elasticsearch-py 客户端一致
+    （只用到其中一部分），因此 Elasticsearch 客户端本身就是一个实现；
+    LocalSearchEngine 是不依赖外部服务的进程内实现。
+    另需提供 indices.get_mapping(index=...)，用于查询存在的补全字段
+    """
+
+    def search(self, index=None, body=None, **kwargs):
+        raise NotImplementedError
+
+    def msearch(self, body=None, index=None, **kwargs):
+        raise NotImplementedError
+
+    def mget(self, index=None, body=None, _source_includes=None, **kwargs):
+        raise NotImplementedError
+
+    def get(self, index=None, id=None, **kwargs):
+        raise NotImplementedError
+
+    def open_point_in_time(self, index=None, keep_alive=None, **kwargs):
+        raise NotImplementedError
+
+    def close_point_in_time(self, body=None, **kwargs):
+        raise NotImplementedError
+
+
+class AsyncBackend:
+    """
+    把同步的检索后端包装成 AsyncElasticsearch 的调用方式（供异步服务使用）。
+    BM25 打分等计算在默认线程池中执行，不阻塞事件循环
+    """
+
+    def __init__(self, backend):
+        self._backend = backend
+        self.indices = _AsyncNamespace(backend.indices)
+
+    def __getattr__(self, name):
+        return _async_method(getattr(self._backend, name))
+
+
+class _AsyncNamespace:
+    def __init__(self, namespace):
+        self._namespace = namespace
+
+    def __getattr__(self, name):
+        return _async_method(getattr(self._namespace, name))
+
+
+def _async_method(func):
+    async def call(*args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+    return call
+
+
+_async_local_backend = None
+_lock = threading.Lock()
+
+
+def get_search_backend():
+    """按 SEARCH_BACKEND 返回全局的检索后端"""
+    if SEARCH_BACKEND == "local":
+        from backend.search.local_engine import get_local_engine
+
+        return get_local_engine()
+    return get_es_client()
+
+
+def get_async_search_backend():
+    """异步服务使用的检索后端"""
+    global _async_local_backend
+    if SEARCH_BACKEND != "local":
+        return get_async_es_client()
+    if _async_local_backend is None:
+        with _lock:
+            if _async_local_backend is None:
+                _async_local_backend = AsyncBackend(get_search_backend())
+    return _async_local_backend
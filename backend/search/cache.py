@@ -0,0 +1,223 @@
+import sys
+import time
+import threading
+from collections import OrderedDict
+
+
+def estimate_size(obj):
+    """
+    粗略估算对象占用的内存字节数（递归统计 dict/list/tuple/str）
+    """
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            size += estimate_size(k) + estimate_size(v)
+    elif isinstance(obj, (list, tuple, set)):
+        for v in obj:
+            size += estimate_size(v)
+    return size
+
+
+class _QueryEntry:
+    __slots__ = ("pages", "bytes", "last_accessed")
+
+    def __init__(self):
+        self.pages = {}  # 页键 -> (结果, 字节数)
+        self.bytes = 0
+        self.last_accessed = time.time()
+
+
+class ResultCache:
+    """
+    查询结果页缓存：按 query_id 分组存放各页结果，
+    以查询为单位做 LRU 淘汰，总大小受字节预算限制，并支持 TTL 过期清理
+    """
+
+    def __init__(self, max_bytes, ttl):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # query_id -> _QueryEntry，按最近访问排序
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, query_id, page_key):
+        with self._lock:
+            entry = self._entries.get(query_id)
+            if entry is None or page_key not in entry.pages:
+                self.misses += 1
+                return None
+            self.hits += 1
+            entry.last_accessed = time.time()
+            self._entries.move_to_end(query_id)
+            return entry.pages[page_key][0]
+
+    def put(self, query_id, page_key, value):
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return  # 单页超过预算，不缓存
+        with self._lock:
+            entry = self._entries.get(query_id)
+            if entry is None:
+                entry = self._entries[query_id] = _QueryEntry()
+            old = entry.pages.get(page_key)
+            if old is not None:
+                entry.bytes -= old[1]
+                self.bytes -= old[1]
+            entry.pages[page_key] = (value, size)
+            entry.bytes += size
+            entry.last_accessed = time.time()
+            self.bytes += size
+            self._entries.move_to_end(query_id)
+            while self.bytes > self.max_bytes and len(self._entries) > 1:
+                oldest_id = next(iter(self._entries))
+                if oldest_id == query_id:
+                    break
+                self._remove(oldest_id)
+                self.evictions += 1
+
+    def invalidate(self, query_id):
+        """清除某个查询的全部缓存页"""
+        with self._lock:
+            if query_id in self._entries:
+                self._remove(query_id)
+
+    def clean_expired(self):
+        """清理超过 TTL 未访问的查询，返回清理数量"""
+        deadline = time.time() - self.ttl
+        removed = 0
+        with self._lock:
+            # 按最近访问排序，过期项都在队首
+            while self._entries:
+                query_id, entry = next(iter(self._entries.items()))
+                if entry.last_accessed > deadline:
+                    break
+                self._remove(query_id)
+                removed += 1
+            self.expirations += removed
+        return removed
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queries": len(self._entries),
+                "pages": sum(len(e.pages) for e in self._entries.values()),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def _remove(self, query_id):
+        entry = self._entries.pop(query_id)
+        self.bytes -= entry.bytes
+
+
+class GenerationCache:
+    """
+    按条数限制的 LRU 缓存，每条记录绑定索引代数和写入时间，
+    索引重建或超过 TTL 后自动失效。
+    用于跨查询共享的结果集（检索条件指纹 -> ID、得分、游标等）和补全前缀等
+    """
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (代数, 写入时间, 值)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, generation):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            entry_generation, stored_at, value = item
+            if entry_generation != generation or time.time() - stored_at > self.ttl:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, generation, value):
+        with self._lock:
+            self._entries[key] = (generation, time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class DocumentCache:
+    """
+    按字节预算的 LRU 缓存，每条记录绑定索引代数，索引重建后自动失效。
+    用于详情页文档（全文较长，按条数限制无法控制内存）
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (代数, 值, 字节数)
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, generation):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None or item[0] != generation:
+                if item is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return item[1]
+
+    def put(self, key, generation, value):
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (generation, value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        self.bytes -= self._entries.pop(key)[2]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,67 @@
+import json
+import hashlib
+from elasticsearch import NotFoundError
+from backend.config import INDEX_NAME, DOCUMENT_CACHE_MAX_BYTES
+from backend.elastic.generation import get_index_generation
+from backend.search.backend import get_search_backend
+from backend.search.cache import DocumentCache
+
+
+def parse_sections(value):
+    """请求参数 sections=ajjbqk,pjjg 转为字段列表，为空时返回 None（整篇文档）"""
+    sections = [s.strip() for s in (value or "").split(",") if s.strip()]
+    return sections or None
+
+
+def etag_matches(if_none_match, etag):
+    """If-None-Match 请求头是否与 ETag 匹配（弱比较）"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(",")
+    )
+
+
+class DocumentService:
+    """
+    详情页文档：两个导入脚本都以 ajId 作为 _id，直接按 _id 实时 get，
+    不再走检索。最近查看的文档缓存在内存中（按字节预算 LRU，索引重建后失效），
+    缓存时算好内容摘要，用作 ETag
+    """
+
+    def __init__(self, max_bytes=DOCUMENT_CACHE_MAX_BYTES):
+        self.cache = DocumentCache(max_bytes)
+
+    def get(self, ajid, sections=None):
+        """返回 (文档或其中的 sections 字段, ETag)，文档不存在时为 (None, None)"""
+        generation = get_index_generation()
+        entry = self.cache.get(ajid, generation)
+        if entry is None:
+            try:
+                response = get_search_backend().get(index=INDEX_NAME, id=ajid)
+            except NotFoundError:
+                return None, None
+            entry = self.store(ajid, generation, response)
+        return self.render(entry, sections)
+
+    def store(self, ajid, generation, response):
+        """缓存 get 的响应，返回 (文档, 内容摘要)"""
+        doc = {**response["_source"], "id": response["_id"]}
+        data = json.dumps(doc, ensure_ascii=False, sort_keys=True).encode("utf-8")
+        entry = (doc, hashlib.sha1(data).hexdigest()[:20])
+        self.cache.put(ajid, generation, entry)
+        return entry
+
+    def render(self, entry, sections=None):
+        """取出所需字段（id 和 ajId 总是返回），每种字段组合有各自的 ETag"""
+        doc, digest = entry
+        if not sections:
+            return doc, f'"{digest}"'
+        fields = sorted(set(sections) & doc.keys() - {"id", "ajId"})
+        part = {k: doc[k] for k in ["id", "ajId", *fields] if k in doc}
+        return part, f'"{digest}-{".".join(fields)}"'
+
+    def stats(self):
+        return self.cache.stats()
@@ -0,0 +1,129 @@
+import time
+import threading
+from backend.config import (
+    INDEX_NAME,
+    FACET_FIELDS,
+    FACET_SIZE,
+    LABEL_REFRESH_INTERVAL,
+)
+from backend.elastic.generation import get_index_generation
+from backend.search.backend import get_search_backend
+
+
+def facets_aggs(fields, size):
+    """每个分面字段一个 terms 聚合，聚合名即字段名"""
+    return {field: {"terms": {"field": field, "size": size}} for field in fields}
+
+
+def parse_facets(response, fields):
+    """
+    聚合结果转为 {字段: [{"key": 取值, "count": 文档数}]}，
+    没有任何取值的字段（索引中不存在该字段）省略
+    """
+    aggregations = response.get("aggregations", {})
+    facets = {}
+    for field in fields:
+        buckets = aggregations.get(field, {}).get("buckets", [])
+        if buckets:
+            facets[field] = [
+                {"key": bucket["key"], "count": bucket["doc_count"]}
+                for bucket in buckets
+            ]
+    return facets
+
+
+def label_keys(facets):
+    """分面中的全部标签"""
+    return [bucket["key"] for bucket in facets.get("labels", [])]
+
+
+class LabelService:
+    """
+    全部标签及各分面的文档数。标签只在导入时变化，聚合结果按索引代数缓存：
+    代数变化后（或还没有任何结果时）同步查询，不返回上一代索引的计数；
+    同一代数下超过 refresh_interval 秒后，先返回旧结果并在后台刷新
+    """
+
+    def __init__(
+        self,
+        fields=FACET_FIELDS,
+        size=FACET_SIZE,
+        refresh_interval=LABEL_REFRESH_INTERVAL,
+    ):
+        self.fields = fields
+        self.body = {"size": 0, "aggs": facets_aggs(fields, size)}
+        self.refresh_interval = refresh_interval
+        self._state = (None, 0, None)  # (索引代数, 刷新时间, 分面)
+        self._refreshing = False
+        self._lock = threading.Lock()
+        self.refreshes = 0
+        self.errors = 0
+
+    def lookup(self, generation):
+        """
+        返回 (分面, 是否需要后台刷新)。还没有结果或索引代数已变化时分面为 None，
+        由调用方同步查询
+        """
+        cached_generation, refreshed_at, facets = self._state
+        if cached_generation != generation:
+            return None, True
+        return facets, time.time() - refreshed_at > self.refresh_interval
+
+    def update(self, generation, response):
+        """用聚合响应更新缓存，返回新的分面"""
+        facets = parse_facets(response, self.fields)
+        self._state = (generation, time.time(), facets)
+        self.refreshes += 1
+        return facets
+
+    def begin_refresh(self):
+        """占用后台刷新，已有刷新在进行时返回 False"""
+        with self._lock:
+            if self._refreshing:
+                return False
+            self._refreshing = True
+            return True
+
+    def end_refresh(self, failed=False):
+        with self._lock:
+            self._refreshing = False
+            if failed:
+                self.errors += 1
+
+    def get_facets(self):
+        generation = get_index_generation()
+        facets, stale = self.lookup(generation)
+        if facets is None:
+            return self.refresh(generation)
+        if stale and self.begin_refresh():
+            threading.Thread(
+                target=self._refresh_in_background, args=(generation,), daemon=True
+            ).start()
+        return facets
+
+    def get_labels(self):
+        return label_keys(self.get_facets())
+
+    def refresh(self, generation):
+        response = get_search_backend().search(index=INDEX_NAME, body=self.body)
+        return self.update(generation, response)
+
+    def _refresh_in_background(self, generation):
+        failed = False
+        try:
+            self.refresh(generation)
+        except Exception:
+            # 保留旧结果，下次请求时重试
+            failed = True
+        finally:
+            self.end_refresh(failed)
+
+    def stats(self):
+        generation, refreshed_at, facets = self._state
+        return {
+            "generation": generation,
+            "age": round(time.time() - refreshed_at, 1) if facets is not None else None,
+            "fields": sorted(facets) if facets is not None else [],
+            "refreshes": self.refreshes,
+            "errors": self.errors,
+        }
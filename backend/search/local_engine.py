@@ -0,0 +1,670 @@
+"""
+进程内 BM25 检索引擎，可在 backend/config.py 中设置 SEARCH_BACKEND = "local" 代替 Elasticsearch。
+
+索引由 indexer.py 生成的同一批文档构建：中文按相邻两字切分，每个文本字段一份倒排表，
+词项的文档号和词频以数组形式连续存放（.npy，按内存映射加载），检索时用 NumPy
+对整个倒排表切片向量化计算 BM25；检索 DSL 直接解释 QueryParams.to_es_query 的输出，
+字段权重与 ES 完全相同
+
+    python -m backend.search.local_engine build [--workers N]
+    python -m backend.search.local_engine search 盗窃 电动车
+"""
+
+import os
+import re
+import json
+import time
+import shutil
+import argparse
+import threading
+import unicodedata
+from array import array
+from bisect import bisect_right
+from collections import Counter
+import numpy as np
+from elasticsearch import NotFoundError
+from backend.config import (
+    LOCAL_INDEX_DIR,
+    LOCAL_BM25_K1,
+    LOCAL_BM25_B,
+    FACET_FIELDS,
+)
+from backend.search.backend import SearchBackend
+from backend.search.suggest_index import PrefixIndex
+
+# 参与全文检索的字段（QueryParams.to_es_query 中 match / multi_match 用到的）
+TEXT_FIELDS = [
+    "ajName",
+    "writName",
+    "ajjbqk",
+    "cpfxgc",
+    "pjjg",
+    "qw",
+    "fymc",
+    "spry",
+    "dsr",
+]
+
+# 汉字串和字母数字串
+TOKEN_PATTERN = re.compile(r"[\u4e00-\u9fff]+|[0-9a-z]+")
+
+# 倒排表中词频的上限（uint16）
+MAX_TF = 65535
+
+
+def tokenize(value):
+    """
+    汉字串按相邻两字切分（只有一个字时保留单字），字母数字串整体作为一个词。
+    value 为列表时逐项切分，词不跨越取值
+    """
+    if not value:
+        return []
+    if not isinstance(value, str):
+        return [token for item in value for token in tokenize(item)]
+    tokens = []
+    text = unicodedata.normalize("NFKC", value).lower()
+    for run in TOKEN_PATTERN.findall(text):
+        if run[0].isascii() or len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i : i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def _as_numpy(values, dtype):
+    """array.array 转为 NumPy 数组（共享内存）"""
+    if not len(values):
+        return np.zeros(0, dtype=dtype)
+    return np.frombuffer(values, dtype=dtype)
+
+
+class LocalIndexBuilder:
+    """
+    逐篇加入文档（bulk 动作的 _source），write() 时排序生成倒排表并写入 path
+    """
+
+    def __init__(self, path=LOCAL_INDEX_DIR):
+        self.path = path
+        self.tmp_path = path + ".tmp"
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+        os.makedirs(self.tmp_path)
+        self.vocab = {}  # 词 -> 词号（各字段共用）
+        self.ids = []  # 文档号 -> ajId
+        self._seen = set()
+        # 字段 -> (词号, 文档号, 词频)，写出时按词号排序
+        self.postings = {
+            field: (array("I"), array("I"), array("H")) for field in TEXT_FIELDS
+        }
+        self.lengths = {field: array("I") for field in TEXT_FIELDS}
+        # keyword 字段（标签、案件类型等）-> {取值: [文档号]}
+        self.keywords = {field: {} for field in FACET_FIELDS}
+        self.suggest = {}  # 补全字段 -> {输入: 权重}
+        self._docs = open(os.path.join(self.tmp_path, "docs.bin"), "wb")
+        self._doc_offsets = array("q", [0])
+
+    def add(self, source):
+        """加入一篇文档；ajId 重复的文档只保留第一篇（与按 _id 覆盖的效果相同）"""
+        ajId = source.get("ajId")
+        if not ajId or ajId in self._seen:
+            return
+        self._seen.add(ajId)
+        doc = len(self.ids)
+        self.ids.append(ajId)
+        stored = {k: v for k, v in source.items() if not k.endswith("_suggest")}
+        data = json.dumps(stored, ensure_ascii=False).encode("utf-8")
+        self._docs.write(data)
+        self._doc_offsets.append(self._doc_offsets[-1] + len(data))
+        for field in TEXT_FIELDS:
+            tokens = tokenize(source.get(field))
+            self.lengths[field].append(len(tokens))
+            terms, docs, tfs = self.postings[field]
+            for token, tf in Counter(tokens).items():
+                term = self.vocab.get(token)
+                if term is None:
+                    term = self.vocab[token] = len(self.vocab)
+                terms.append(term)
+                docs.append(doc)
+                tfs.append(min(tf, MAX_TF))
+        for field, postings in self.keywords.items():
+            values = source.get(field)
+            for value in values if isinstance(values, list) else [values]:
+                if value is not None:
+                    postings.setdefault(value, []).append(doc)
+        for key, inputs in source.items():
+            if not key.endswith("_suggest"):
+                continue
+            weights = self.suggest.setdefault(key[: -len("_suggest")], {})
+            for item in inputs:
+                text = item["input"]
+                weights[text] = max(weights.get(text, 0), item.get("weight", 1))
+
+    def track(self, actions):
+        """包装 bulk 动作生成器，边生成边加入"""
+        for action in actions:
+            self.add(action["_source"])
+            yield action
+
+    def _save(self, name, values):
+        np.save(os.path.join(self.tmp_path, f"{name}.npy"), values)
+
+    def _dump(self, name, data):
+        with open(os.path.join(self.tmp_path, name), "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+
+    def write(self):
+        """写出索引并替换 path 下的旧索引，返回文档数"""
+        self._docs.close()
+        self._save("docs.offsets", _as_numpy(self._doc_offsets, np.int64))
+        num_terms = len(self.vocab)
+        fields = {}
+        for field in TEXT_FIELDS:
+            terms, docs, tfs = self.postings[field]
+            terms = _as_numpy(terms, np.uint32)
+            docs = _as_numpy(docs, np.uint32)
+            tfs = _as_numpy(tfs, np.uint16)
+            order = np.argsort(terms, kind="stable")
+            offsets = np.zeros(num_terms + 1, dtype=np.int64)
+            np.cumsum(np.bincount(terms, minlength=num_terms), out=offsets[1:])
+            self._save(f"{field}.offsets", offsets)
+            self._save(f"{field}.docs", docs[order].astype(np.int32))
+            self._save(f"{field}.tfs", tfs[order])
+            lengths = _as_numpy(self.lengths[field], np.uint32)
+            self._save(f"{field}.lengths", lengths.astype(np.float32))
+            fields[field] = {"postings": int(len(order))}
+        # ajId 排序后的名次，用于 [_score desc, ajId asc] 排序
+        num_docs = len(self.ids)
+        ranks = np.empty(num_docs, dtype=np.int32)
+        ranks[sorted(range(num_docs), key=self.ids.__getitem__)] = np.arange(num_docs)
+        self._save("ranks", ranks)
+        self._dump("vocab.json", self.vocab)
+        self._dump("ids.json", self.ids)
+        self._dump("keywords.json", self.keywords)
+        self._dump("suggest.json", self.suggest)
+        # meta.json 最后写入，加载时以它的修改时间判断索引是否更新
+        self._dump(
+            "meta.json",
+            {
+                "num_docs": len(self.ids),
+                "num_terms": num_terms,
+                "fields": fields,
+                "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            },
+        )
+        old_path = self.path + ".old"
+        shutil.rmtree(old_path, ignore_errors=True)
+        if os.path.exists(self.path):
+            os.rename(self.path, old_path)
+        os.rename(self.tmp_path, self.path)
+        shutil.rmtree(old_path, ignore_errors=True)
+        return len(self.ids)
+
+
+class _FieldIndex:
+    """一个文本字段的倒排表（内存映射）和 BM25 长度归一化项"""
+
+    def __init__(self, path, field, k1, b):
+        def load(name):
+            return np.load(os.path.join(path, f"{field}.{name}.npy"), mmap_mode="r")
+
+        self.offsets = load("offsets")
+        self.docs = load("docs")
+        self.tfs = load("tfs")
+        lengths = np.asarray(load("lengths"))
+        self.doc_count = int(np.count_nonzero(lengths))
+        avgdl = lengths.sum() / max(self.doc_count, 1)
+        # tf / (tf + k1 * (1 - b + b * dl / avgdl)) 的分母常数部分
+        self.norm = (k1 * (1 - b + b * lengths / max(avgdl, 1e-9))).astype(np.float32)
+
+    def score(self, terms, out):
+        """把词项 [(词号, 查询中出现次数)] 的 BM25 得分累加到 out"""
+        for term, weight in terms:
+            lo, hi = self.offsets[term], self.offsets[term + 1]
+            if lo == hi:
+                continue
+            docs = self.docs[lo:hi]
+            tfs = self.tfs[lo:hi].astype(np.float32)
+            n = hi - lo
+            idf = np.log1p((self.doc_count - n + 0.5) / (n + 0.5))
+            out[docs] += (weight * idf) * tfs / (tfs + self.norm[docs])
+
+
+class _LocalIndex:
+    """加载后的本地索引：解释检索 DSL 并打分"""
+
+    def __init__(self, path, k1=LOCAL_BM25_K1, b=LOCAL_BM25_B):
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.num_docs = self.meta["num_docs"]
+
+        def load_json(name):
+            with open(os.path.join(path, name), "r", encoding="utf-8") as f:
+                return json.load(f)
+
+        self.vocab = load_json("vocab.json")
+        self.ids = load_json("ids.json")
+        self.ordinals = {ajId: i for i, ajId in enumerate(self.ids)}
+        self.sorted_ids = sorted(self.ids)
+        self.ranks = np.load(os.path.join(path, "ranks.npy"))
+        self.keywords = {
+            field: {value: np.array(docs, dtype=np.int32) for value, docs in v.items()}
+            for field, v in load_json("keywords.json").items()
+        }
+        self.suggest = {
+            field: PrefixIndex(weights)
+            for field, weights in load_json("suggest.json").items()
+        }
+        self.fields = {field: _FieldIndex(path, field, k1, b) for field in TEXT_FIELDS}
+        self.doc_offsets = np.load(os.path.join(path, "docs.offsets.npy"))
+        self.doc_data = np.memmap(os.path.join(path, "docs.bin"), mode="r")
+
+    def source(self, doc):
+        lo, hi = self.doc_offsets[doc], self.doc_offsets[doc + 1]
+        return json.loads(self.doc_data[lo:hi].tobytes().decode("utf-8"))
+
+    def _terms(self, text):
+        counts = Counter(tokenize(text))
+        return [(self.vocab[t], c) for t, c in counts.items() if t in self.vocab]
+
+    def _field_scores(self, field, terms, boost=1.0):
+        scores = np.zeros(self.num_docs, dtype=np.float32)
+        index = self.fields.get(field)
+        if index is not None:
+            index.score(terms, scores)
+        if boost != 1.0:
+            scores *= boost
+        return scores
+
+    def evaluate(self, query):
+        """返回 (得分, 是否命中)，均为长度为文档数的数组"""
+        ((kind, spec),) = query.items()
+        handler = getattr(self, f"_q_{kind}", None)
+        if handler is None:
+            raise ValueError(f"Unsupported query for local search: {kind}")
+        return handler(spec)
+
+    def _q_match_all(self, spec):
+        scores = np.full(self.num_docs, spec.get("boost", 1.0), dtype=np.float32)
+        return scores, np.ones(self.num_docs, dtype=bool)
+
+    def _q_multi_match(self, spec):
+        """best_fields：取各字段（乘以权重后）得分的最大值"""
+        terms = self._terms(spec["query"])
+        best = np.zeros(self.num_docs, dtype=np.float32)
+        for field in spec["fields"]:
+            name, _, boost = field.partition("^")
+            scores = self._field_scores(name, terms, float(boost or 1))
+            np.maximum(best, scores, out=best)
+        best *= spec.get("boost", 1.0)
+        return best, best > 0
+
+    def _q_match(self, spec):
+        boost = spec.get("boost", 1.0)
+        ((field, value),) = ((k, v) for k, v in spec.items() if k != "boost")
+        if isinstance(value, dict):
+            boost *= value.get("boost", 1.0)
+            value = value["query"]
+        scores = self._field_scores(field, self._terms(value), boost)
+        return scores, scores > 0
+
+    def _q_terms(self, spec):
+        boost = spec.get("boost", 1.0)
+        ((field, values),) = ((k, v) for k, v in spec.items() if k != "boost")
+        mask = self._keyword_mask(field, values)
+        return np.where(mask, np.float32(boost), np.float32(0)), mask
+
+    def _q_term(self, spec):
+        ((field, value),) = spec.items()
+        if isinstance(value, dict):
+            value = value["value"]
+        mask = self._keyword_mask(field, [value])
+        return mask.astype(np.float32), mask
+
+    def _q_ids(self, spec):
+        return self._q_terms({"ajId": spec["values"]})
+
+    def _keyword_mask(self, field, values):
+        mask = np.zeros(self.num_docs, dtype=bool)
+        if field in self.keywords:
+            for value in values:
+                docs = self.keywords[field].get(value)
+                if docs is not None:
+                    mask[docs] = True
+        elif field in ("ajId", "_id"):
+            docs = [self.ordinals[v] for v in values if v in self.ordinals]
+            mask[docs] = True
+        else:
+            raise ValueError(f"Unsupported keyword field for local search: {field}")
+        return mask
+
+    def _q_bool(self, spec):
+        scores = np.zeros(self.num_docs, dtype=np.float32)
+        matched = np.ones(self.num_docs, dtype=bool)
+        for clause in _as_list(spec.get("must")):
+            clause_scores, clause_matched = self.evaluate(clause)
+            scores += clause_scores
+            matched &= clause_matched
+        for clause in _as_list(spec.get("filter")):
+            matched &= self.evaluate(clause)[1]
+        should = _as_list(spec.get("should"))
+        any_should = np.zeros(self.num_docs, dtype=bool)
+        for clause in should:
+            clause_scores, clause_matched = self.evaluate(clause)
+            scores += np.where(clause_matched, clause_scores, np.float32(0))
+            any_should |= clause_matched
+        # 没有 must / filter 时至少要命中一个 should
+        if should and not spec.get("must") and not spec.get("filter"):
+            matched &= any_should
+        return scores, matched
+
+    def query_texts(self, query):
+        """检索 DSL 中的全部检索文本（用于生成高亮片段）"""
+        texts = []
+        if isinstance(query, dict):
+            for key, value in query.items():
+                if key in ("multi_match", "match") and isinstance(value, dict):
+                    for k, v in value.items():
+                        if k == "query" and isinstance(v, str):
+                            texts.append(v)
+                        elif isinstance(v, dict) and isinstance(v.get("query"), str):
+                            texts.append(v["query"])
+                        elif k not in ("boost", "fields", "type") and isinstance(
+                            v, str
+                        ):
+                            texts.append(v)
+                else:
+                    texts.extend(self.query_texts(value))
+        elif isinstance(query, list):
+            for item in query:
+                texts.extend(self.query_texts(item))
+        return texts
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _filter_source(doc, spec):
+    """按 _source / _source_includes 参数过滤文档字段"""
+    if spec is False:
+        return None
+    if spec is None or spec is True:
+        return doc
+    if isinstance(spec, dict):
+        spec = spec.get("includes", list(doc))
+    if isinstance(spec, str):
+        spec = [spec]
+    return {k: doc[k] for k in spec if k in doc}
+
+
+def _fragment(text, tokens, fragment_size, no_match_size):
+    """高亮片段：从第一个命中的词附近截取 fragment_size 个字符"""
+    positions = [p for p in (text.find(t) for t in tokens) if p >= 0]
+    if not positions:
+        return text[:no_match_size] if no_match_size else None
+    start = max(0, min(positions) - fragment_size // 4)
+    return text[start : start + fragment_size]
+
+
+class _LocalIndices:
+    def __init__(self, engine):
+        self._engine = engine
+
+    def get_mapping(self, index=None, **kwargs):
+        properties = {
+            f"{field}_suggest": {"type": "completion"}
+            for field in self._engine.index().suggest
+        }
+        return {"local": {"mappings": {"properties": properties}}}
+
+    def exists(self, index=None, **kwargs):
+        return True
+
+    def refresh(self, index=None, **kwargs):
+        return {}
+
+
+class LocalSearchEngine(SearchBackend):
+    """
+    SearchBackend 的进程内实现，支持 QueryManager 用到的检索、取文档、
+    补全和标签聚合。索引目录更新（重新 build）后自动重新加载
+    """
+
+    def __init__(self, path=LOCAL_INDEX_DIR):
+        self.path = path
+        self.indices = _LocalIndices(self)
+        self._index = None
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def index(self):
+        try:
+            mtime = os.stat(os.path.join(self.path, "meta.json")).st_mtime_ns
+        except FileNotFoundError:
+            raise RuntimeError(
+                f"Local index not found in {self.path}; "
+                "run python -m backend.search.local_engine build"
+            )
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    self._index = _LocalIndex(self.path)
+                    self._mtime = mtime
+        return self._index
+
+    def search(self, index=None, body=None, **kwargs):
+        body = body or {}
+        idx = self.index()
+        if "suggest" in body:
+            return {"hits": {"hits": []}, "suggest": self._suggest(idx, body)}
+        scores, matched = idx.evaluate(body.get("query") or {"match_all": {}})
+        candidates = np.flatnonzero(matched)
+        candidate_scores = scores[candidates]
+        response = {
+            "hits": {
+                "total": {"value": int(len(candidates)), "relation": "eq"},
+                "hits": [],
+            }
+        }
+        if "aggs" in body:
+            response["aggregations"] = self._aggregate(idx, body["aggs"], candidates)
+        size = body.get("size", 10)
+        if size:
+            ranks = idx.ranks[candidates]
+            # [_score desc, ajId asc]
+            order = np.lexsort((ranks, -candidate_scores))
+            if body.get("search_after"):
+                # point-in-time 检索的游标末尾多一个 _shard_doc
+                after_score, after_id = body["search_after"][:2]
+                after_score = np.float32(after_score)
+                after_rank = bisect_right(idx.sorted_ids, after_id)
+                s, r = candidate_scores[order], ranks[order]
+                keep = (s < after_score) | ((s == after_score) & (r >= after_rank))
+                order = order[keep]
+            start = body.get("from", 0)
+            response["hits"]["hits"] = [
+                self._hit(idx, body, candidates[i], candidate_scores[i])
+                for i in order[start : start + size]
+            ]
+        if "pit" in body:
+            response["pit_id"] = body["pit"]["id"]
+        return response
+
+    def _hit(self, idx, body, doc, score):
+        ajId = idx.ids[doc]
+        hit = {"_id": ajId, "_score": float(score), "sort": [float(score), ajId]}
+        if "pit" in body:
+            hit["sort"].append(int(doc))  # 对应 ES 的隐式 _shard_doc
+        source_spec = body.get("_source")
+        highlight = body.get("highlight")
+        if source_spec is not False or highlight:
+            doc_source = idx.source(doc)
+            source = _filter_source(doc_source, source_spec)
+            if source is not None:
+                hit["_source"] = source
+            if highlight:
+                hit["highlight"] = self._highlight(idx, body, doc_source, highlight)
+        return hit
+
+    def _highlight(self, idx, body, source, highlight):
+        tokens = {t for text in idx.query_texts(body["query"]) for t in tokenize(text)}
+        # 较长的词优先（字母数字串），保证片段里有完整命中
+        tokens = sorted(tokens, key=len, reverse=True)
+        result = {}
+        for field, options in highlight.get("fields", {}).items():
+            text = source.get(field)
+            if not isinstance(text, str) or not text:
+                continue
+            fragment = _fragment(
+                text,
+                tokens,
+                options.get("fragment_size", 100),
+                options.get("no_match_size", 0),
+            )
+            if fragment:
+                result[field] = [fragment]
+        return result
+
+    def _aggregate(self, idx, aggs, candidates):
+        """keyword 字段的 terms 聚合，其他字段按未映射处理（返回空桶）"""
+        result = {}
+        members = np.zeros(idx.num_docs, dtype=bool)
+        members[candidates] = True
+        for name, agg in aggs.items():
+            terms = agg.get("terms", {})
+            counts = [
+                (value, int(np.count_nonzero(members[docs])))
+                for value, docs in idx.keywords.get(terms.get("field"), {}).items()
+            ]
+            counts = [c for c in counts if c[1] > 0]
+            counts.sort(key=lambda c: (-c[1], c[0]))
+            result[name] = {
+                "buckets": [
+                    {"key": label, "doc_count": count}
+                    for label, count in counts[: terms.get("size", 10)]
+                ]
+            }
+        return result
+
+    def _suggest(self, idx, body):
+        result = {}
+        for name, spec in body["suggest"].items():
+            prefix = spec["prefix"]
+            completion = spec["completion"]
+            field = completion["field"][: -len("_suggest")]
+            index = idx.suggest.get(field)
+            options = []
+            if index is not None:
+                options = [
+                    {"text": text, "_score": float(weight)}
+                    for text, weight in index.lookup(prefix, completion.get("size", 5))
+                ]
+            result[name] = [{"text": prefix, "options": options}]
+        return result
+
+    def msearch(self, body=None, index=None, **kwargs):
+        responses = []
+        for header, search in zip(body[::2], body[1::2]):
+            try:
+                responses.append(
+                    self.search(index=header.get("index", index), body=search)
+                )
+            except ValueError as e:
+                responses.append({"error": {"type": "local_error", "reason": str(e)}})
+        return {"responses": responses}
+
+    def mget(self, index=None, body=None, _source_includes=None, **kwargs):
+        idx = self.index()
+        docs = []
+        for ajId in body["ids"]:
+            doc = idx.ordinals.get(ajId)
+            if doc is None:
+                docs.append({"_id": ajId, "found": False})
+                continue
+            source = _filter_source(idx.source(doc), _source_includes)
+            docs.append({"_id": ajId, "found": True, "_source": source})
+        return {"docs": docs}
+
+    def get(self, index=None, id=None, **kwargs):
+        idx = self.index()
+        doc = idx.ordinals.get(id)
+        if doc is None:
+            raise NotFoundError(404, "not_found", {"_id": id, "found": False})
+        return {"_id": id, "found": True, "_source": idx.source(doc)}
+
+    def open_point_in_time(self, index=None, keep_alive=None, **kwargs):
+        # 加载后的索引不会变化，翻页天然一致
+        return {"id": "local"}
+
+    def close_point_in_time(self, body=None, **kwargs):
+        return {"succeeded": True}
+
+
+_local_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_local_engine():
+    """全局的本地检索引擎，首次使用时创建"""
+    global _local_engine
+    if _local_engine is None:
+        with _engine_lock:
+            if _local_engine is None:
+                _local_engine = LocalSearchEngine()
+    return _local_engine
+
+
+def build(workers, chunk_size=16):
+    """用 indexer.py 的解析流程生成 LeCaRD 候选文档，构建本地索引"""
+    from tqdm import tqdm
+    from backend.elastic.generation import bump_index_generation
+    from backend.elastic.indexer import (
+        build_ajid_label_map,
+        generate_docs,
+        list_candidate_files,
+    )
+
+    label_map = build_ajid_label_map()
+    files = list_candidate_files()
+    builder = LocalIndexBuilder()
+    actions = generate_docs(label_map, files, workers, chunk_size, ordered=True)
+    for _ in tqdm(builder.track(actions), total=len(files), desc="Building"):
+        pass
+    count = builder.write()
+    bump_index_generation()
+    return count
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="进程内 BM25 检索引擎")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("build", help="从 LeCaRD 候选文档构建本地索引")
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    p = sub.add_parser("search", help="在本地索引上试查")
+    p.add_argument("query", nargs="+")
+    p.add_argument("--size", type=int, default=10)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.command == "build":
+        start = time.perf_counter()
+        count = build(args.workers)
+        print(
+            f"本地索引构建完成：{count} 篇，用时 {time.perf_counter() - start:.1f} 秒"
+        )
+    else:
+        from backend.search.query import QueryParams
+
+        engine = get_local_engine()
+        body = QueryParams(query=" ".join(args.query)).to_es_query()
+        body["size"] = args.size
+        engine.search(body=body)  # 预热（加载索引）
+        start = time.perf_counter()
+        response = engine.search(body=body)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{response['hits']['total']['value']} hits in {elapsed:.2f} ms")
+        for hit in response["hits"]["hits"]:
+            print(f"{hit['_score']:8.3f}  {hit['_id']}  {hit['_source'].get('ajName')}")
@@ -1,6 +1,23 @@
 import time
 import uuid
+import json
+import struct
+import hashlib
+import unicodedata
+from array import array
 from typing import Optional, List
+from backend.search.results import ResultList
+
+
+def normalize_text(text):
+    """
+    规范化检索文本：全角转半角（NFKC）、去除首尾空白、合并连续空白
+    空字符串视为 None
+    """
+    if text is None:
+        return None
+    text = " ".join(unicodedata.normalize("NFKC", str(text)).split())
+    return text or None
 
 
 class QueryParams:
@@ -8,6 +25,8 @@ class QueryParams:
     检索参数对象，封装前端传来的所有检索条件
     """
 
+    __slots__ = ("query", "qw", "ajmc", "ay", "fymc", "spry", "dsr")
+
     def __init__(
         self,
         query: str = "",
@@ -44,6 +63,35 @@ class QueryParams:
             dsr=d.get("dsr"),
         )
 
+    def to_dict(self):
+        return {
+            "query": self.query,
+            "qw": self.qw,
+            "ajmc": self.ajmc,
+            "ay": list(self.ay),
+            "fymc": self.fymc,
+            "spry": self.spry,
+            "dsr": self.dsr,
+        }
+
+    def fingerprint(self):
+        """
+        检索条件的规范化指纹：语义相同的检索（空白、全半角、案由顺序不同）
+        得到相同的指纹，用作跨查询结果缓存的键。规范化只用于指纹，
+        发给 ES 的检索条件保持原样
+        """
+        canonical = [
+            normalize_text(self.query) or "",
+            normalize_text(self.qw),
+            normalize_text(self.ajmc),
+            sorted({a for a in map(normalize_text, self.ay) if a}),
+            normalize_text(self.fymc),
+            normalize_text(self.spry),
+            normalize_text(self.dsr),
+        ]
+        data = json.dumps(canonical, ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
     def to_es_query(self):
         """
         转换为ES检索DSL
@@ -123,12 +171,83 @@ class Query:
     检索请求对象，封装一次检索的参数和结果
     """
 
+    __slots__ = (
+        "id",
+        "params",
+        "created_at",
+        "last_accessed",
+        "total_results",
+        "results",
+        "es_query",
+        "fingerprint",
+        "generation",
+        "search_after",
+        "pit_id",
+        "version",
+        "facets",
+    )
+
     def __init__(self, params: QueryParams):
         self.id = f"q_{uuid.uuid4().hex[:10]}"
         self.params = params  # QueryParams对象
         self.created_at = time.time()
         self.last_accessed = self.created_at
         self.total_results = 0
-        self.results = []  # (doc_id, score)
+        self.results = ResultList()  # (doc_id, score)，按需扩展
         self.es_query = None  # ES查询DSL
+        self.fingerprint = None  # 检索条件指纹
+        self.generation = None  # 检索时的索引代数
+        self.search_after = None  # 已取结果最后一条的 sort 值
+        self.pit_id = None  # point-in-time ID（启用时）
         self.version = 1
+        self.facets = None  # 首次检索时统计的分面计数
+
+    def is_exhausted(self):
+        """结果是否已全部取回"""
+        return len(self.results) >= self.total_results
+
+    # 序列化头部：元数据长度、ID 区长度、得分区长度
+    _HEADER = struct.Struct("<III")
+
+    def dumps(self):
+        """
+        序列化为紧凑的二进制形式，供进程外的查询存储使用：
+        元数据为 JSON，结果 ID 以 NUL 字符分隔，得分为 float32 数组
+        """
+        meta = {
+            "id": self.id,
+            "params": self.params.to_dict(),
+            "created_at": self.created_at,
+            "last_accessed": self.last_accessed,
+            "total_results": self.total_results,
+            "es_query": self.es_query,
+            "fingerprint": self.fingerprint,
+            "generation": self.generation,
+            "search_after": self.search_after,
+            "pit_id": self.pit_id,
+            "version": self.version,
+            "facets": self.facets,
+        }
+        meta_bytes = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+        ids = "\0".join(self.results.ids()).encode("utf-8")
+        scores = self.results.scores.tobytes()
+        header = self._HEADER.pack(len(meta_bytes), len(ids), len(scores))
+        return header + meta_bytes + ids + scores
+
+    @classmethod
+    def loads(cls, data):
+        """从 dumps 的结果还原查询"""
+        meta_len, ids_len, scores_len = cls._HEADER.unpack_from(data)
+        offset = cls._HEADER.size
+        meta = json.loads(data[offset : offset + meta_len].decode("utf-8"))
+        offset += meta_len
+        ids_bytes = data[offset : offset + ids_len]
+        offset += ids_len
+        scores = array("f")
+        scores.frombytes(data[offset : offset + scores_len])
+        query = cls(QueryParams.from_dict(meta.pop("params")))
+        for key, value in meta.items():
+            setattr(query, key, value)
+        ids = ids_bytes.decode("utf-8").split("\0") if ids_bytes else []
+        query.results = ResultList(zip(ids, scores))
+        return query
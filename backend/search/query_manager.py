@@ -1,8 +1,33 @@
 import time
-from collections import OrderedDict
-from backend.elastic.client import get_es_client
-from backend.config import INDEX_NAME
+import logging
+import threading
+from elasticsearch import NotFoundError, TransportError
+from backend.search.backend import get_search_backend
+from backend.config import (
+    INDEX_NAME,
+    RESULT_PREFETCH_SIZE,
+    RESULT_FETCH_BATCH,
+    RESULT_PIT_KEEP_ALIVE,
+    RESULT_PREVIEW_LENGTH,
+    RESULT_CACHE_MAX_BYTES,
+    QUERY_SWEEP_INTERVAL,
+    SHARED_RESULT_CACHE_SIZE,
+    SUGGEST_SIZE,
+    SUGGEST_CACHE_SIZE,
+    SUGGEST_CACHE_TTL,
+    FACET_FIELDS,
+    QUERY_FACET_SIZE,
+)
+from backend.elastic.generation import get_index_generation
 from backend.search.query import QueryParams, Query
+from backend.search.cache import ResultCache, GenerationCache
+from backend.search.store import QueryStore, create_query_store
+from backend.search.suggest_index import SuggestionEngine
+from backend.search.labels import LabelService, facets_aggs, parse_facets
+from backend.search.documents import DocumentService
+from backend.search.similar import get_similar_index
+
+logger = logging.getLogger(__name__)
 
 # 最大缓存查询数量
 MAX_QUERIES = 1000
@@ -10,92 +35,420 @@ MAX_QUERIES = 1000
 # 查询过期时间（秒）
 QUERY_TTL = 3600  # 1小时
 
+# 结果排序：先按得分，再按 ajId 打破平局，保证 search_after 翻页稳定
+RESULT_SORT = [{"_score": "desc"}, {"ajId": "asc"}]
+
+# 结果页返回的字段
+RESULT_FIELDS = [
+    "ajId",
+    "ajName",
+    "ajjbqk",
+    "cpfxgc",
+    "pjjg",
+    "qw",
+    "writId",
+    "writName",
+    "labels",
+    "fymc",  # 新增：法院名称
+    "spry",  # 新增：审判人员
+    "dsr",  # 新增：当事人
+]
+
+# 预览模式下只返回片段的长文本字段
+PREVIEW_FIELDS = ["ajjbqk", "cpfxgc", "pjjg", "qw"]
+
 
 class QueryManager:
     """
     查询管理器，负责管理所有检索请求及其结果缓存
     """
 
-    def __init__(self):
-        self.queries = OrderedDict()
-        self.results_cache = {}  # (query_id, page, page_size) -> 结果
+    def __init__(self, store: QueryStore = None):
+        # query_id -> Query，可在多个进程间共享
+        self.store = store if store is not None else create_query_store()
+        # query_id -> {(version, page, page_size, preview): 结果}
+        self.results_cache = ResultCache(RESULT_CACHE_MAX_BYTES, QUERY_TTL)
+        # 检索条件指纹 -> 结果集，相同检索直接复用
+        self.result_sets = GenerationCache(SHARED_RESULT_CACHE_SIZE, QUERY_TTL)
+        # (字段, 前缀, 条数) -> 补全结果
+        self.suggest_cache = GenerationCache(SUGGEST_CACHE_SIZE, SUGGEST_CACHE_TTL)
+        self._completion_fields = (None, set())  # (索引代数, 存在的补全字段)
+        # 短字段的进程内补全
+        self.suggestion_engine = SuggestionEngine()
+        # 全部标签和分面计数，按索引代数缓存
+        self.label_service = LabelService()
+        # 详情页文档，按 _id 读取并缓存
+        self.document_service = DocumentService()
+        # query_id -> 锁，同一查询的结果扩展和更新串行执行
+        self._query_locks = {}
+        self._query_locks_lock = threading.Lock()
+        self._last_sweep = time.time()
 
     def create_query(self, params: QueryParams):
         """创建新查询并执行"""
-        if len(self.queries) >= MAX_QUERIES:
+        self._maybe_clean_expired()
+        if len(self.store) >= MAX_QUERIES:
             self._evict_oldest()
         query = Query(params)
-        es_response = self._execute_es_query(params)
-        query.total_results = es_response["hits"]["total"]["value"]
-        query.results = [
-            (hit["_id"], hit["_score"]) for hit in es_response["hits"]["hits"]
-        ]
-        query.es_query = es_response["_query"]
-        self.queries[query.id] = query
+        self._run_query(query)
+        self.store.put(query)
         return query.id
 
-    def get_results(self, query_id, page=1, page_size=10):
-        """获取查询结果（带缓存）"""
-        if query_id not in self.queries:
+    def create_queries(self, params_list):
+        """
+        批量创建查询：未命中共享结果集的检索合并为一次 _msearch 请求，
+        相同检索条件只检索一次。按输入顺序返回 query_id，检索失败的为 None
+        """
+        self._maybe_clean_expired()
+        if RESULT_PIT_KEEP_ALIVE:
+            # 每个查询各自打开 point-in-time，不合并检索
+            return [self._create_query_or_none(params) for params in params_list]
+        queries, pending = self._prepare_batch(params_list)
+        failed = set()
+        if pending:
+            bodies, search = self._msearch_body(pending)
+            responses = get_search_backend().msearch(body=search)["responses"]
+            failed = self._apply_batch(pending, bodies, responses)
+        return self._store_batch(queries, failed)
+
+    def _create_query_or_none(self, params: QueryParams):
+        try:
+            return self.create_query(params)
+        except TransportError:
             return None
-        query = self.queries[query_id]
-        query.last_accessed = time.time()
-        cache_key = (query_id, page, page_size)
-        if cache_key in self.results_cache:
-            return self.results_cache[cache_key]
+
+    def _prepare_batch(self, params_list):
+        """返回 (全部查询, {指纹: 未命中共享结果集、需要检索的查询})"""
+        queries = [Query(params) for params in params_list]
+        pending = {}
+        for query in queries:
+            if not self._reuse_results(query):
+                pending.setdefault(query.fingerprint, []).append(query)
+        return queries, pending
+
+    def _msearch_body(self, pending):
+        bodies = [
+            self._build_es_query(group[0].params, RESULT_PREFETCH_SIZE)
+            for group in pending.values()
+        ]
+        search = []
+        for body in bodies:
+            search.extend([{"index": INDEX_NAME}, body])
+        return bodies, search
+
+    def _apply_batch(self, pending, bodies, responses):
+        """填充批量检索的结果，返回检索失败的 query_id"""
+        failed = set()
+        for group, body, response in zip(pending.values(), bodies, responses):
+            if "error" in response:
+                failed.update(query.id for query in group)
+                continue
+            response["_query"] = body
+            for query in group:
+                self._apply_response(query, response)
+        return failed
+
+    def _store_batch(self, queries, failed):
+        query_ids = []
+        for query in queries:
+            if query.id in failed:
+                query_ids.append(None)
+                continue
+            if len(self.store) >= MAX_QUERIES:
+                self._evict_oldest()
+            self.store.put(query)
+            query_ids.append(query.id)
+        return query_ids
+
+    def get_results(
+        self, query_id, page=1, page_size=10, preview=False, ids_only=False
+    ):
+        """
+        获取查询结果（带缓存）
+        preview=True 时长文本字段只返回与查询相关的片段，而非全文
+        ids_only=True 时只返回 ajId 和得分，不读取文档（评测用）
+        """
+        self._maybe_clean_expired()
+        query = self.store.get(query_id)
+        if query is None:
+            return None
+        if ids_only:
+            return self._get_result_ids(query, page, page_size)
+        # 带上版本号，其他进程更新查询后旧页自然失效
+        cached = self.results_cache.get(
+            query_id, (query.version, page, page_size, preview)
+        )
+        if cached is not None:
+            return cached
         start = (page - 1) * page_size
         end = start + page_size
+        query = self._extend_results(query, end)
         page_ids_scores = query.results[start:end]
         page_ids = [doc_id for doc_id, _ in page_ids_scores]
-        docs = self._get_docs_by_ids(page_ids)
+        if preview:
+            docs = self._get_previews_by_ids(query, page_ids)
+        else:
+            docs = self._get_docs_by_ids(page_ids, RESULT_FIELDS)
+        response = self._build_page(query, page, page_size, page_ids_scores, docs)
+        page_key = (query.version, page, page_size, preview)
+        self.results_cache.put(query_id, page_key, response)
+        return response
+
+    def _build_page(self, query: Query, page, page_size, page_ids_scores, docs):
         # 构建 id->score 映射
         id2score = {doc_id: score for doc_id, score in page_ids_scores}
-        processed_docs = self._process_results(docs, id2score)
-        response = {
+        return {
             "page": page,
             "total_pages": (query.total_results + page_size - 1) // page_size,
-            "results": processed_docs,
+            "results": self._process_results(docs, id2score),
         }
-        self.results_cache[cache_key] = response
-        return response
+
+    def _get_result_ids(self, query: Query, page, page_size):
+        start = (page - 1) * page_size
+        query = self._extend_results(query, start + page_size)
+        return {
+            "page": page,
+            "total_pages": (query.total_results + page_size - 1) // page_size,
+            "results": [
+                {"ajId": doc_id, "score": score}
+                for doc_id, score in query.results[start : start + page_size]
+            ],
+        }
+
+    def rank_ids(self, params: QueryParams, es_query=None, batch=RESULT_FETCH_BATCH):
+        """
+        按排序逐条返回 (ajId, 得分)，每次向 ES 拉取 batch 条，调用方取够即可停止。
+        只取 ID 和得分，不读 _source，也不进入查询存储和缓存（评测用）。
+        es_query 可替换默认的检索 DSL（如对比不同的排序配置）
+        """
+        es = get_search_backend()
+        body = dict(es_query if es_query is not None else params.to_es_query())
+        body.update(
+            size=batch, sort=RESULT_SORT, track_scores=True, track_total_hits=False
+        )
+        body["_source"] = False
+        while True:
+            response = es.search(
+                index=INDEX_NAME,
+                body=body,
+                filter_path=["hits.hits._id", "hits.hits._score", "hits.hits.sort"],
+            )
+            hits = response.get("hits", {}).get("hits", [])
+            for hit in hits:
+                yield hit["_id"], hit["_score"]
+            if len(hits) < batch:
+                return
+            body["search_after"] = hits[-1]["sort"]
 
     def get_query(self, query_id):
         """获取查询元数据"""
-        if query_id in self.queries:
-            query = self.queries[query_id]
-            query.last_accessed = time.time()
+        query = self.store.get(query_id)
+        if query is not None:
             return {
                 "id": query.id,
-                "params": vars(query.params),
+                "params": query.params.to_dict(),
                 "created_at": query.created_at,
                 "last_accessed": query.last_accessed,
                 "total_results": query.total_results,
                 "version": query.version,
+                "facets": query.facets,
             }
         return None
 
     def update_query(self, query_id, new_params: QueryParams):
         """更新查询参数并重新检索"""
-        if query_id not in self.queries:
-            return None
-        query = self.queries[query_id]
-        new_query = Query(new_params)
-        new_query.version = query.version + 1
-        es_response = self._execute_es_query(new_params)
-        new_query.total_results = es_response["hits"]["total"]["value"]
-        new_query.results = [
-            (hit["_id"], hit["_score"]) for hit in es_response["hits"]["hits"]
-        ]
-        new_query.es_query = es_response["_query"]
-        self.queries[query_id] = new_query
-        self._clear_query_cache(query_id)
-        return new_query.id
+        with self._query_lock(query_id):
+            query = self.store.get(query_id)
+            if query is None:
+                return None
+            new_query = Query(new_params)
+            new_query.id = query_id
+            new_query.version = query.version + 1
+            self._run_query(new_query)
+            self._release_query(query)
+            self.store.put(new_query)
+            self._clear_query_cache(query_id)
+            return new_query.id
+
+    def _query_lock(self, query_id):
+        """
+        同一查询的锁。MemoryQueryStore 中各线程拿到的是同一个 Query 对象，
+        不加锁时并发的翻页请求会从同一个游标扩展，重复追加结果
+        """
+        with self._query_locks_lock:
+            lock = self._query_locks.get(query_id)
+            if lock is None:
+                lock = self._query_locks[query_id] = threading.Lock()
+            return lock
+
+    def _run_query(self, query: Query):
+        """
+        执行首次检索，只预取前几页结果，总数由 track_total_hits 给出
+        相同检索条件且索引未重建时直接复用共享结果集
+        """
+        if RESULT_PIT_KEEP_ALIVE:
+            self._run_pit_query(query)
+            return
+        if self._reuse_results(query):
+            return
+        es_response = self._execute_es_query(query.params, size=RESULT_PREFETCH_SIZE)
+        self._apply_response(query, es_response)
+
+    def _run_pit_query(self, query: Query):
+        """
+        启用 point-in-time 时，首次检索就在新打开的 PIT 上执行，之后的翻页
+        沿用同一快照和 PIT 检索返回的游标。PIT 归查询所有，不共享结果集
+        """
+        es = get_search_backend()
+        query.generation = get_index_generation()
+        query.pit_id = es.open_point_in_time(
+            index=INDEX_NAME, keep_alive=RESULT_PIT_KEEP_ALIVE
+        )["id"]
+        body = self._build_es_query(query.params, RESULT_PREFETCH_SIZE)
+        try:
+            response = es.search(body=self._with_pit(query, body))
+        except Exception:
+            self._release_query(query)
+            raise
+        query.pit_id = response.get("pit_id", query.pit_id)
+        response["_query"] = body
+        self._apply_response(query, response)
+
+    def _with_pit(self, query: Query, body):
+        """在查询的 point-in-time 上检索（不指定索引）"""
+        return {
+            **body,
+            "pit": {"id": query.pit_id, "keep_alive": RESULT_PIT_KEEP_ALIVE},
+        }
+
+    def _drop_pit(self, query: Query):
+        """
+        point-in-time 已过期，之后退回普通 search_after：
+        PIT 检索的 sort 值末尾带有隐式的 _shard_doc，去掉后才能用作普通游标
+        """
+        query.pit_id = None
+        if query.search_after is not None:
+            query.search_after = query.search_after[: len(RESULT_SORT)]
+
+    def _reuse_results(self, query: Query):
+        """
+        记录查询的指纹和索引代数；共享结果集中已有相同检索时直接复用，返回是否命中
+        """
+        query.fingerprint = query.params.fingerprint()
+        query.generation = get_index_generation()
+        result_set = self.result_sets.get(query.fingerprint, query.generation)
+        if result_set is None:
+            return False
+        query.total_results = result_set["total_results"]
+        query.es_query = result_set["es_query"]
+        query.results = result_set["results"].copy()
+        query.search_after = result_set["search_after"]
+        query.facets = result_set["facets"]
+        return True
+
+    def _apply_response(self, query: Query, es_response):
+        """用首次检索的响应填充查询，并写入共享结果集"""
+        query.total_results = es_response["hits"]["total"]["value"]
+        query.es_query = es_response["_query"]
+        query.facets = parse_facets(es_response, FACET_FIELDS)
+        self._append_hits(query, es_response["hits"]["hits"])
+        self._share_results(query)
+
+    def _share_results(self, query: Query):
+        """把查询的已取结果写入共享结果集缓存"""
+        if query.fingerprint is None:
+            # point-in-time 查询不共享
+            return
+        self.result_sets.put(
+            query.fingerprint,
+            query.generation,
+            {
+                "total_results": query.total_results,
+                "es_query": query.es_query,
+                "results": query.results.copy(),
+                "search_after": query.search_after,
+                "facets": query.facets,
+            },
+        )
 
-    def _execute_es_query(self, params: QueryParams):
+    def _append_hits(self, query: Query, hits):
+        """把一批命中追加到查询结果，并记录 search_after 游标"""
+        query.results.extend((hit["_id"], hit["_score"]) for hit in hits)
+        if hits:
+            query.search_after = hits[-1]["sort"]
+
+    def _extend_results(self, query: Query, end):
+        """
+        确保前 end 条结果已取回，返回扩展后的查询。扩展在查询锁内进行，
+        并在锁内重新读取查询：等锁期间其他线程可能已经扩展或更新了它
+        """
+        if len(query.results) >= min(end, query.total_results):
+            return query
+        with self._query_lock(query.id):
+            latest = self.store.get(query.id)
+            if latest is not None:
+                query = latest
+            if self._ensure_results(query, end) and latest is not None:
+                self.store.put(query)
+        return query
+
+    def _ensure_results(self, query: Query, end):
+        """
+        确保前 end 条结果已取回，不足时通过 search_after 按需扩展
+        返回是否拉取了新结果
+        """
+        target = min(end, query.total_results)
+        if len(query.results) >= target:
+            return False
+        while len(query.results) < target:
+            size = max(target - len(query.results), RESULT_FETCH_BATCH)
+            hits = self._fetch_more(query, size)
+            if not hits:
+                # 索引在两次请求之间发生变化，实际结果少于总数
+                query.total_results = len(query.results)
+                break
+            self._append_hits(query, hits)
+        if query.generation == get_index_generation():
+            self._share_results(query)
+        return True
+
+    def _fetch_more(self, query: Query, size):
+        """从上次的游标之后继续拉取 size 条结果"""
+        es = get_search_backend()
+        if query.pit_id is not None:
+            try:
+                body = self._with_pit(query, self._fetch_more_body(query, size))
+                response = es.search(body=body)
+                query.pit_id = response.get("pit_id", query.pit_id)
+                return response["hits"]["hits"]
+            except NotFoundError:
+                self._drop_pit(query)
+        body = self._fetch_more_body(query, size)
+        response = es.search(index=INDEX_NAME, body=body)
+        return response["hits"]["hits"]
+
+    def _fetch_more_body(self, query: Query, size):
+        body = dict(query.es_query)
+        body.pop("aggs", None)  # 分面只在首次检索时统计
+        body["size"] = size
+        body["search_after"] = query.search_after
+        body["track_total_hits"] = False
+        return body
+
+    def _release_query(self, query: Query):
+        """释放查询占用的ES资源"""
+        if query.pit_id is None:
+            return
+        try:
+            get_search_backend().close_point_in_time(body={"id": query.pit_id})
+        except Exception:
+            pass
+        query.pit_id = None
+
+    def _execute_es_query(self, params: QueryParams, size=RESULT_PREFETCH_SIZE):
         """构建并执行ES查询"""
-        es = get_es_client()
-        body = params.to_es_query()
-        body["size"] = 1000
+        es = get_search_backend()
+        body = self._build_es_query(params, size)
 
         # # 写入日志
         # import json
@@ -108,36 +461,83 @@ class QueryManager:
         response["_query"] = body
         return response
 
-    def _get_docs_by_ids(self, doc_ids):
-        """从ES批量获取文档详情"""
+    def _build_es_query(self, params: QueryParams, size):
+        body = params.to_es_query()
+        body["size"] = size
+        body["sort"] = RESULT_SORT
+        body["track_scores"] = True
+        body["track_total_hits"] = True
+        if QUERY_FACET_SIZE:
+            # 分面计数随首次检索一并返回，不再单独请求
+            body["aggs"] = facets_aggs(FACET_FIELDS, QUERY_FACET_SIZE)
+        return body
+
+    def _get_docs_by_ids(self, doc_ids, fields=None):
+        """从ES批量获取文档详情，fields 不为空时只取这些字段"""
         if not doc_ids:
             return []
-        es = get_es_client()
-        response = es.mget(index=INDEX_NAME, body={"ids": doc_ids})
+        es = get_search_backend()
+        response = es.mget(
+            index=INDEX_NAME, body={"ids": doc_ids}, _source_includes=fields
+        )
+        return self._parse_docs(response)
+
+    def _parse_docs(self, response):
         return [
             {"id": doc["_id"], **doc["_source"]}
             for doc in response["docs"]
             if doc.get("found")
         ]
 
+    def _get_previews_by_ids(self, query: Query, doc_ids):
+        """
+        单次请求获取一页结果的预览：短字段走 _source 过滤，
+        长文本字段用高亮片段代替全文（无命中时取开头 no_match_size 个字符）
+        """
+        if not doc_ids:
+            return []
+        es = get_search_backend()
+        response = es.search(index=INDEX_NAME, body=self._previews_body(query, doc_ids))
+        return self._parse_previews(response, doc_ids)
+
+    def _previews_body(self, query: Query, doc_ids):
+        fragment = {
+            "fragment_size": RESULT_PREVIEW_LENGTH,
+            "number_of_fragments": 1,
+            "no_match_size": RESULT_PREVIEW_LENGTH,
+        }
+        return {
+            "query": {
+                "bool": {
+                    "must": [query.es_query["query"]],
+                    "filter": {"ids": {"values": doc_ids}},
+                }
+            },
+            "size": len(doc_ids),
+            "_source": {
+                "includes": [f for f in RESULT_FIELDS if f not in PREVIEW_FIELDS]
+            },
+            "highlight": {
+                "pre_tags": [""],
+                "post_tags": [""],
+                "fields": {f: fragment for f in PREVIEW_FIELDS},
+            },
+        }
+
+    def _parse_previews(self, response, doc_ids):
+        docs = {}
+        for hit in response["hits"]["hits"]:
+            doc = {"id": hit["_id"], **hit["_source"]}
+            for field, fragments in hit.get("highlight", {}).items():
+                doc[field] = "".join(fragments)
+            docs[hit["_id"]] = doc
+        # 按检索得分顺序返回
+        return [docs[doc_id] for doc_id in doc_ids if doc_id in docs]
+
     def _process_results(self, docs, id2score=None):
-        wanted_fields = [
-            "ajId",
-            "ajName",
-            "ajjbqk",
-            "cpfxgc",
-            "pjjg",
-            "qw",
-            "writId",
-            "writName",
-            "labels",
-            "fymc",  # 新增：法院名称
-            "spry",  # 新增：审判人员
-            "dsr",  # 新增：当事人
-        ]
         results = []
         for doc in docs:
-            item = {k: doc.get(k, "") for k in wanted_fields}
+            item = {k: doc.get(k, "") for k in RESULT_FIELDS}
             if id2score is not None:
                 item["score"] = id2score.get(doc["id"], None)
             results.append(item)
@@ -145,67 +545,155 @@ class QueryManager:
 
     def _clear_query_cache(self, query_id):
         """清除查询相关缓存"""
-        keys_to_delete = [key for key in self.results_cache if key[0] == query_id]
-        for key in keys_to_delete:
-            del self.results_cache[key]
+        self.results_cache.invalidate(query_id)
 
     def _evict_oldest(self):
         """淘汰最久未使用的查询"""
-        if not self.queries:
+        oldest = self.store.evict_oldest()
+        if oldest is None:
             return
-        oldest_id = min(self.queries.values(), key=lambda q: q.last_accessed).id
-        self._clear_query_cache(oldest_id)
-        del self.queries[oldest_id]
+        self._forget_query(oldest)
+
+    def _forget_query(self, query: Query):
+        """查询被淘汰或过期后释放其缓存、锁和 ES 资源"""
+        self._clear_query_cache(query.id)
+        with self._query_locks_lock:
+            self._query_locks.pop(query.id, None)
+        self._release_query(query)
+
+    def _maybe_clean_expired(self):
+        """每隔 QUERY_SWEEP_INTERVAL 秒清理一次过期查询"""
+        now = time.time()
+        if now - self._last_sweep >= QUERY_SWEEP_INTERVAL:
+            self._last_sweep = now
+            self.clean_expired()
 
     def clean_expired(self):
         """清理过期查询"""
-        current_time = time.time()
-        expired_ids = [
-            qid
-            for qid, query in self.queries.items()
-            if current_time - query.last_accessed > QUERY_TTL
-        ]
-        for qid in expired_ids:
-            self._clear_query_cache(qid)
-            del self.queries[qid]
+        for query in self.store.pop_expired(time.time() - QUERY_TTL):
+            self._forget_query(query)
+        self.results_cache.clean_expired()
+
+    def get_stats(self):
+        """查询与缓存的统计信息"""
+        return {
+            "queries": len(self.store),
+            "results_cache": self.results_cache.stats(),
+            "result_sets": self.result_sets.stats(),
+            "suggest_cache": self.suggest_cache.stats(),
+            "labels": self.label_service.stats(),
+            "documents": self.document_service.stats(),
+            "similar": get_similar_index().stats(),
+        }
 
     def get_document_by_ajid(self, ajid):
-        es = get_es_client()
-        resp = es.search(
-            index=INDEX_NAME, body={"query": {"term": {"ajId": ajid}}, "size": 1}
-        )
-        hits = resp.get("hits", {}).get("hits", [])
-        if not hits:
-            return None
-        doc = hits[0]["_source"]
-        doc["id"] = hits[0]["_id"]
-        return doc
+        return self.get_document(ajid)[0]
+
+    def get_document(self, ajid, sections=None):
+        """
+        返回 (文档, ETag)，文档不存在时为 (None, None)
+        sections 不为空时只返回这些字段
+        """
+        return self.document_service.get(ajid, sections)
+
+    def get_similar_documents(self, ajid, size=10):
+        """
+        离线计算的类似案例，返回 (类似案例, 是否过时)。文档不在近邻表中
+        （或尚未计算）时类似案例为 None；近邻表计算后索引又导入过时标记为过时
+        """
+        similar_index = get_similar_index()
+        return similar_index.lookup(ajid, size), similar_index.is_stale()
 
     def get_all_labels(self):
-        es = get_es_client()
-        resp = es.search(
-            index=INDEX_NAME,
-            body={
-                "size": 0,
-                "aggs": {"all_labels": {"terms": {"field": "labels", "size": 10000}}},
-            },
-        )
-        buckets = resp.get("aggregations", {}).get("all_labels", {}).get("buckets", [])
-        return [b["key"] for b in buckets]
+        return self.label_service.get_labels()
+
+    def get_facets(self):
+        """全部分面字段的取值及文档数"""
+        return self.label_service.get_facets()
+
+    def suggest(self, field, prefix, size=SUGGEST_SIZE):
+        return self.suggest_many([field], prefix, size=size)
+
+    def suggest_many(self, fields, prefix, size=SUGGEST_SIZE):
+        """
+        对多个字段做补全：短字段由进程内前缀索引直接给出，
+        其余字段合并为一次请求，每个字段一个命名 completion suggester，
+        合并后按得分排序去重。热门前缀直接从缓存返回
+        """
+        generation = get_index_generation()
+        cache_key = (tuple(fields), prefix, size)
+        cached = self.suggest_cache.get(cache_key, generation)
+        if cached is not None:
+            return cached
+        local_fields, remote_fields = self.suggestion_engine.split_fields(fields)
+        best = self.suggestion_engine.suggest(local_fields, prefix, size)
+        complete = self._suggest_from_es(remote_fields, prefix, size, generation, best)
+        suggestions = sorted(best, key=lambda text: (-best[text], len(text)))
+        if complete:
+            # ES 不可用时只有进程内的补全，不缓存
+            self.suggest_cache.put(cache_key, generation, suggestions)
+        return suggestions
+
+    def _suggest_from_es(self, fields, prefix, size, generation, best):
+        """
+        ES completion 补全，结果合并进 best（text -> 最高得分）
+        ES 请求失败时记录日志并返回 False，调用方只返回进程内的补全
+        """
+        try:
+            completion_fields = self._get_completion_fields(generation)
+            fields = [f for f in fields if f in completion_fields]
+            if not fields:
+                return True
+            resp = get_search_backend().search(
+                index=INDEX_NAME, body=self._suggest_body(fields, prefix, size)
+            )
+        except TransportError as e:
+            logger.warning("ES completion suggest failed: %s", e)
+            return False
+        self._merge_suggestions(resp, best)
+        return True
 
-    def suggest(self, field, prefix, size=10):
-        es = get_es_client()
-        suggest_body = {
+    def _suggest_body(self, fields, prefix, size):
+        return {
+            "_source": False,  # 补全结果不需要带回整篇文档
             "suggest": {
-                "my-suggest": {
+                field: {
                     "prefix": prefix,
-                    "completion": {"field": f"{field}_suggest", "size": size},
+                    "completion": {
+                        "field": f"{field}_suggest",
+                        "size": size,
+                        "skip_duplicates": True,
+                    },
                 }
-            }
+                for field in fields
+            },
         }
-        resp = es.search(index=INDEX_NAME, body=suggest_body)
-        options = resp.get("suggest", {}).get("my-suggest", [])[0].get("options", [])
-        return [opt["text"] for opt in options]
+
+    def _merge_suggestions(self, resp, best):
+        for entries in resp.get("suggest", {}).values():
+            for entry in entries:
+                for opt in entry.get("options", []):
+                    score = opt.get("_score") or 0
+                    if score > best.get(opt["text"], -1):
+                        best[opt["text"]] = score
+
+    def _get_completion_fields(self, generation):
+        """索引中实际存在的补全字段（去掉 _suggest 后缀），按索引代数缓存"""
+        if self._completion_fields[0] == generation:
+            return self._completion_fields[1]
+        es = get_search_backend()
+        fields = self._parse_completion_fields(es.indices.get_mapping(index=INDEX_NAME))
+        self._completion_fields = (generation, fields)
+        return fields
+
+    def _parse_completion_fields(self, mappings):
+        fields = set()
+        for index_mapping in mappings.values():
+            properties = index_mapping.get("mappings", {}).get("properties", {})
+            for name, mapping in properties.items():
+                if mapping.get("type") == "completion" and name.endswith("_suggest"):
+                    fields.add(name[: -len("_suggest")])
+        return fields
 
 
 # 全局查询管理器实例
@@ -0,0 +1,93 @@
+import threading
+from array import array
+
+
+class DocIdTable:
+    """
+    全局文档 ID 表：把 ajId 映射为整数序号，所有查询共享同一份字符串
+    """
+
+    def __init__(self):
+        self._ordinals = {}  # ajId -> 序号
+        self._ids = []  # 序号 -> ajId
+        self._lock = threading.Lock()
+
+    def ordinal(self, doc_id):
+        ordinal = self._ordinals.get(doc_id)
+        if ordinal is None:
+            with self._lock:
+                ordinal = self._ordinals.get(doc_id)
+                if ordinal is None:
+                    ordinal = len(self._ids)
+                    self._ids.append(doc_id)
+                    self._ordinals[doc_id] = ordinal
+        return ordinal
+
+    def doc_id(self, ordinal):
+        return self._ids[ordinal]
+
+    def __len__(self):
+        return len(self._ids)
+
+
+# 进程内全局 ID 表
+doc_id_table = DocIdTable()
+
+
+class ResultList:
+    """
+    紧凑的检索结果列表：文档序号存于 array('I')，得分存于 array('f')，
+    对外表现为 (doc_id, score) 元组序列，支持下标和切片
+    """
+
+    __slots__ = ("_ordinals", "_scores")
+
+    def __init__(self, pairs=()):
+        self._ordinals = array("I")
+        self._scores = array("f")
+        self.extend(pairs)
+
+    def append(self, doc_id, score):
+        self._ordinals.append(doc_id_table.ordinal(doc_id))
+        self._scores.append(score or 0.0)
+
+    def extend(self, pairs):
+        for doc_id, score in pairs:
+            self.append(doc_id, score)
+
+    def ids(self):
+        return [doc_id_table.doc_id(o) for o in self._ordinals]
+
+    @property
+    def scores(self):
+        return self._scores
+
+    def copy(self):
+        other = ResultList()
+        other._ordinals = array("I", self._ordinals)
+        other._scores = array("f", self._scores)
+        return other
+
+    def __len__(self):
+        return len(self._ordinals)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(
+                zip(
+                    [doc_id_table.doc_id(o) for o in self._ordinals[index]],
+                    self._scores[index],
+                )
+            )
+        return doc_id_table.doc_id(self._ordinals[index]), self._scores[index]
+
+    def __iter__(self):
+        return zip(self.ids(), self._scores)
+
+    def __eq__(self, other):
+        if isinstance(other, ResultList):
+            return self._ordinals == other._ordinals and self._scores == other._scores
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return f"ResultList({len(self)} results)"
@@ -0,0 +1,377 @@
+"""
+类似案例近邻表：在 indexer.py 导入完成后离线计算每篇文档最相似的 SIMILAR_TOP_K 篇，
+/api/document/<ajid>/similar 直接查表返回
+
+文档向量为 SIMILAR_FIELDS 的 TF-IDF（与本地检索引擎相同的两字切分，
+词频取 1 + ln(tf)，按 L2 归一化），相似度为余弦。按倒排表分块计算：
+最常见的词用稠密矩阵乘法，其余的词把一块文档展开成 (块内行号, 文档号, 权重乘积)，
+用 bincount 累加到得分块上。块大小由 SIMILAR_BLOCK_POSTINGS 控制，各块由进程池并行计算
+
+    python -m backend.search.similar build [--workers N]
+    python -m backend.search.similar show <ajId>
+"""
+import os
+import json
+import time
+import shutil
+import argparse
+import threading
+import multiprocessing
+from array import array
+from collections import Counter
+import numpy as np
+from backend.config import (
+    INDEX_NAME,
+    SEARCH_BACKEND,
+    SIMILAR_INDEX_DIR,
+    SIMILAR_FIELDS,
+    SIMILAR_TOP_K,
+    SIMILAR_MAX_DF,
+    SIMILAR_BLOCK_POSTINGS,
+    SIMILAR_DENSE_TERMS,
+)
+from backend.elastic.generation import get_index_generation
+from backend.search.local_engine import tokenize
+
+
+def count_terms(source, fields=SIMILAR_FIELDS):
+    """一篇文档各字段的词频（合并计数）"""
+    counts = Counter()
+    for field in fields:
+        counts.update(tokenize(source.get(field)))
+    return counts
+
+
+class TfidfMatrix:
+    """
+    L2 归一化的 TF-IDF 矩阵（文档 × 词），用于分块计算 X·Xᵀ。
+    文档频率最高的 dense_terms 个词贡献了绝大部分计算量，存为稠密矩阵用矩阵乘法计算；
+    其余的词倒排表很短，按行（文档 -> 词）展开一块文档的词，再按列（词 -> 文档，
+    即倒排表）累加。只出现在一篇文档中的词对相似度没有贡献，不保存
+    """
+
+    def __init__(self, num_docs, rows, terms, weights, dense_terms=SIMILAR_DENSE_TERMS):
+        self.num_docs = num_docs
+        df = np.bincount(terms)
+        dense = np.argsort(-df, kind="stable")[:dense_terms]
+        dense = dense[df[dense] > 1]
+        column = np.full(len(df), -1, dtype=np.int64)
+        column[dense] = np.arange(len(dense))
+        in_dense = column[terms] >= 0
+        self.dense = np.zeros((num_docs, len(dense)), dtype=np.float32)
+        self.dense[rows[in_dense], column[terms[in_dense]]] = weights[in_dense]
+        keep = ~in_dense & (df[terms] > 1)
+        rows, terms, weights = rows[keep], terms[keep], weights[keep]
+        # 稀疏部分按行（rows 已按文档排序）和按列各存一份
+        self.doc_ptr = np.zeros(num_docs + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=num_docs), out=self.doc_ptr[1:])
+        self.doc_terms = terms
+        self.doc_weights = weights
+        self.term_ptr = np.zeros(len(df) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=len(df)), out=self.term_ptr[1:])
+        order = np.argsort(terms, kind="stable")
+        self.post_docs = rows[order]
+        self.post_weights = weights[order]
+
+    @classmethod
+    def from_counts(cls, doc_counts, max_df=SIMILAR_MAX_DF):
+        """doc_counts 为各文档的词频 Counter"""
+        vocab = {}
+        doc_ptr = array("q", [0])
+        terms = array("I")
+        tfs = array("f")
+        for counts in doc_counts:
+            terms.extend(vocab.setdefault(token, len(vocab)) for token in counts)
+            tfs.extend(counts.values())
+            doc_ptr.append(len(terms))
+        num_docs = len(doc_ptr) - 1
+        terms = np.frombuffer(terms, dtype=np.uint32).astype(np.int64)
+        tfs = np.frombuffer(tfs, dtype=np.float32)
+        rows = np.repeat(np.arange(num_docs), np.diff(np.frombuffer(doc_ptr, np.int64)))
+        df = np.bincount(terms, minlength=len(vocab))
+        # 过于常见的词不区分案情，视为停用词
+        keep = df[terms] <= max(max_df * num_docs, 1)
+        terms, tfs, rows = terms[keep], tfs[keep], rows[keep]
+        idf = np.log((1 + num_docs) / (1 + df)) + 1
+        weights = ((1 + np.log(tfs)) * idf[terms]).astype(np.float32)
+        norms = np.sqrt(np.bincount(rows, weights=weights**2, minlength=num_docs))
+        weights /= np.maximum(norms[rows], 1e-12).astype(np.float32)
+        return cls(num_docs, rows, terms, weights)
+
+    def doc_work(self):
+        """每篇文档计算时要展开的倒排项数"""
+        df = np.diff(self.term_ptr)
+        rows = np.repeat(np.arange(self.num_docs), np.diff(self.doc_ptr))
+        return np.bincount(rows, weights=df[self.doc_terms], minlength=self.num_docs)
+
+    def plan_blocks(self, budget=SIMILAR_BLOCK_POSTINGS):
+        """
+        按展开的倒排项数和稠密得分块的大小切分文档，每块都不超过 budget
+        （单篇文档超过预算时独占一块）
+        """
+        blocks = []
+        start = 0
+        work = 0
+        for doc, cost in enumerate(self.doc_work()):
+            rows = doc - start
+            if rows and (work + cost > budget or (rows + 1) * self.num_docs > budget):
+                blocks.append((start, doc))
+                start, work = doc, 0
+            work += cost
+        if start < self.num_docs:
+            blocks.append((start, self.num_docs))
+        return blocks
+
+    def neighbors(self, start, stop, top_k):
+        """
+        计算 [start, stop) 各文档的 top_k 近邻，返回 (start, 文档号, 得分)，
+        不足 top_k 篇（得分为 0）的位置文档号为 -1
+        """
+        size = stop - start
+        scores = self.dense[start:stop] @ self.dense.T
+        lo, hi = self.doc_ptr[start], self.doc_ptr[stop]
+        terms = self.doc_terms[lo:hi]
+        lengths = self.term_ptr[terms + 1] - self.term_ptr[terms]
+        total = int(lengths.sum())
+        if total:
+            # 每个词的倒排表在 post_* 中的位置：term_ptr[词] + 表内序号
+            ends = np.cumsum(lengths)
+            index = np.repeat(self.term_ptr[terms] - (ends - lengths), lengths)
+            index += np.arange(total)
+            rows = np.repeat(np.arange(size), np.diff(self.doc_ptr[start : stop + 1]))
+            keys = np.repeat(rows, lengths) * self.num_docs + self.post_docs[index]
+            values = self.post_weights[index] * np.repeat(
+                self.doc_weights[lo:hi], lengths
+            )
+            scores += np.bincount(
+                keys, weights=values, minlength=size * self.num_docs
+            ).reshape(size, self.num_docs)
+        scores[np.arange(size), np.arange(start, stop)] = 0  # 排除自身
+        k = min(top_k, self.num_docs)
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1).astype(np.int32)
+        top_scores = np.take_along_axis(top_scores, order, axis=1).astype(np.float32)
+        top[top_scores <= 0] = -1
+        return start, top, top_scores
+
+
+_worker_matrix = None
+
+
+def _init_worker(matrix):
+    global _worker_matrix
+    _worker_matrix = matrix
+
+
+def _neighbors_in_worker(task):
+    start, stop, top_k = task
+    return _worker_matrix.neighbors(start, stop, top_k)
+
+
+def compute_neighbors(matrix: TfidfMatrix, top_k=SIMILAR_TOP_K, workers=1):
+    """全部文档的近邻，返回 (文档号矩阵, 得分矩阵)，形状均为 (文档数, top_k)"""
+    neighbors = np.full((matrix.num_docs, top_k), -1, dtype=np.int32)
+    scores = np.zeros((matrix.num_docs, top_k), dtype=np.float32)
+    if matrix.num_docs < 2:
+        return neighbors, scores
+    tasks = [(start, stop, top_k) for start, stop in matrix.plan_blocks()]
+    if workers <= 1:
+        results = (matrix.neighbors(*task) for task in tasks)
+    else:
+        pool = multiprocessing.Pool(
+            workers, initializer=_init_worker, initargs=(matrix,)
+        )
+        results = pool.imap_unordered(_neighbors_in_worker, tasks)
+    try:
+        for start, top, top_scores in results:
+            k = top.shape[1]
+            neighbors[start : start + len(top), :k] = top
+            scores[start : start + len(top), :k] = top_scores
+    finally:
+        if workers > 1:
+            pool.close()
+            pool.join()
+    return neighbors, scores
+
+
+def iter_sources(fields=SIMILAR_FIELDS):
+    """读取检索后端中的全部文档（ajId、ajName 和计算用的字段）"""
+    includes = ["ajId", "ajName", *fields]
+    if SEARCH_BACKEND == "local":
+        from backend.search.local_engine import get_local_engine
+
+        index = get_local_engine().index()
+        for doc in range(index.num_docs):
+            source = index.source(doc)
+            yield {k: source.get(k) for k in includes}
+        return
+    from elasticsearch import helpers
+    from backend.elastic.client import BATCH, get_es_client
+
+    es = get_es_client(BATCH)
+    for hit in helpers.scan(
+        es,
+        index=INDEX_NAME,
+        query={"query": {"match_all": {}}},
+        _source_includes=includes,
+        size=1000,
+    ):
+        yield hit["_source"]
+
+
+def build(sources, path=SIMILAR_INDEX_DIR, top_k=SIMILAR_TOP_K, workers=1):
+    """计算近邻并写入 path（先写临时目录再替换），返回文档数"""
+    docs = []
+    doc_counts = []
+    for source in sources:
+        if source.get("ajId"):
+            docs.append([source["ajId"], source.get("ajName") or ""])
+            doc_counts.append(count_terms(source))
+    matrix = TfidfMatrix.from_counts(doc_counts)
+    del doc_counts
+    neighbors, scores = compute_neighbors(matrix, top_k, workers)
+    tmp_path = path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    np.save(os.path.join(tmp_path, "neighbors.npy"), neighbors)
+    np.save(os.path.join(tmp_path, "scores.npy"), scores)
+    with open(os.path.join(tmp_path, "docs.json"), "w", encoding="utf-8") as f:
+        json.dump(docs, f, ensure_ascii=False)
+    # meta.json 最后写入，加载时以它的修改时间判断近邻表是否更新
+    with open(os.path.join(tmp_path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "num_docs": len(docs),
+                "top_k": top_k,
+                "fields": SIMILAR_FIELDS,
+                "generation": get_index_generation(),
+                "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            },
+            f,
+        )
+    old_path = path + ".old"
+    shutil.rmtree(old_path, ignore_errors=True)
+    if os.path.exists(path):
+        os.rename(path, old_path)
+    os.rename(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    return len(docs)
+
+
+class _NeighborTable:
+    def __init__(self, path):
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        with open(os.path.join(path, "docs.json"), "r", encoding="utf-8") as f:
+            self.docs = json.load(f)
+        self.ordinals = {ajId: i for i, (ajId, _) in enumerate(self.docs)}
+        self.neighbors = np.load(os.path.join(path, "neighbors.npy"), mmap_mode="r")
+        self.scores = np.load(os.path.join(path, "scores.npy"), mmap_mode="r")
+
+
+class SimilarIndex:
+    """近邻表的查询，近邻表重新计算后自动重新加载"""
+
+    def __init__(self, path=SIMILAR_INDEX_DIR):
+        self.path = path
+        self._table = None
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def table(self):
+        """当前的近邻表，尚未计算时为 None"""
+        try:
+            mtime = os.stat(os.path.join(self.path, "meta.json")).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    self._table = _NeighborTable(self.path)
+                    self._mtime = mtime
+        return self._table
+
+    def lookup(self, ajid, size=10):
+        """
+        ajid 最相似的 size 篇 [{ajId, ajName, score}]，文档不在表中时返回 None。
+        size 限制在 1 到计算时的 top_k 之间
+        """
+        table = self.table()
+        doc = table.ordinals.get(ajid) if table is not None else None
+        if doc is None:
+            return None
+        size = max(1, min(size, table.meta["top_k"]))
+        similar = []
+        for neighbor, score in zip(
+            table.neighbors[doc, :size], table.scores[doc, :size]
+        ):
+            if neighbor < 0:
+                break
+            ajId, ajName = table.docs[neighbor]
+            similar.append({"ajId": ajId, "ajName": ajName, "score": float(score)})
+        return similar
+
+    def is_stale(self):
+        """
+        近邻表计算后索引又导入过（索引代数变化），表中可能有已删除或内容已变的文档，
+        需要重新运行 build
+        """
+        table = self.table()
+        return table is not None and table.meta["generation"] != get_index_generation()
+
+    def stats(self):
+        table = self.table()
+        if table is None:
+            return None
+        return {**table.meta, "stale": self.is_stale()}
+
+
+_similar_index = None
+_index_lock = threading.Lock()
+
+
+def get_similar_index():
+    """全局的近邻表"""
+    global _similar_index
+    if _similar_index is None:
+        with _index_lock:
+            if _similar_index is None:
+                _similar_index = SimilarIndex()
+    return _similar_index
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="类似案例近邻表")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("build", help="计算全部文档的近邻（在 indexer.py 之后运行）")
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    p.add_argument("--top-k", type=int, default=SIMILAR_TOP_K)
+    p = sub.add_parser("show", help="查看一篇文档的近邻")
+    p.add_argument("ajid")
+    p.add_argument("--size", type=int, default=10)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.command == "build":
+        from tqdm import tqdm
+
+        start = time.perf_counter()
+        count = build(
+            tqdm(iter_sources(), desc="Loading"),
+            top_k=args.top_k,
+            workers=args.workers,
+        )
+        print(f"近邻表计算完成：{count} 篇，用时 {time.perf_counter() - start:.1f} 秒")
+    else:
+        index = get_similar_index()
+        similar = index.lookup(args.ajid, args.size)
+        if similar is None:
+            print(f"{args.ajid} 不在近邻表中")
+        elif index.is_stale():
+            print("近邻表计算后索引已重新导入，结果可能过时")
+        for item in similar or []:
+            print(f"{item['score']:.4f}  {item['ajId']}  {item['ajName']}")
@@ -0,0 +1,209 @@
+import os
+import time
+import asyncio
+import functools
+import sqlite3
+import threading
+from collections import OrderedDict
+from backend.config import QUERY_STORE, QUERY_STORE_PATH
+from backend.search.query import Query
+
+
+class QueryStore:
+    """
+    查询状态存储接口，QueryManager 通过它保存和读取 Query
+    get 会同时刷新查询的最近访问时间
+    """
+
+    def get(self, query_id):
+        raise NotImplementedError
+
+    def put(self, query: Query):
+        raise NotImplementedError
+
+    def delete(self, query_id):
+        raise NotImplementedError
+
+    def evict_oldest(self):
+        """移除并返回最久未访问的查询，没有时返回 None"""
+        raise NotImplementedError
+
+    def pop_expired(self, deadline):
+        """移除并返回所有最近访问时间早于 deadline 的查询"""
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+
+class MemoryQueryStore(QueryStore):
+    """
+    进程内存储，只适合单进程部署
+    """
+
+    def __init__(self):
+        self._queries = OrderedDict()  # query_id -> Query，按最近访问排序
+        self._lock = threading.Lock()
+
+    def get(self, query_id):
+        with self._lock:
+            query = self._queries.get(query_id)
+            if query is None:
+                return None
+            query.last_accessed = time.time()
+            self._queries.move_to_end(query_id)
+            return query
+
+    def put(self, query: Query):
+        with self._lock:
+            self._queries[query.id] = query
+            self._queries.move_to_end(query.id)
+
+    def delete(self, query_id):
+        with self._lock:
+            return self._queries.pop(query_id, None)
+
+    def evict_oldest(self):
+        with self._lock:
+            if not self._queries:
+                return None
+            return self._queries.popitem(last=False)[1]
+
+    def pop_expired(self, deadline):
+        expired = []
+        with self._lock:
+            # 按最近访问排序，过期项都在队首
+            while self._queries:
+                query = next(iter(self._queries.values()))
+                if query.last_accessed > deadline:
+                    break
+                expired.append(self._queries.popitem(last=False)[1])
+        return expired
+
+    def __len__(self):
+        return len(self._queries)
+
+
+class SQLiteQueryStore(QueryStore):
+    """
+    基于 SQLite 文件的共享存储，多个 worker 进程可以读写同一个查询，
+    查询以 Query.dumps 的紧凑二进制形式保存
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        dirname = os.path.dirname(path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS queries ("
+            "id TEXT PRIMARY KEY, last_accessed REAL NOT NULL, data BLOB NOT NULL)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_queries_last_accessed "
+            "ON queries (last_accessed)"
+        )
+
+    def _conn(self):
+        """每个线程使用独立连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, query_id):
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT data FROM queries WHERE id = ?", (query_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        query = Query.loads(row[0])
+        query.last_accessed = time.time()
+        conn.execute(
+            "UPDATE queries SET last_accessed = ? WHERE id = ?",
+            (query.last_accessed, query_id),
+        )
+        return query
+
+    def put(self, query: Query):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO queries (id, last_accessed, data) "
+            "VALUES (?, ?, ?)",
+            (query.id, query.last_accessed, query.dumps()),
+        )
+
+    def delete(self, query_id):
+        query = self._pop("WHERE id = ?", (query_id,))
+        return query[0] if query else None
+
+    def evict_oldest(self):
+        queries = self._pop(
+            "WHERE id = (SELECT id FROM queries ORDER BY last_accessed LIMIT 1)", ()
+        )
+        return queries[0] if queries else None
+
+    def pop_expired(self, deadline):
+        return self._pop("WHERE last_accessed <= ?", (deadline,))
+
+    def _pop(self, where, args):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(f"SELECT data FROM queries {where}", args).fetchall()
+            conn.execute(f"DELETE FROM queries {where}", args)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return [Query.loads(row[0]) for row in rows]
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM queries").fetchone()[0]
+
+
+class AsyncQueryStore:
+    """
+    查询存储的异步调用方式（供异步服务使用）：SQLite 存储的读写在默认线程池中执行，
+    不阻塞事件循环；内存存储直接调用
+    """
+
+    def __init__(self, store: QueryStore):
+        self.store = store
+        self._blocking = not isinstance(store, MemoryQueryStore)
+
+    async def run(self, func, *args):
+        """调用 func(*args)，存储会阻塞时放到线程池中执行"""
+        if not self._blocking:
+            return func(*args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(func, *args))
+
+    async def get(self, query_id):
+        return await self.run(self.store.get, query_id)
+
+    async def put(self, query: Query):
+        await self.run(self.store.put, query)
+
+    async def evict_oldest(self):
+        return await self.run(self.store.evict_oldest)
+
+    async def pop_expired(self, deadline):
+        return await self.run(self.store.pop_expired, deadline)
+
+    async def count(self):
+        return await self.run(len, self.store)
+
+
+def create_query_store(kind=QUERY_STORE):
+    """根据配置创建查询存储"""
+    if kind == "memory":
+        return MemoryQueryStore()
+    if kind == "sqlite":
+        return SQLiteQueryStore(QUERY_STORE_PATH)
+    raise ValueError(f"Unknown query store: {kind}")
@@ -0,0 +1,150 @@
+import os
+import json
+import heapq
+import threading
+from bisect import bisect_left
+from array import array
+from backend.config import SUGGEST_SNAPSHOT_JSON, LOCAL_SUGGEST_FIELDS
+
+# 预先计算 top-k 的短前缀长度（短前缀命中的词最多，现场排序最慢）
+PRECOMPUTED_PREFIX_LEN = 1
+PRECOMPUTED_TOP_K = 50
+
+
+class PrefixIndex:
+    """
+    排序数组前缀索引：检索键排序后存放，用二分查找定位前缀区间，
+    区间内按词频取 top-k。一个词可以有多个检索键（如 "审判员:张三" 也可由 "张三" 检索）
+    """
+
+    def __init__(self, term_freqs):
+        entries = []
+        for term, freq in term_freqs.items():
+            for key in self._keys(term):
+                entries.append((key, term, freq))
+        entries.sort()
+        self.keys = [e[0] for e in entries]
+        self.terms = [e[1] for e in entries]
+        self.freqs = array("I", [e[2] for e in entries])
+        self._top = {}  # 短前缀 -> 预先排好的 [(term, freq)]
+        for key in {k[:PRECOMPUTED_PREFIX_LEN] for k in self.keys}:
+            self._top[key] = self._scan(key, PRECOMPUTED_TOP_K)
+
+    @staticmethod
+    def _keys(term):
+        keys = [term]
+        # "角色:姓名" 形式的实体，姓名部分也作为检索键
+        if ":" in term:
+            name = term.split(":", 1)[1]
+            if name:
+                keys.append(name)
+        return keys
+
+    def lookup(self, prefix, size):
+        """返回以 prefix 开头、词频最高的 size 个 (term, freq)"""
+        if len(prefix) <= PRECOMPUTED_PREFIX_LEN and size <= PRECOMPUTED_TOP_K:
+            return self._top.get(prefix, [])[:size]
+        return self._scan(prefix, size)
+
+    def _scan(self, prefix, size):
+        lo = bisect_left(self.keys, prefix)
+        hi = bisect_left(self.keys, prefix + "\U0010ffff", lo)
+        best = {}
+        for i in range(lo, hi):
+            term = self.terms[i]
+            best[term] = max(best.get(term, 0), self.freqs[i])
+        return heapq.nlargest(size, best.items(), key=lambda item: (item[1], item[0]))
+
+    def __len__(self):
+        return len(self.keys)
+
+
+class SuggestionEngine:
+    """
+    进程内补全引擎：为取值较短、索引期间不变的字段（法院、审判人员、当事人、
+    案由、案件名称、文书名称）提供前缀补全，数据来自索引脚本写出的快照，
+    快照文件更新后自动重新加载
+    """
+
+    def __init__(self, snapshot_path=SUGGEST_SNAPSHOT_JSON):
+        self.snapshot_path = snapshot_path
+        self.indexes = {}  # 字段 -> PrefixIndex
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        try:
+            mtime = os.stat(self.snapshot_path).st_mtime_ns
+        except FileNotFoundError:
+            self.indexes = {}
+            self._mtime = None
+            return
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+            self.indexes = {
+                field: PrefixIndex(term_freqs)
+                for field, term_freqs in snapshot.get("fields", {}).items()
+                if field in LOCAL_SUGGEST_FIELDS
+            }
+            self._mtime = mtime
+
+    def split_fields(self, fields):
+        """把字段分为本地可补全的和需要交给ES的两组"""
+        self._refresh()
+        local = [f for f in fields if f in self.indexes]
+        remote = [f for f in fields if f not in self.indexes]
+        return local, remote
+
+    def suggest(self, fields, prefix, size):
+        """返回 {term: 最高词频}"""
+        best = {}
+        for field in fields:
+            index = self.indexes.get(field)
+            if index is None:
+                continue
+            for term, freq in index.lookup(prefix, size):
+                if freq > best.get(term, 0):
+                    best[term] = freq
+        return best
+
+
+class SuggestSnapshotBuilder:
+    """
+    在索引导入过程中统计各补全字段的词频，导入完成后写出快照
+    """
+
+    def __init__(self, fields=LOCAL_SUGGEST_FIELDS):
+        self.fields = fields
+        self.term_freqs = {field: {} for field in fields}
+
+    def add(self, source):
+        """统计一篇文档（ES _source）中各字段的取值"""
+        for field in self.fields:
+            values = source.get(field)
+            if not values:
+                continue
+            if isinstance(values, str):
+                values = [values]
+            counts = self.term_freqs[field]
+            for value in values:
+                value = value.strip() if isinstance(value, str) else None
+                if value:
+                    counts[value] = counts.get(value, 0) + 1
+
+    def track(self, actions):
+        """包装 bulk 动作生成器，边导入边统计"""
+        for action in actions:
+            self.add(action["_source"])
+            yield action
+
+    def write(self, path=SUGGEST_SNAPSHOT_JSON):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"fields": self.term_freqs}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
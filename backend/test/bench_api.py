@@ -0,0 +1,363 @@
+"""
+检索 API 基准测试：用 LeCaRD 查询（及其合成变体）模拟前端的一次完整检索——
+创建查询、翻页获取结果、输入补全、打开文书详情，按并发度统计各接口的吞吐和延迟分位数
+
+    # 离线：进程内调用 Flask 应用，ES 用内存中的合成文档代替
+    python -m backend.test.bench_api --es fake --concurrency 1,8,32
+    # 录制真实 ES 的响应，之后可以离线重放
+    python -m backend.test.bench_api --es record --record-file bench.jsonl
+    python -m backend.test.bench_api --es replay --record-file bench.jsonl
+    # 压测已启动的服务
+    python -m backend.test.bench_api --url http://localhost:5000
+    # 与之前保存的结果对比，延迟或吞吐变差超过阈值时以非零状态退出
+    python -m backend.test.bench_api --es fake --compare backend/test/outputs/bench/xxx.json
+
+结果保存在 backend/test/outputs/bench/ 下
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from backend.elastic.bulk import percentile
+
+QUERY_JSON = "LeCaRD/data/query/query.json"
+BENCH_DIR = "backend/test/outputs/bench"
+
+ENDPOINTS = [
+    "POST /api/query",
+    "GET /api/query/<id>/results",
+    "GET /api/suggest",
+    "GET /api/document/<ajid>",
+]
+
+
+def load_queries(path=QUERY_JSON):
+    """读取 LeCaRD 查询，转换为前端提交的 user_query"""
+    with open(path, "r", encoding="utf-8") as f:
+        queries = [json.loads(line) for line in f if line.strip()]
+    return [
+        {"query": q["q"], "ay": q.get("crime", []), "qw": "", "ajmc": ""}
+        for q in queries
+    ]
+
+
+def synthetic_variants(queries, count, seed=0):
+    """
+    生成合成变体：截短的查询、只按案由检索、加上法院过滤等，
+    让结果缓存不至于全部命中
+    """
+    rng = random.Random(seed)
+    variants = []
+    for _ in range(count):
+        base = dict(rng.choice(queries))
+        kind = rng.randrange(4)
+        text = base["query"]
+        if kind == 0:
+            base["query"] = text[: rng.randint(4, max(4, len(text) // 2))]
+        elif kind == 1:
+            base["query"] = ""
+        elif kind == 2:
+            base["fymc"] = rng.choice(["人民法院", "中级人民法院", "基层人民法院"])
+        else:
+            base["query"] = text[rng.randint(0, max(0, len(text) - 20)) :][:40]
+            base["ay"] = []
+        variants.append(base)
+    return variants
+
+
+class InProcessClient:
+    """直接调用 Flask 应用（不经过网络）"""
+
+    def __init__(self):
+        from backend.app import app
+
+        self._app = app
+        self._local = threading.local()
+
+    def request(self, method, path, body=None):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self._app.test_client()
+        resp = client.open(path, method=method, json=body)
+        return resp.status_code, resp.get_json(silent=True)
+
+
+class HttpClient:
+    """通过连接池访问已启动的服务"""
+
+    def __init__(self, base_url, pool_size):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.base_url = base_url.rstrip("/")
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    def request(self, method, path, body=None):
+        resp = self._session.request(method, self.base_url + path, json=body)
+        try:
+            return resp.status_code, resp.json()
+        except ValueError:
+            return resp.status_code, None
+
+
+def install_es(args, queries):
+    """按 --es 替换后端使用的 ES 客户端"""
+    from backend.elastic import client
+    from backend.test.fake_es import (
+        FakeElasticsearch,
+        RecordingElasticsearch,
+        ReplayElasticsearch,
+    )
+
+    if args.es == "fake":
+        texts = [q["query"] for q in queries if q["query"]]
+        charges = sorted({c for q in queries for c in q["ay"]}) or ["盗窃罪"]
+        es = FakeElasticsearch(
+            texts, charges, num_docs=args.docs, latency=args.es_latency_ms / 1000
+        )
+        use_fake_suggest_snapshot(es)
+    elif args.es == "record":
+        es = RecordingElasticsearch(client.get_es_client(), args.record_file)
+    elif args.es == "replay":
+        es = ReplayElasticsearch(args.record_file)
+    else:
+        return
+    client.set_es_client(es)
+
+
+def use_fake_suggest_snapshot(es):
+    """让进程内补全使用合成文档的词表，而不是本机索引导出的快照"""
+    from backend.search.query_manager import get_query_manager
+    from backend.search.suggest_index import SuggestSnapshotBuilder
+
+    snapshot = SuggestSnapshotBuilder()
+    for doc in es.docs.values():
+        snapshot.add(doc)
+    path = os.path.join(tempfile.mkdtemp(), "suggest_snapshot.json")
+    snapshot.write(path)
+    get_query_manager().suggestion_engine.snapshot_path = path
+
+
+class EndpointStats:
+    """各接口的延迟（秒）和失败数"""
+
+    def __init__(self):
+        self.latencies = {name: [] for name in ENDPOINTS}
+        self.errors = {name: 0 for name in ENDPOINTS}
+        self._lock = threading.Lock()
+
+    def call(self, client, endpoint, method, path, body=None):
+        start = time.perf_counter()
+        try:
+            status, data = client.request(method, path, body)
+        except Exception:
+            status, data = None, None
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.latencies[endpoint].append(elapsed)
+            if status != 200:
+                self.errors[endpoint] += 1
+        return data if status == 200 else None
+
+    def summary(self, wall):
+        result = {}
+        for name in ENDPOINTS:
+            values = self.latencies[name]
+            if not values:
+                continue
+            result[name] = {
+                "count": len(values),
+                "errors": self.errors[name],
+                "rps": len(values) / wall,
+                "p50_ms": percentile(values, 50) * 1000,
+                "p90_ms": percentile(values, 90) * 1000,
+                "p99_ms": percentile(values, 99) * 1000,
+                "max_ms": max(values) * 1000,
+            }
+        return result
+
+
+def run_session(client, stats, user_query, pages, rng):
+    """一次完整检索：创建查询 -> 翻页 -> 补全 -> 打开第一篇文书"""
+    data = stats.call(
+        client, ENDPOINTS[0], "POST", "/api/query", {"user_query": user_query}
+    )
+    if not data:
+        return
+    first_ajid = None
+    for page in range(1, pages + 1):
+        data_page = stats.call(
+            client,
+            ENDPOINTS[1],
+            "GET",
+            f"/api/query/{data['query_id']}/results?page={page}&page_size=10&preview=1",
+        )
+        results = (data_page or {}).get("results") or []
+        if first_ajid is None and results:
+            first_ajid = results[0].get("ajId")
+        if not results:
+            break
+    text = user_query["query"] or "".join(user_query["ay"]) or "盗窃"
+    prefix = text[: rng.randint(1, min(3, len(text)))]
+    stats.call(client, ENDPOINTS[2], "GET", f"/api/suggest?q={prefix}")
+    if first_ajid:
+        stats.call(client, ENDPOINTS[3], "GET", f"/api/document/{first_ajid}")
+
+
+def run_level(client, workload, concurrency, sessions, pages, seed):
+    stats = EndpointStats()
+    rng = random.Random(seed)
+    jobs = [
+        (rng.choice(workload), random.Random(rng.random())) for _ in range(sessions)
+    ]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        futures = [
+            pool.submit(run_session, client, stats, query, pages, session_rng)
+            for query, session_rng in jobs
+        ]
+        for future in futures:
+            future.result()
+    wall = time.perf_counter() - start
+    return {
+        "concurrency": concurrency,
+        "sessions": sessions,
+        "seconds": wall,
+        "endpoints": stats.summary(wall),
+    }
+
+
+def print_level(level):
+    print(
+        f"\n并发 {level['concurrency']}，{level['sessions']} 次检索，"
+        f"用时 {level['seconds']:.2f} 秒"
+    )
+    print(
+        f"  {'接口':<30}{'请求':>5}{'失败':>4}{'req/s':>9}"
+        f"{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+    )
+    for name, s in level["endpoints"].items():
+        print(
+            f"  {name:<32}{s['count']:>7}{s['errors']:>6}{s['rps']:>9.1f}"
+            f"{s['p50_ms']:>9.1f}{s['p90_ms']:>9.1f}{s['p99_ms']:>9.1f}"
+            f"{s['max_ms']:>9.1f}"
+        )
+
+
+def compare(current, baseline, threshold):
+    """
+    与基线逐接口比较 p50/p99 和吞吐，返回变差超过 threshold（比例）的项
+    """
+    regressions = []
+    base_levels = {level["concurrency"]: level for level in baseline["levels"]}
+    print(f"\n对比基线 {baseline.get('name')}（{baseline.get('created')}）:")
+    for level in current["levels"]:
+        base = base_levels.get(level["concurrency"])
+        if base is None:
+            continue
+        for name, s in level["endpoints"].items():
+            b = base["endpoints"].get(name)
+            if b is None:
+                continue
+            changes = {
+                "p50_ms": s["p50_ms"] / max(b["p50_ms"], 1e-9) - 1,
+                "p99_ms": s["p99_ms"] / max(b["p99_ms"], 1e-9) - 1,
+                "rps": s["rps"] / max(b["rps"], 1e-9) - 1,
+            }
+            worse = [
+                k
+                for k, v in changes.items()
+                if (v < -threshold if k == "rps" else v > threshold)
+            ]
+            mark = "  REGRESSION" if worse else ""
+            print(
+                f"  并发 {level['concurrency']:>3} {name:<30} "
+                f"p50 {changes['p50_ms']:+.1%}  p99 {changes['p99_ms']:+.1%}  "
+                f"req/s {changes['rps']:+.1%}{mark}"
+            )
+            if worse:
+                regressions.append((level["concurrency"], name, worse))
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="检索 API 基准测试")
+    parser.add_argument(
+        "--es",
+        choices=["fake", "record", "replay", "live"],
+        default="fake",
+        help="ES 来源：合成文档 / 录制真实 ES / 回放录制 / 直接使用真实 ES",
+    )
+    parser.add_argument("--record-file", default=os.path.join(BENCH_DIR, "es.jsonl"))
+    parser.add_argument("--url", help="压测已启动的服务（此时忽略 --es）")
+    parser.add_argument("--queries", default=QUERY_JSON)
+    parser.add_argument(
+        "--synthetic", type=int, default=200, help="额外生成的合成查询个数"
+    )
+    parser.add_argument(
+        "--concurrency", default="1,8,32", help="并发度，逗号分隔依次测试"
+    )
+    parser.add_argument("--sessions", type=int, default=200, help="每个并发度的检索次数")
+    parser.add_argument("--pages", type=int, default=3, help="每次检索获取的页数")
+    parser.add_argument("--docs", type=int, default=5000, help="合成文档数（--es fake）")
+    parser.add_argument(
+        "--es-latency-ms",
+        type=float,
+        default=0.0,
+        help="合成 ES 每次调用附加的延迟（--es fake）",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--name", default="bench", help="结果文件名前缀")
+    parser.add_argument("--compare", help="用于对比的历史结果文件")
+    parser.add_argument(
+        "--threshold", type=float, default=0.1, help="判定变差的比例阈值"
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    queries = load_queries(args.queries)
+    workload = queries + synthetic_variants(queries, args.synthetic, args.seed)
+    if args.url:
+        levels = [int(c) for c in args.concurrency.split(",")]
+        client = HttpClient(args.url, max(levels))
+    else:
+        install_es(args, queries)
+        client = InProcessClient()
+    result = {
+        "name": args.name,
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "config": {k: v for k, v in vars(args).items() if k != "compare"},
+        "levels": [],
+    }
+    for concurrency in [int(c) for c in args.concurrency.split(",")]:
+        level = run_level(
+            client, workload, concurrency, args.sessions, args.pages, args.seed
+        )
+        result["levels"].append(level)
+        print_level(level)
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    path = os.path.join(
+        BENCH_DIR, f"{args.name}_{time.strftime('%Y%m%d%H%M%S')}.json"
+    )
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已保存到 {path}")
+    if args.es == "record" and not args.url:
+        from backend.elastic import client as es_client
+
+        es_client.get_es_client().close()
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(result, baseline, args.threshold):
+            sys.exit(1)
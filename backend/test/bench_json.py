@@ -0,0 +1,173 @@
+"""
+响应序列化与压缩基准：用 LeCaRD 查询生成各接口的真实响应内容，
+对比标准库 json（与 Flask 默认设置相同：ensure_ascii、sort_keys）和
+backend.responses.dumps 的字节数、序列化耗时，以及 gzip / br 压缩后的字节数和耗时
+
+    python -m backend.test.bench_json --es fake --sessions 50
+    python -m backend.test.bench_json --es live
+
+结果保存在 backend/test/outputs/bench/ 下
+"""
+import os
+import json
+import time
+import random
+import argparse
+from backend import responses
+from backend.search.query import QueryParams
+from backend.search.query_manager import get_query_manager
+from backend.config import SUGGEST_FIELDS
+from backend.test.bench_api import (
+    QUERY_JSON,
+    BENCH_DIR,
+    load_queries,
+    synthetic_variants,
+    install_es,
+)
+
+
+def stdlib_dumps(obj):
+    """Flask 默认 JSON provider 的输出（非调试模式）"""
+    return json.dumps(
+        obj, ensure_ascii=True, sort_keys=True, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def collect_payloads(workload, sessions, page_size, seed):
+    """按前端的一次检索收集各接口的响应内容：{接口: [响应对象]}"""
+    rng = random.Random(seed)
+    query_manager = get_query_manager()
+    payloads = {}
+
+    def add(endpoint, obj):
+        payloads.setdefault(endpoint, []).append(obj)
+
+    for _ in range(sessions):
+        user_query = rng.choice(workload)
+        query_id = query_manager.create_query(QueryParams.from_dict(user_query))
+        for preview in (False, True):
+            result = query_manager.get_results(
+                query_id, page=1, page_size=page_size, preview=preview
+            )
+            name = "results (preview)" if preview else "results"
+            add(f"GET /api/query/<id>/{name}", result)
+        hits = result["results"]
+        if hits:
+            ajid = rng.choice(hits)["ajId"]
+            doc, _ = query_manager.get_document(ajid)
+            if doc is not None:
+                add("GET /api/document/<ajid>", doc)
+            similar, stale = query_manager.get_similar_documents(ajid)
+            if similar is not None:
+                add(
+                    "GET /api/document/<ajid>/similar",
+                    {"ajId": ajid, "similar": similar, "stale": stale},
+                )
+        text = user_query["query"] or "".join(user_query["ay"])
+        if text:
+            prefix = text[: rng.randint(1, min(4, len(text)))]
+            suggestions = query_manager.suggest_many(SUGGEST_FIELDS, prefix)
+            add("GET /api/suggest", {"suggestions": suggestions})
+    add("GET /api/labels", {"labels": query_manager.get_all_labels()})
+    add("GET /api/facets", {"facets": query_manager.get_facets()})
+    return payloads
+
+
+def timed(func, args, repeat):
+    """返回 (结果, 最短耗时)"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return out, best
+
+
+def measure(objs, repeat):
+    """一个接口全部响应的平均字节数和平均耗时（微秒）"""
+    totals = {}
+
+    def add(key, size, seconds):
+        total = totals.setdefault(key, [0, 0.0])
+        total[0] += size
+        total[1] += seconds
+
+    for obj in objs:
+        data, seconds = timed(stdlib_dumps, (obj,), repeat)
+        add("stdlib", len(data), seconds)
+        data, seconds = timed(responses.dumps, (obj,), repeat)
+        add("fast", len(data), seconds)
+        for encoding in responses.ENCODINGS:
+            out, seconds = timed(responses.compress, (data, encoding), repeat)
+            add(encoding, len(out), seconds)
+    return {
+        key: {
+            "bytes": round(size / len(objs)),
+            "us": round(seconds / len(objs) * 1e6, 1),
+        }
+        for key, (size, seconds) in totals.items()
+    }
+
+
+def print_table(endpoints):
+    columns = ["stdlib", "fast", *responses.ENCODINGS]
+    header = f"{'接口':<40}{'数量':>6}" + "".join(f"{c:>22}" for c in columns)
+    print(header)
+    print("-" * len(header))
+    for endpoint, item in endpoints.items():
+        cells = "".join(
+            f"{item[c]['bytes']:>12,}B {item[c]['us']:>7.1f}us" for c in columns
+        )
+        print(f"{endpoint:<40}{item['count']:>6}{cells}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="响应序列化与压缩基准")
+    parser.add_argument(
+        "--es",
+        choices=["fake", "replay", "live"],
+        default="fake",
+        help="fake: 合成文档；replay: 重放 bench_api 录制的响应；live: 真实 ES",
+    )
+    parser.add_argument("--record-file", default=os.path.join(BENCH_DIR, "es.jsonl"))
+    parser.add_argument("--queries", default=QUERY_JSON)
+    parser.add_argument(
+        "--synthetic", type=int, default=200, help="额外生成的合成查询数"
+    )
+    parser.add_argument("--sessions", type=int, default=50, help="模拟的检索次数")
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5, help="每项计时重复次数")
+    parser.add_argument(
+        "--docs", type=int, default=5000, help="合成文档数（--es fake）"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--name", default="json", help="结果文件名前缀")
+    args = parser.parse_args()
+    args.es_latency_ms = 0.0
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    queries = load_queries(args.queries)
+    workload = queries + synthetic_variants(queries, args.synthetic, args.seed)
+    install_es(args, queries)
+    payloads = collect_payloads(workload, args.sessions, args.page_size, args.seed)
+    endpoints = {
+        endpoint: {"count": len(objs), **measure(objs, args.repeat)}
+        for endpoint, objs in payloads.items()
+    }
+    print(f"orjson: {responses.orjson is not None}  压缩: {responses.ENCODINGS}\n")
+    print_table(endpoints)
+    result = {
+        "name": args.name,
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "config": vars(args),
+        "orjson": responses.orjson is not None,
+        "endpoints": endpoints,
+    }
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    path = os.path.join(BENCH_DIR, f"{args.name}_{time.strftime('%Y%m%d%H%M%S')}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已保存到 {path}")
@@ -0,0 +1,61 @@
+import gc
+import json
+import random
+import tracemalloc
+from backend.search.query import Query, QueryParams
+
+# 每个查询的结果条数和测量的查询个数
+RESULTS_PER_QUERY = 1000
+NUM_QUERIES = 200
+
+with open("backend/test/outputs/ajid2cid.json", "r", encoding="utf-8") as f:
+    ajids = list(json.load(f))
+
+
+def fake_hits():
+    """模拟一次ES响应中的命中：ID 字符串每次都是新解析出来的对象"""
+    sample = random.sample(ajids, RESULTS_PER_QUERY)
+    payload = json.dumps(
+        [{"_id": aj, "_score": random.uniform(0, 100)} for aj in sample]
+    )
+    return json.loads(payload)
+
+
+def measure(build):
+    """返回构造 NUM_QUERIES 个查询后平均每个查询常驻的字节数"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    # 响应解析也计入统计：旧实现会一直持有响应中的 ID 字符串
+    queries = [build(fake_hits()) for _ in range(NUM_QUERIES)]
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    assert len(queries) == NUM_QUERIES
+    return (after - before) / NUM_QUERIES
+
+
+def build_list(hits):
+    """旧实现：(doc_id, score) 元组列表"""
+    query = Query(QueryParams(query="盗窃"))
+    query.results = [(hit["_id"], hit["_score"]) for hit in hits]
+    return query
+
+
+def build_compact(hits):
+    """新实现：ResultList（序号 + float32 数组）"""
+    query = Query(QueryParams(query="盗窃"))
+    query.results.extend((hit["_id"], hit["_score"]) for hit in hits)
+    return query
+
+
+if __name__ == "__main__":
+    random.seed(0)
+    # 先让全局 ID 表收录全部 ajId，模拟长期运行后的稳态
+    build_compact([{"_id": aj, "_score": 0.0} for aj in ajids])
+    list_bytes = measure(build_list)
+    compact_bytes = measure(build_compact)
+    print(f"每个查询 {RESULTS_PER_QUERY} 条结果，共 {NUM_QUERIES} 个查询")
+    print(f"元组列表:   {list_bytes / 1024:8.1f} KB/查询")
+    print(f"ResultList: {compact_bytes / 1024:8.1f} KB/查询")
+    print(f"节省: {1 - compact_bytes / list_bytes:.1%}")
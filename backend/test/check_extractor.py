@@ -0,0 +1,202 @@
+"""
+实体抽取回归检查：对比 EntityExtractor 与旧实现
+（extract_fymc / extract_spry / extract_dsr 三次正则扫描）的输出是否完全一致。
+先检查下面的内置样例（不依赖语料），再在 LeCaRD 候选文档上检查并给出两者的耗时
+
+    python -m backend.test.check_extractor [--limit N] [--samples-only]
+"""
+import re
+import sys
+import json
+import time
+import argparse
+from backend.elastic.extractor import entity_extractor
+from backend.elastic.indexer import CANDIDATES_DIR, list_candidate_files
+
+
+# ---- 旧实现（原样保留，作为对照基线） ----
+
+
+def legacy_extract_spry(text):
+    # 只允许2-8位汉字/中点，且后面必须是分隔符或结尾
+    pattern = r"(审判长|审判员|人民陪审员|书记员|代理审判员|代理书记员|助理审判员)[：:\s]*([\u4e00-\u9fa5·]{2,8})(?=[，。；：:、,.\s]|$)"
+    results = []
+    for role, name in re.findall(pattern, text):
+        # 严格限制姓名长度和内容
+        if 2 <= len(name) <= 8 and all(
+            c not in name
+            for c in "的有归案参加指定材料证言供述意见处罚家中初犯行为事实提出无视承担犯罪血液损伤陈述"
+        ):
+            results.append(f"{role}:{name}")
+    return list(set(results))
+
+
+def legacy_extract_fymc(text):
+    # 只匹配以地名/常见前缀开头，且前面是句首、标点、空格、换行，后面是分隔符或结尾
+    prefix = (
+        r"(?:中华人民共和国)?"
+        r"(?:最高|高级|中级|基层|铁路|海事|军事|知识产权|"
+        r"[\u4e00-\u9fa5]{2,10}(?:省|市|自治区|县|区|旗|自治州|直辖市|特别行政区))"
+    )
+    pattern = (
+        r"(?<![^\s，。；：:、,\n])"  # 前面不能是汉字或字母数字
+        + prefix
+        + r"[\u4e00-\u9fa5]{0,20}?(?:人民法院|法院|人民法庭|法庭)"
+        r"(?=[，。；：:、,.\s]|$)"
+    )
+    results = []
+    for name in re.findall(pattern, text):
+        name = name.strip("，。；：:、,. \n")
+        # 排除明显无效内容
+        if 6 <= len(name) <= 30 and not any(
+            x in name for x in ["本院", "通过", "和", "或"]
+        ):
+            results.append(name)
+    return list(set(results))
+
+
+def legacy_extract_dsr(text):
+    roles = [
+        "被告人",
+        "被害人",
+        "原告",
+        "被告",
+        "上诉人",
+        "被上诉人",
+        "申请人",
+        "被申请人",
+        "证人",
+        "被告单位",
+        "被害单位",
+        "受害人",
+        "诉讼代理人",
+        "辩护人",
+    ]
+    unit_suffix = r"(?:公司|单位|医院|学校|集团|厂|店|中心|协会|银行|分局|分公司|支行|分院|分所|分队|分部)"
+    # 人名2-4位汉字/中点，且后面必须是分隔符或结尾
+    person_pattern = (
+        rf"({'|'.join(roles)})[:：\s]*([\u4e00-\u9fa5·]{{2,4}})(?=[，。；：:、,.\s]|$)"
+    )
+    # 单位名2-30位且以后缀结尾，且后面必须是分隔符或结尾
+    unit_pattern = rf"({'|'.join(roles)})[:：\s]*([\u4e00-\u9fa5A-Za-z0-9（）()]{2,30}{unit_suffix})(?=[，。；：:、,.\s]|$)"
+    # 排除词
+    exclude_words = "的|有|归案|参加|指定|材料|证言|供述|意见|处罚|家中|初犯|行为|事实|辩护人|提出|无视|承担|犯罪|血液|损伤|陈述|处罚|证实|意见|家中|初犯|行为|事实|参加|指定|提出|无视|承担|犯罪|血液|损伤|陈述|处罚|供述|事实|材料|证实"
+
+    results = []
+    # 人名
+    for role, name in re.findall(person_pattern, text):
+        # 严格限制姓名长度和内容
+        if 2 <= len(name) <= 4 and not re.search(rf"({exclude_words})", name):
+            results.append(f"{role}:{name}")
+    # 单位名
+    for role, name in re.findall(unit_pattern, text):
+        if 2 <= len(name) <= 30 and not re.search(rf"({exclude_words})", name):
+            results.append(f"{role}:{name}")
+    return list(set(results))
+
+
+def legacy_extract(text):
+    return {
+        "fymc": legacy_extract_fymc(text),
+        "spry": legacy_extract_spry(text),
+        "dsr": legacy_extract_dsr(text),
+    }
+
+
+# 内置样例：覆盖法院名的各种前缀、各类审判人员和当事人（含单位）、
+# 排除词、角色词互相包含（被告/被告人/被告单位）以及文本开头和结尾处的匹配
+SAMPLE_TEXTS = [
+    "北京市海淀区人民法院\n刑事判决书\n公诉机关北京市海淀区人民检察院。"
+    "被告人张三，男，汉族。辩护人李四，北京某律师事务所律师。",
+    "中华人民共和国最高人民法院，上诉人王五因盗窃一案，不服浙江省高级人民法院判决。"
+    "被上诉人杭州某某科技有限公司，住所地杭州市。",
+    "审判长 赵六\n审判员 钱七\n人民陪审员 孙八\n二〇一八年五月三日\n书记员 周九",
+    "代理审判员：吴十，代理书记员：郑十一，助理审判员 陈·阿依古丽。",
+    "被告人的供述与辩解，被害人陈述，证人证言；被告人归案后如实供述，"
+    "被告人家中搜出赃物，辩护人提出的辩护意见。",
+    "原告上海浦东发展银行股份有限公司信用卡中心，被告刘某某，被告单位某某建设集团。",
+    "被害单位中国工商银行股份有限公司北京分行营业部。被害人马某甲、马某乙。",
+    "上海铁路运输法院；广州海事法院、北京知识产权法院。本院认为，被告人犯盗窃罪。",
+    "江苏省南京市中级人民法院，通过审理查明：某某县人民法院和某某区人民法院一审。",
+    "内蒙古自治区呼和浩特市新城区人民法院 民事判决书 申请人：包某 被申请人：某某分公司",
+    "被告人罗某某犯故意伤害罪，判处有期徒刑三年。受害人：何某。诉讼代理人：黄某，",
+    "",
+    "审判员",
+    "本判决为终审判决。审判员 欧阳娜娜",
+    "海南省三亚市城郊人民法院\n原告：杭州市第一人民医院，被告单位：宁波某某化工厂。"
+    "被告人：李华，上诉人 王小明，证人赵某。",
+]
+
+
+def load_texts(limit=None):
+    texts = []
+    for fpath in list_candidate_files()[:limit]:
+        with open(fpath, "r", encoding="utf-8") as f:
+            doc = json.load(f)
+        texts.append(
+            " ".join(
+                [
+                    doc.get("qw", ""),
+                    doc.get("ajjbqk", ""),
+                    doc.get("cpfxgc", ""),
+                    doc.get("pjjg", ""),
+                    doc.get("ajName", ""),
+                    doc.get("writName", ""),
+                ]
+            )
+        )
+    return texts
+
+
+def timed(extract, texts):
+    start = time.perf_counter()
+    outputs = [extract(text) for text in texts]
+    return outputs, time.perf_counter() - start
+
+
+def compare(legacy_outputs, new_outputs):
+    """逐篇逐字段比较，打印不一致之处，返回不一致数"""
+    mismatches = 0
+    for i, (old, new) in enumerate(zip(legacy_outputs, new_outputs)):
+        for field in ("fymc", "spry", "dsr"):
+            if set(old[field]) != set(new[field]):
+                mismatches += 1
+                print(f"Mismatch in document {i} field {field}:")
+                print(f"  legacy: {sorted(old[field])}")
+                print(f"  new:    {sorted(new[field])}")
+    return mismatches
+
+
+def check_samples():
+    """在内置样例上比较，返回不一致数"""
+    legacy_outputs = [legacy_extract(text) for text in SAMPLE_TEXTS]
+    new_outputs = [entity_extractor.extract(text) for text in SAMPLE_TEXTS]
+    mismatches = compare(legacy_outputs, new_outputs)
+    entities = sum(len(v) for output in legacy_outputs for v in output.values())
+    print(f"内置样例: {len(SAMPLE_TEXTS)} 段，{entities} 个实体，不一致: {mismatches}")
+    return mismatches
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--limit", type=int, default=None, help="只检查前 N 篇文档")
+    parser.add_argument("--samples-only", action="store_true", help="只检查内置样例")
+    args = parser.parse_args()
+
+    sample_mismatches = check_samples()
+    if args.samples_only:
+        sys.exit(1 if sample_mismatches else 0)
+    texts = load_texts(args.limit)
+    if not texts:
+        print(f"No candidate documents found in {CANDIDATES_DIR}")
+        sys.exit(1 if sample_mismatches else 0)
+    legacy_outputs, legacy_time = timed(legacy_extract, texts)
+    new_outputs, new_time = timed(entity_extractor.extract, texts)
+    mismatches = sample_mismatches + compare(legacy_outputs, new_outputs)
+
+    total_mb = sum(len(t) for t in texts) / 1e6
+    print(f"{len(texts)} 篇文档，{total_mb:.1f}M 字符")
+    print(f"旧实现:          {legacy_time:.2f}s ({len(texts) / legacy_time:.0f} docs/sec)")
+    print(f"EntityExtractor: {new_time:.2f}s ({len(texts) / new_time:.0f} docs/sec)")
+    print(f"加速比: {legacy_time / new_time:.2f}x，不一致: {mismatches}")
+    sys.exit(1 if mismatches else 0)
@@ -0,0 +1,322 @@
+"""
+离线基准测试用的 Elasticsearch 替身
+
+- FakeElasticsearch：在内存中的合成文档上模拟后端用到的接口
+  （search / mget / get / msearch / point-in-time / get_mapping），
+  得分由文档 ID 和查询内容哈希得到，结果稳定可复现
+- RecordingElasticsearch：包装真实客户端，把每次调用的请求和响应追加写入 JSONL
+- ReplayElasticsearch：按请求内容从录制文件中取回响应，无需 ES 即可重放
+"""
+import json
+import time
+import random
+import hashlib
+import threading
+from bisect import bisect_left, bisect_right
+from elasticsearch import NotFoundError, RequestError
+from backend.config import SUGGEST_FIELDS
+
+# 合成文档中参与前缀补全的长文本片段长度
+PHRASE_LENGTH = 16
+
+
+def _request_key(method, kwargs):
+    payload = json.dumps(
+        {"method": method, "kwargs": kwargs}, sort_keys=True, ensure_ascii=False
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _score(doc_id, query_key):
+    digest = hashlib.md5(f"{doc_id}:{query_key}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:4], "little") / 2**32 * 100
+
+
+class _FakeIndices:
+    def get_mapping(self, index=None, **kwargs):
+        properties = {f"{f}_suggest": {"type": "completion"} for f in SUGGEST_FIELDS}
+        return {f"{index}_fake": {"mappings": {"properties": properties}}}
+
+    def exists(self, index=None, **kwargs):
+        return True
+
+    def refresh(self, index=None, **kwargs):
+        return {}
+
+
+class FakeElasticsearch:
+    """
+    用 texts（如 LeCaRD 查询文本）和 charges（罪名）拼出 num_docs 篇合成文书。
+    latency 为每次调用额外等待的秒数，用来模拟网络和 ES 的处理时间
+    """
+
+    def __init__(self, texts, charges, num_docs=5000, hit_ratio=0.3, latency=0.0):
+        rng = random.Random(0)
+        self.latency = latency
+        self.hit_ratio = hit_ratio
+        self.docs = {}
+        for i in range(num_docs):
+            ajid = f"{rng.getrandbits(64):016x}"
+            labels = rng.sample(charges, min(len(charges), rng.randint(1, 2)))
+            body = "。".join(rng.choice(texts) for _ in range(rng.randint(3, 8)))
+            self.docs[ajid] = {
+                "ajId": ajid,
+                "ajName": f"{labels[0]}案",
+                "writName": f"{labels[0]}一审刑事判决书",
+                "writId": str(i),
+                "ajjbqk": body,
+                "cpfxgc": body[: len(body) // 2],
+                "pjjg": f"被告人犯{labels[0]}，判处有期徒刑{rng.randint(1, 10)}年",
+                "qw": body * 2,
+                "labels": labels,
+                "fymc": [f"{rng.choice('东南西北中')}城区人民法院"],
+                "spry": [f"审判员:{rng.choice('张王李赵刘陈')}{rng.choice('明华强伟')}"],
+                "dsr": [f"被告人:{rng.choice('张王李赵刘陈')}某"],
+            }
+        self.doc_ids = sorted(self.docs)
+        self.indices = _FakeIndices()
+        self._ranked = {}  # 查询 -> [(-得分, ajId)]
+        self._lock = threading.Lock()
+        self._pits = set()
+        self._phrases = self._build_phrases()
+
+    def _build_phrases(self):
+        """字段 -> 排序后的补全候选"""
+        phrases = {}
+        for field in SUGGEST_FIELDS:
+            values = set()
+            for doc in self.docs.values():
+                value = doc.get(field)
+                for v in value if isinstance(value, list) else [value]:
+                    if v:
+                        values.add(v[:PHRASE_LENGTH])
+            phrases[field] = sorted(values)
+        return phrases
+
+    def _wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _rank(self, query):
+        """命中的文档按 RESULT_SORT 排序，返回 [(-得分, ajId)]"""
+        key = json.dumps(query, sort_keys=True, ensure_ascii=False)
+        ranked = self._ranked.get(key)
+        if ranked is None:
+            threshold = 100 * (1 - self.hit_ratio)
+            scores = ((_score(doc_id, key), doc_id) for doc_id in self.doc_ids)
+            ranked = sorted((-s, d) for s, d in scores if s >= threshold)
+            with self._lock:
+                self._ranked[key] = ranked
+        return ranked
+
+    def _hit(self, doc_id, score=None, source=None):
+        doc = self.docs[doc_id]
+        if isinstance(source, dict):
+            doc = {k: doc[k] for k in source.get("includes", doc) if k in doc}
+        elif source is False:
+            doc = {}
+        return {"_id": doc_id, "_score": score, "_source": doc}
+
+    def search(self, index=None, body=None, **kwargs):
+        self._wait()
+        body = body or {}
+        if "suggest" in body:
+            return {"hits": {"hits": []}, "suggest": self._suggest(body["suggest"])}
+        if "aggs" in body and "query" not in body:
+            aggregations = self._aggregate(body["aggs"], self.doc_ids)
+            return {"hits": {"hits": []}, "aggregations": aggregations}
+        query = body.get("query", {})
+        if "term" in query:
+            doc_id = query["term"].get("ajId")
+            hits = [self._hit(doc_id, 1.0)] if doc_id in self.docs else []
+            return {"hits": {"hits": hits, "total": {"value": len(hits)}}}
+        ids_filter = query.get("bool", {}).get("filter", {}).get("ids")
+        if ids_filter is not None:
+            return self._previews(ids_filter["values"], body)
+        pit = body.get("pit")
+        if pit is not None and pit["id"] not in self._pits:
+            raise NotFoundError(404, "search_context_missing_exception", {})
+        ranked = self._rank(query)
+        start = 0
+        if body.get("search_after"):
+            # 与 ES 相同：point-in-time 检索的 sort 末尾带有隐式的 _shard_doc
+            cursor = body["search_after"]
+            if len(cursor) != (3 if pit else 2):
+                raise RequestError(400, "search_phase_execution_exception", {})
+            score, doc_id = cursor[:2]
+            start = bisect_right(ranked, (-score, doc_id))
+        size = body.get("size", 10)
+        hits = []
+        for i, (neg_score, doc_id) in enumerate(ranked[start : start + size]):
+            sort = [-neg_score, doc_id] + ([start + i] if pit else [])
+            hits.append({**self._hit(doc_id, -neg_score, False), "sort": sort})
+        response = {"hits": {"hits": hits, "total": {"value": len(ranked)}}}
+        if "aggs" in body:
+            doc_ids = [doc_id for _, doc_id in ranked]
+            response["aggregations"] = self._aggregate(body["aggs"], doc_ids)
+        if pit is not None:
+            response["pit_id"] = pit["id"]
+        return response
+
+    def _previews(self, doc_ids, body):
+        hits = []
+        for doc_id in doc_ids:
+            if doc_id not in self.docs:
+                continue
+            hit = self._hit(doc_id, 1.0, body.get("_source"))
+            hit["highlight"] = {
+                field: [self.docs[doc_id][field][: options["no_match_size"]]]
+                for field, options in body.get("highlight", {})
+                .get("fields", {})
+                .items()
+            }
+            hits.append(hit)
+        return {"hits": {"hits": hits, "total": {"value": len(hits)}}}
+
+    def _suggest(self, suggesters):
+        result = {}
+        for name, spec in suggesters.items():
+            prefix = spec["prefix"]
+            size = spec["completion"].get("size", 5)
+            phrases = self._phrases.get(name, [])
+            i = bisect_left(phrases, prefix)
+            options = []
+            while i < len(phrases) and len(options) < size:
+                if not phrases[i].startswith(prefix):
+                    break
+                options.append({"text": phrases[i], "_score": 1.0})
+                i += 1
+            result[name] = [{"text": prefix, "options": options}]
+        return result
+
+    def _aggregate(self, aggs, doc_ids):
+        """terms 聚合，不存在的字段返回空桶（与 ES 对未映射字段的处理相同）"""
+        result = {}
+        for name, agg in aggs.items():
+            field = agg["terms"]["field"]
+            counts = {}
+            for doc_id in doc_ids:
+                value = self.docs[doc_id].get(field)
+                for v in value if isinstance(value, list) else [value]:
+                    if v is not None:
+                        counts[v] = counts.get(v, 0) + 1
+            top = sorted(counts.items(), key=lambda kv: (-kv[1], kv[0]))
+            result[name] = {
+                "buckets": [
+                    {"key": k, "doc_count": v}
+                    for k, v in top[: agg["terms"].get("size", 10)]
+                ]
+            }
+        return result
+
+    def mget(self, index=None, body=None, _source_includes=None, **kwargs):
+        self._wait()
+        docs = []
+        for doc_id in body["ids"]:
+            doc = self.docs.get(doc_id)
+            if doc is None:
+                docs.append({"_id": doc_id, "found": False})
+                continue
+            if _source_includes:
+                doc = {k: doc[k] for k in _source_includes if k in doc}
+            docs.append({"_id": doc_id, "found": True, "_source": doc})
+        return {"docs": docs}
+
+    def get(self, index=None, id=None, **kwargs):
+        self._wait()
+        if id not in self.docs:
+            raise NotFoundError(404, "not_found", {"found": False})
+        return {"_id": id, "found": True, "_source": self.docs[id]}
+
+    def msearch(self, body=None, index=None, **kwargs):
+        responses = []
+        for i in range(0, len(body), 2):
+            header, search = body[i], body[i + 1]
+            responses.append(self.search(index=header.get("index", index), body=search))
+        return {"responses": responses}
+
+    def open_point_in_time(self, index=None, keep_alive=None, **kwargs):
+        pit_id = f"pit-{len(self._pits)}"
+        self._pits.add(pit_id)
+        return {"id": pit_id}
+
+    def close_point_in_time(self, body=None, **kwargs):
+        self._pits.discard(body.get("id"))
+        return {"succeeded": True}
+
+
+class RecordingElasticsearch:
+    """包装真实客户端，录制每次调用的请求和响应"""
+
+    METHODS = ("search", "mget", "get", "msearch", "open_point_in_time")
+
+    def __init__(self, es, path):
+        self._es = es
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+        self.indices = _RecordingNamespace(self, es.indices, "indices")
+
+    def _record(self, method, func, kwargs):
+        response = func(**kwargs)
+        line = json.dumps(
+            {"key": _request_key(method, kwargs), "response": response},
+            ensure_ascii=False,
+        )
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+        return response
+
+    def __getattr__(self, name):
+        func = getattr(self._es, name)
+        if name not in self.METHODS:
+            return func
+        return lambda **kwargs: self._record(name, func, kwargs)
+
+    def close(self):
+        self._file.close()
+
+
+class _RecordingNamespace:
+    def __init__(self, recorder, namespace, prefix):
+        self._recorder = recorder
+        self._namespace = namespace
+        self._prefix = prefix
+
+    def __getattr__(self, name):
+        func = getattr(self._namespace, name)
+        method = f"{self._prefix}.{name}"
+        return lambda **kwargs: self._recorder._record(method, func, kwargs)
+
+
+class ReplayElasticsearch:
+    """按请求内容回放录制的响应；没有录到的请求抛出 KeyError"""
+
+    def __init__(self, path):
+        self._responses = {}
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                self._responses[record["key"]] = record["response"]
+        self.indices = _ReplayNamespace(self, "indices")
+
+    def _replay(self, method, kwargs):
+        key = _request_key(method, kwargs)
+        if key not in self._responses:
+            raise KeyError(f"No recorded response for {method}")
+        # 调用方可能修改响应，返回副本
+        return json.loads(json.dumps(self._responses[key]))
+
+    def __getattr__(self, name):
+        if name == "close_point_in_time":
+            return lambda **kwargs: {"succeeded": True}
+        return lambda **kwargs: self._replay(name, kwargs)
+
+
+class _ReplayNamespace:
+    def __init__(self, replayer, prefix):
+        self._replayer = replayer
+        self._prefix = prefix
+
+    def __getattr__(self, name):
+        return lambda **kwargs: self._replayer._replay(f"{self._prefix}.{name}", kwargs)
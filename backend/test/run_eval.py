@@ -0,0 +1,184 @@
+"""
+并发生成 LeCaRD 预测文件：直接调用 QueryManager（或通过连接池访问已启动的服务），
+只取 ajId 和得分，不读取文档内容；一次运行可以输出多个排序配置的预测
+
+    python -m backend.test.run_eval                          # 所有排序配置
+    python -m backend.test.run_eval --configs bm25,bm25_no_ay
+    python -m backend.test.run_eval --url http://localhost:5000   # 只支持 bm25
+
+预测写入 backend/test/prediction/<配置>_top100.json，之后用 LeCaRD/metrics.py 评测
+"""
+import os
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from backend.search.query import QueryParams
+
+QUERY_JSON = "LeCaRD/data/query/query.json"
+AJID2CID_JSON = "backend/test/outputs/ajid2cid.json"
+PREDICTION_DIR = "backend/test/prediction"
+
+
+def _without_labels(params: QueryParams):
+    """不使用案由加分"""
+    return QueryParams(**{**params.to_dict(), "ay": []}).to_es_query()
+
+
+def _facts_only(params: QueryParams):
+    """主查询只匹配案件基本情况和裁判分析过程"""
+    body = params.to_es_query()
+    for clause in body["query"]["bool"]["must"]:
+        match = clause.get("multi_match")
+        if match and match["query"] == params.query:
+            match["fields"] = ["ajjbqk^3", "cpfxgc^2"]
+    return body
+
+
+# 排序配置：名称 -> QueryParams 转为 ES 检索体的函数
+RANKING_CONFIGS = {
+    "bm25": lambda params: params.to_es_query(),  # 与线上检索相同
+    "bm25_no_ay": _without_labels,
+    "bm25_facts": _facts_only,
+}
+
+
+def load_queries(path=QUERY_JSON):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def to_user_query(q):
+    return {"query": q["q"], "ay": q["crime"], "qw": "", "ajmc": ""}
+
+
+def take_candidates(ranked, ajid2cid, depth):
+    """按排序取前 depth 个 LeCaRD 候选的 candidate id"""
+    cids, seen = [], set()
+    for ajid, _ in ranked:
+        if ajid in ajid2cid and ajid not in seen:
+            seen.add(ajid)
+            cids.append(ajid2cid[ajid])
+            if len(cids) == depth:
+                break
+    return cids
+
+
+class LocalRanker:
+    """进程内调用 QueryManager.rank_ids"""
+
+    def __init__(self):
+        from backend.search.query_manager import get_query_manager
+
+        self.query_manager = get_query_manager()
+
+    def rank(self, config, user_query):
+        params = QueryParams.from_dict(user_query)
+        es_query = RANKING_CONFIGS[config](params)
+        return self.query_manager.rank_ids(params, es_query=es_query)
+
+
+class ApiRanker:
+    """通过连接池访问已启动的服务，结果页只取 ajId 和得分"""
+
+    def __init__(self, base_url, pool_size, page_size=100):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.base_url = base_url.rstrip("/")
+        self.page_size = page_size
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    def rank(self, config, user_query):
+        resp = self._session.post(
+            f"{self.base_url}/api/query", json={"user_query": user_query}
+        )
+        resp.raise_for_status()
+        query_id = resp.json()["query_id"]
+        page = 1
+        while True:
+            resp = self._session.get(
+                f"{self.base_url}/api/query/{query_id}/results",
+                params={"page": page, "page_size": self.page_size, "ids_only": 1},
+            )
+            resp.raise_for_status()
+            data = resp.json()
+            for item in data["results"]:
+                yield item["ajId"], item["score"]
+            if page >= data["total_pages"]:
+                return
+            page += 1
+
+
+def run(ranker, configs, queries, ajid2cid, depth, workers):
+    """返回 {配置: {ridx: [cid]}}"""
+    predictions = {config: {} for config in configs}
+    lock = threading.Lock()
+
+    def evaluate(config, q):
+        try:
+            ranked = ranker.rank(config, to_user_query(q))
+            cids = take_candidates(ranked, ajid2cid, depth)
+        except Exception as e:
+            print(f"[{config}] ridx={q['ridx']} failed: {e}")
+            return
+        with lock:
+            predictions[config][str(q["ridx"])] = cids
+
+    with ThreadPoolExecutor(workers) as pool:
+        futures = [
+            pool.submit(evaluate, config, q) for config in configs for q in queries
+        ]
+        for future in futures:
+            future.result()
+    return predictions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="并发生成 LeCaRD 预测文件")
+    parser.add_argument(
+        "--configs",
+        default=",".join(RANKING_CONFIGS),
+        help=f"排序配置，逗号分隔，可选: {', '.join(RANKING_CONFIGS)}",
+    )
+    parser.add_argument("--url", help="通过已启动的服务检索（只支持 bm25）")
+    parser.add_argument("--workers", type=int, default=8, help="并发检索数")
+    parser.add_argument("--depth", type=int, default=100, help="每个查询的候选数")
+    parser.add_argument("--queries", default=QUERY_JSON)
+    parser.add_argument("--output-dir", default=PREDICTION_DIR)
+    args = parser.parse_args()
+    args.configs = [c for c in args.configs.split(",") if c]
+    unknown = [c for c in args.configs if c not in RANKING_CONFIGS]
+    if unknown:
+        parser.error(f"unknown ranking configs: {', '.join(unknown)}")
+    if args.url and args.configs != ["bm25"]:
+        parser.error("--url only supports --configs bm25")
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    with open(AJID2CID_JSON, "r", encoding="utf-8") as f:
+        ajid2cid = json.load(f)
+    queries = load_queries(args.queries)
+    if args.url:
+        ranker = ApiRanker(args.url, args.workers)
+    else:
+        ranker = LocalRanker()
+    start = time.perf_counter()
+    predictions = run(ranker, args.configs, queries, ajid2cid, args.depth, args.workers)
+    elapsed = time.perf_counter() - start
+    os.makedirs(args.output_dir, exist_ok=True)
+    for config, prediction in predictions.items():
+        path = os.path.join(args.output_dir, f"{config}_top{args.depth}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(prediction, f, ensure_ascii=False, indent=2)
+        print(f"{config}: {len(prediction)}/{len(queries)} queries -> {path}")
+    print(
+        f"{len(queries) * len(args.configs)} searches in {elapsed:.2f}s "
+        f"({args.workers} workers)"
+    )
@@ -14,10 +14,10 @@ export async function createQuery(data: CreateQueryRequest) {
     return resp.data;
 }
 
-// 获取查询结果分页
+// 获取查询结果分页（列表只展示摘要，长文本字段请求预览片段）
 export async function fetchQueryResults(queryId: string, page = 1, pageSize = 10) {
     const resp = await axios.get<QueryResultsResponse>(
-        `/api/query/${queryId}/results?page=${page}&page_size=${pageSize}`
+        `/api/query/${queryId}/results?page=${page}&page_size=${pageSize}&preview=1`
     );
     return resp.data;
 }